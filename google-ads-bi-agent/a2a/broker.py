@@ -0,0 +1,211 @@
+"""
+Local message broker for the multi-process EventBus (stand-in for a Redis-style broker).
+
+Run with:  python -m a2a.broker --port 7800
+
+Semantics (per topic):
+- each consumer group receives every event once; inside a group, events are
+  load-balanced across connected consumers (worker processes);
+- an event stays "in flight" until the consumer acks it; a nack or a dropped
+  connection puts it back in the group queue (at-least-once delivery);
+- events published with a `key` skip the round-robin: every group hands them to
+  the same consumer connection (rendezvous hashing over the group's consumers),
+  so all events of one stream (pages, end marker, error) land in one worker
+  process. Order within a group is kept: a keyed event waits for room in its
+  consumer's prefetch window;
+- after `max_deliveries` attempts the event goes to a dead-letter list;
+- events published before any group exists are kept in a bounded backlog and
+  handed to the first group that subscribes.
+
+State is in memory: the broker itself is not durable.
+"""
+import asyncio
+import argparse
+import hashlib
+import itertools
+import logging
+from collections import deque
+from typing import Dict, List, Optional
+
+from a2a.transports import read_frame, write_frame
+
+logger = logging.getLogger(__name__)
+
+
+class _Message:
+    __slots__ = ("id", "topic", "codec", "body", "key", "deliveries")
+
+    def __init__(self, msg_id: int, topic: str, codec: str, body: bytes, key: Optional[str] = None):
+        self.id = msg_id
+        self.topic = topic
+        self.codec = codec
+        self.body = body
+        self.key = key
+        self.deliveries = 0
+
+
+class _Consumer:
+    def __init__(self, consumer_id: int, writer: asyncio.StreamWriter):
+        # Stable per connection: the same id in every group the connection joins
+        self.id = consumer_id
+        self.writer = writer
+        self.prefetch = 16
+        self.inflight: Dict[int, tuple] = {}  # message id -> (group, message)
+        self.write_lock = asyncio.Lock()
+
+
+class _Group:
+    def __init__(self, topic: str, name: str):
+        self.topic = topic
+        self.name = name
+        self.queue: deque = deque()
+        self.consumers: List[_Consumer] = []
+        self.next_consumer = 0
+
+
+class LocalBroker:
+    def __init__(self, host: str = "127.0.0.1", port: int = 7800, max_deliveries: int = 5, backlog_limit: int = 10_000):
+        self.host = host
+        self.port = port
+        self.max_deliveries = max_deliveries
+        self.backlog_limit = backlog_limit
+        self.groups: Dict[str, Dict[str, _Group]] = {}
+        self.backlog: Dict[str, deque] = {}
+        self.dead_letters: List[_Message] = []
+        self._ids = itertools.count(1)
+        self._consumer_ids = itertools.count(1)
+        self._server: Optional[asyncio.base_events.Server] = None
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        logger.info(f"🛰️ LocalBroker: listening on {self.host}:{self.port}")
+
+    async def serve_forever(self):
+        await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        consumer = _Consumer(next(self._consumer_ids), writer)
+        try:
+            while True:
+                header, body = await read_frame(reader)
+                op = header["op"]
+                if op == "pub":
+                    await self._publish(header["topic"], header["codec"], body, header.get("key"))
+                    async with consumer.write_lock:
+                        await write_frame(writer, {"op": "puback", "ref": header["ref"]})
+                elif op == "sub":
+                    consumer.prefetch = header.get("prefetch", consumer.prefetch)
+                    await self._subscribe(consumer, header["topic"], header["group"])
+                elif op in ("ack", "nack"):
+                    await self._settle(consumer, header["id"], requeue=(op == "nack"))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            await self._disconnect(consumer)
+            writer.close()
+
+    async def _publish(self, topic: str, codec: str, body: bytes, key: Optional[str] = None):
+        groups = self.groups.get(topic)
+        if not groups:
+            backlog = self.backlog.setdefault(topic, deque(maxlen=self.backlog_limit))
+            backlog.append((codec, body, key))
+            return
+        for group in groups.values():
+            group.queue.append(_Message(next(self._ids), topic, codec, body, key))
+            await self._pump(group)
+
+    async def _subscribe(self, consumer: _Consumer, topic: str, name: str):
+        groups = self.groups.setdefault(topic, {})
+        group = groups.get(name)
+        if group is None:
+            group = groups[name] = _Group(topic, name)
+            for codec, body, key in self.backlog.pop(topic, ()):
+                group.queue.append(_Message(next(self._ids), topic, codec, body, key))
+        if consumer not in group.consumers:
+            group.consumers.append(consumer)
+        await self._pump(group)
+
+    async def _settle(self, consumer: _Consumer, msg_id: int, requeue: bool):
+        entry = consumer.inflight.pop(msg_id, None)
+        if entry is None:
+            return
+        group, message = entry
+        if requeue:
+            self._requeue(group, message)
+        await self._pump(group)
+
+    def _requeue(self, group: _Group, message: _Message):
+        if message.deliveries >= self.max_deliveries:
+            logger.error(f"☠️ LocalBroker: Event {message.id} on '{message.topic}' dead-lettered after {message.deliveries} deliveries",
+                         extra={"topic": message.topic, "event_id": message.id})
+            self.dead_letters.append(message)
+        else:
+            group.queue.appendleft(message)
+
+    async def _disconnect(self, consumer: _Consumer):
+        touched = []
+        for group, message in consumer.inflight.values():
+            self._requeue(group, message)
+            touched.append(group)
+        consumer.inflight.clear()
+        for groups in self.groups.values():
+            for group in groups.values():
+                if consumer in group.consumers:
+                    group.consumers.remove(consumer)
+                    touched.append(group)
+        for group in touched:
+            await self._pump(group)
+
+    async def _pump(self, group: _Group):
+        """Delivers queued events round-robin (keyed ones to their consumer) while there is prefetch room."""
+        while group.queue and group.consumers:
+            key = group.queue[0].key
+            consumer = self._next_consumer(group) if key is None else self._keyed_consumer(group, key)
+            if consumer is None:
+                return
+            message = group.queue.popleft()
+            message.deliveries += 1
+            consumer.inflight[message.id] = (group, message)
+            try:
+                async with consumer.write_lock:
+                    await write_frame(consumer.writer, {
+                        "op": "msg", "id": message.id, "topic": message.topic,
+                        "group": group.name, "codec": message.codec,
+                    }, message.body)
+            except ConnectionError:
+                # The connection handler will requeue everything in flight
+                return
+
+    def _next_consumer(self, group: _Group) -> Optional[_Consumer]:
+        for _ in range(len(group.consumers)):
+            consumer = group.consumers[group.next_consumer % len(group.consumers)]
+            group.next_consumer += 1
+            if len(consumer.inflight) < consumer.prefetch:
+                return consumer
+        return None
+
+    @staticmethod
+    def _keyed_consumer(group: _Group, key: str) -> Optional[_Consumer]:
+        # Rendezvous hashing: groups with the same consumers pick the same one for a key,
+        # and a consumer leaving only moves the keys it owned
+        consumer = max(group.consumers, key=lambda c: hashlib.sha1(f"{key}|{c.id}".encode()).digest())
+        return consumer if len(consumer.inflight) < consumer.prefetch else None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local EventBus broker")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=7800)
+    parser.add_argument("--max-deliveries", type=int, default=5)
+    args = parser.parse_args()
+    from utils.structured_log import configure_logging
+    configure_logging()
+    asyncio.run(LocalBroker(args.host, args.port, args.max_deliveries).serve_forever())
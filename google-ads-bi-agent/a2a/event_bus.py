@@ -1,4 +1,43 @@
 import asyncio
+import logging
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from a2a.payloads import ColumnarPayload, payload_size, new_correlation_id, correlation_id_of
+from utils.telemetry import LatencyStats, telemetry, trace
+
+logger = logging.getLogger(__name__)
+
+BACKPRESSURE_POLICIES = ("block", "drop_oldest", "reject")
+
+
+class BackpressureError(RuntimeError):
+    """Raised by publish() when a topic with the 'reject' policy has a full queue."""
+
+
+class RequestFailed(RuntimeError):
+    """Raised by request() when the error topic answers the request's correlation id."""
+
+    def __init__(self, payload):
+        super().__init__(payload.get("message", payload) if isinstance(payload, dict) else payload)
+        self.payload = payload
+
+
+class TopicQueue:
+    """Bounded queue + consumer workers for one topic (see EventBus.configure_topic)."""
+
+    def __init__(self, maxsize: int, workers: int, policy: str):
+        self.maxsize = maxsize
+        self.workers = workers
+        self.policy = policy
+        self.queue = None
+        self.tasks = []
+        self.published = 0
+        self.dropped = 0
+        self.rejected = 0
+        self.max_depth = 0
+
 
 class EventBus:
     _instance = None
@@ -7,26 +46,240 @@ class EventBus:
         if cls._instance is None:
             cls._instance = super(EventBus, cls).__new__(cls)
             cls._instance.subscribers = {}
+            cls._instance.topic_queues = {}
+            cls._instance.latency = {}
+            # Transporte entre processos (None = entrega em memória, o padrão)
+            cls._instance.transport = None
+            cls._instance.groups = {}
+            cls._instance._transport_connected = False
+            # request(): futures pendentes por correlation_id e tópicos de resposta já roteados.
+            # O grupo de respostas é único por processo para o broker não entregar a outro main.
+            cls._instance._pending_requests = {}
+            cls._instance._reply_routes = set()
+            cls._instance._reply_group = f"replies-{uuid.uuid4().hex[:8]}"
+            # Handlers síncronos rodam aqui, nunca inline no event loop
+            cls._instance.handler_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="bus-handler")
         return cls._instance
 
-    def subscribe(self, topic, func):
+    def subscribe(self, topic, func, group=None):
+        """
+        `group` only matters with a cross-process transport: every group gets
+        each event once, and processes sharing a group split the work. It
+        defaults to the handler's qualified name, so N worker processes running
+        the same agent load-balance instead of all handling every event.
+        """
         if topic not in self.subscribers:
             self.subscribers[topic] = []
         self.subscribers[topic].append(func)
-        print(f"📡 EventBus: New subscriber for topic '{topic}'")
+        group = group or getattr(func, "__qualname__", repr(func))
+        self.groups.setdefault((topic, group), []).append(func)
+        logger.info(f"📡 EventBus: New subscriber for topic '{topic}'", extra={"topic": topic})
+        if self._transport_connected:
+            return asyncio.get_running_loop().create_task(self.transport.subscribe(topic, group))
+
+    def use_transport(self, transport):
+        """Routes publish/subscribe through `transport` (e.g. SocketTransport); call connect() next."""
+        if self._transport_connected:
+            raise RuntimeError("EventBus transport is already connected")
+        self.transport = transport
+
+    async def connect(self):
+        """Connects the transport and registers every subscription made so far."""
+        if self.transport is None or self._transport_connected:
+            return
+        await self.transport.connect(self._on_transport_message)
+        for topic, group in self.groups:
+            await self.transport.subscribe(topic, group)
+        self._transport_connected = True
+
+    async def _on_transport_message(self, topic, group, data):
+        # Erros sobem para o transporte, que pede reentrega (at-least-once)
+        await asyncio.gather(*(self._dispatch(topic, func, data) for func in self.groups.get((topic, group), [])))
+
+    async def request(self, topic, data, reply_topic="REPORT_READY", error_topic="ERROR", timeout: float = 30.0):
+        """
+        Publishes `data` on `topic` and waits for the `reply_topic` event that
+        carries the same correlation id (one is generated if `data` has none).
+        An `error_topic` event with that id raises RequestFailed; no answer
+        within `timeout` seconds raises asyncio.TimeoutError. Concurrent
+        requests on one bus never see each other's replies.
+        """
+        correlation_id = correlation_id_of(data)
+        if correlation_id is None:
+            correlation_id = new_correlation_id()
+            if isinstance(data, ColumnarPayload):
+                data.meta["correlation_id"] = correlation_id
+            else:
+                data = {**data, "correlation_id": correlation_id}
+        await self._route_replies(reply_topic, self._resolve_reply)
+        await self._route_replies(error_topic, self._resolve_error)
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending_requests[correlation_id] = future
+
+        async def exchange():
+            # Com entrega direta o pipeline inteiro roda dentro do publish: o timeout cobre os dois
+            await self.publish(topic, data)
+            return await future
 
-    async def publish(self, topic, data):
-        if topic in self.subscribers:
-            print(f"📨 EventBus: Publishing to '{topic}' with payload size {len(str(data))}")
-            tasks = []
-            for func in self.subscribers[topic]:
+        try:
+            return await asyncio.wait_for(exchange(), timeout)
+        finally:
+            self._pending_requests.pop(correlation_id, None)
+
+    async def _route_replies(self, topic, resolver):
+        if topic not in self._reply_routes:
+            self._reply_routes.add(topic)
+            pending = self.subscribe(topic, resolver, group=self._reply_group)
+            if pending is not None:
+                await pending  # assinatura registrada no broker antes de publicar
+
+    async def _resolve_reply(self, data):
+        future = self._pending_requests.get(correlation_id_of(data))
+        if future is not None and not future.done():
+            future.set_result(data)
+
+    async def _resolve_error(self, data):
+        future = self._pending_requests.get(correlation_id_of(data))
+        if future is not None and not future.done():
+            future.set_exception(RequestFailed(data))
+
+    def configure_topic(self, topic, maxsize: int = 1000, workers: int = 4, policy: str = "block"):
+        """
+        Switches `topic` to queued delivery: publish() enqueues into a bounded
+        queue (at most `maxsize` in-flight events) and returns, and `workers`
+        consumers deliver events to the subscribers.
+
+        When the queue is full, `policy` decides: "block" waits for room
+        (backpressure on the publisher), "drop_oldest" discards the oldest
+        queued event, "reject" raises BackpressureError.
+        """
+        if policy not in BACKPRESSURE_POLICIES:
+            raise ValueError(f"Unknown backpressure policy: {policy}")
+        if maxsize < 1 or workers < 1:
+            raise ValueError("maxsize and workers must be >= 1")
+        current = self.topic_queues.get(topic)
+        if current is not None and current.tasks:
+            raise ValueError(f"Topic '{topic}' already has running workers; close() the bus first")
+        self.topic_queues[topic] = TopicQueue(maxsize, workers, policy)
+
+    async def publish(self, topic, data, key=None):
+        """
+        `key` only matters with a cross-process transport: events with the same
+        key reach the same consumer process in every group (e.g. all pages of
+        one stream, keyed by correlation_id, land in one BI worker).
+        """
+        size = payload_size(data)
+        telemetry.count("event_bus_published_total", topic=topic)
+        telemetry.count("event_bus_bytes_total", size, topic=topic)
+        if self.transport is not None:
+            # Os assinantes podem estar em outros processos: o broker decide a entrega
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"📨 EventBus: Publishing to '{topic}' via {type(self.transport).__name__}",
+                             extra={"topic": topic, "bytes": size})
+            await self.transport.publish(topic, data, key=key)
+            return
+
+        if topic not in self.subscribers:
+            logger.warning(f"⚠️ EventBus: No subscribers for '{topic}'", extra={"topic": topic})
+            return
+
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"📨 EventBus: Publishing to '{topic}'", extra={"topic": topic, "bytes": size})
+        topic_queue = self.topic_queues.get(topic)
+        if topic_queue is not None:
+            await self._enqueue(topic, topic_queue, data)
+            return
+
+        # Entrega direta: o publisher espera todos os handlers
+        await asyncio.gather(*(self._dispatch(topic, func, data) for func in self.subscribers[topic]))
+
+    async def _enqueue(self, topic, topic_queue: TopicQueue, data):
+        if topic_queue.queue is None:
+            self._start_workers(topic, topic_queue)
+        queue = topic_queue.queue
+
+        if queue.full():
+            if topic_queue.policy == "reject":
+                topic_queue.rejected += 1
+                raise BackpressureError(f"Queue for '{topic}' is full ({topic_queue.maxsize} events)")
+            if topic_queue.policy == "drop_oldest":
+                queue.get_nowait()
+                queue.task_done()
+                topic_queue.dropped += 1
+
+        await queue.put(data)
+        topic_queue.published += 1
+        topic_queue.max_depth = max(topic_queue.max_depth, queue.qsize())
+
+    def _start_workers(self, topic, topic_queue: TopicQueue):
+        topic_queue.queue = asyncio.Queue(maxsize=topic_queue.maxsize)
+        loop = asyncio.get_running_loop()
+        topic_queue.tasks = [loop.create_task(self._worker(topic, topic_queue)) for _ in range(topic_queue.workers)]
+
+    async def _worker(self, topic, topic_queue: TopicQueue):
+        queue = topic_queue.queue
+        while True:
+            data = await queue.get()
+            try:
+                for func in list(self.subscribers.get(topic, [])):
+                    try:
+                        await self._dispatch(topic, func, data)
+                    except Exception as e:
+                        # Um handler com erro não pode derrubar o worker
+                        logger.error(f"❌ EventBus: Handler error on '{topic}': {e}", extra={"topic": topic})
+            finally:
+                queue.task_done()
+
+    async def _dispatch(self, topic, func, data):
+        started = time.perf_counter()
+        try:
+            # Spans abertos pelo handler herdam o correlation_id do evento como trace_id
+            with trace(correlation_id_of(data)), telemetry.span("bus.dispatch", topic=topic):
                 if asyncio.iscoroutinefunction(func):
-                    tasks.append(asyncio.create_task(func(data)))
+                    await func(data)
                 else:
-                    # Se não for async, executa direto (fallback)
-                    func(data)
+                    loop = asyncio.get_running_loop()
+                    await loop.run_in_executor(self.handler_executor, func, data)
+        finally:
+            self.latency.setdefault(topic, LatencyStats()).record(time.perf_counter() - started)
+
+    async def join(self, topic=None):
+        """Waits until every queued event (of `topic`, or of all topics) has been handled."""
+        topics = [topic] if topic is not None else list(self.topic_queues)
+        for name in topics:
+            topic_queue = self.topic_queues.get(name)
+            if topic_queue is not None and topic_queue.queue is not None:
+                await topic_queue.queue.join()
+
+    async def close(self):
+        """Stops the queue workers (pending events are discarded) and disconnects the transport."""
+        for topic_queue in self.topic_queues.values():
+            for task in topic_queue.tasks:
+                task.cancel()
+            await asyncio.gather(*topic_queue.tasks, return_exceptions=True)
+            topic_queue.tasks = []
+            topic_queue.queue = None
+        if self._transport_connected:
+            await self.transport.close()
+            self._transport_connected = False
 
-            if tasks:
-                await asyncio.gather(*tasks)
-        else:
-            print(f"⚠️ EventBus: No subscribers for '{topic}'")
+    def metrics(self) -> dict:
+        """Queue depth and handler latency per topic."""
+        result = {}
+        for topic in self.subscribers:
+            entry = {"handler_latency": self.latency[topic].snapshot() if topic in self.latency else LatencyStats().snapshot()}
+            topic_queue = self.topic_queues.get(topic)
+            if topic_queue is not None:
+                entry.update({
+                    "policy": topic_queue.policy,
+                    "workers": topic_queue.workers,
+                    "queue_depth": topic_queue.queue.qsize() if topic_queue.queue is not None else 0,
+                    "max_depth": topic_queue.max_depth,
+                    "maxsize": topic_queue.maxsize,
+                    "published": topic_queue.published,
+                    "dropped": topic_queue.dropped,
+                    "rejected": topic_queue.rejected,
+                })
+            result[topic] = entry
+        return result
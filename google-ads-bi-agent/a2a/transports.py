@@ -0,0 +1,131 @@
+import asyncio
+import json
+import logging
+import struct
+import itertools
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from a2a.payloads import encode_payload, decode_payload
+
+logger = logging.getLogger(__name__)
+
+# --- Wire format shared by SocketTransport and the LocalBroker ---
+# frame = u32 header length | JSON header | u32 body length | body bytes
+
+_LENGTH = struct.Struct(">I")
+
+
+async def write_frame(writer: asyncio.StreamWriter, header: dict, body: bytes = b""):
+    raw_header = json.dumps(header).encode("utf-8")
+    writer.write(_LENGTH.pack(len(raw_header)) + raw_header + _LENGTH.pack(len(body)) + body)
+    await writer.drain()
+
+
+async def read_frame(reader: asyncio.StreamReader) -> Tuple[dict, bytes]:
+    (header_len,) = _LENGTH.unpack(await reader.readexactly(_LENGTH.size))
+    header = json.loads(await reader.readexactly(header_len))
+    (body_len,) = _LENGTH.unpack(await reader.readexactly(_LENGTH.size))
+    body = await reader.readexactly(body_len) if body_len else b""
+    return header, body
+
+
+def parse_address(address: str) -> Tuple[str, int]:
+    host, _, port = address.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+
+# Handler for delivered messages: (topic, group, data) -> awaitable; raising means "nack"
+MessageHandler = Callable[[str, str, object], Awaitable[None]]
+
+
+class SocketTransport:
+    """
+    EventBus transport over a LocalBroker (python -m a2a.broker).
+
+    Published events go to the broker; each subscription joins a consumer
+    group, and the broker delivers every event once per group, to one
+    consumer of that group. Events are acked only after the handler returns,
+    so a crash or error means redelivery (at-least-once: handlers must
+    tolerate duplicates). `prefetch` caps unacked events per connection.
+    """
+
+    def __init__(self, address: str = "127.0.0.1:7800", prefetch: int = 16):
+        self.address = address
+        self.prefetch = prefetch
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._reader_task: Optional[asyncio.Task] = None
+        self._handler: Optional[MessageHandler] = None
+        self._pending_acks: Dict[int, asyncio.Future] = {}
+        self._refs = itertools.count()
+        self._write_lock = asyncio.Lock()
+        self._inflight = set()
+
+    async def connect(self, handler: MessageHandler):
+        host, port = parse_address(self.address)
+        self._handler = handler
+        self._reader, self._writer = await asyncio.open_connection(host, port)
+        self._reader_task = asyncio.get_running_loop().create_task(self._read_loop())
+
+    async def subscribe(self, topic: str, group: str):
+        await self._send({"op": "sub", "topic": topic, "group": group, "prefetch": self.prefetch})
+
+    async def publish(self, topic: str, data, key: Optional[str] = None):
+        """
+        Returns once the broker has accepted the event. Events with the same
+        `key` go to the same consumer in every group (see LocalBroker).
+        """
+        codec, body = encode_payload(data)
+        ref = next(self._refs)
+        future = asyncio.get_running_loop().create_future()
+        self._pending_acks[ref] = future
+        header = {"op": "pub", "topic": topic, "codec": codec, "ref": ref}
+        if key is not None:
+            header["key"] = key
+        await self._send(header, body)
+        await future
+
+    async def _send(self, header: dict, body: bytes = b""):
+        async with self._write_lock:
+            await write_frame(self._writer, header, body)
+
+    async def _read_loop(self):
+        try:
+            while True:
+                header, body = await read_frame(self._reader)
+                if header["op"] == "puback":
+                    future = self._pending_acks.pop(header["ref"], None)
+                    if future is not None and not future.done():
+                        future.set_result(None)
+                elif header["op"] == "msg":
+                    task = asyncio.get_running_loop().create_task(self._deliver(header, body))
+                    self._inflight.add(task)
+                    task.add_done_callback(self._inflight.discard)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            for future in self._pending_acks.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("Broker connection lost"))
+            self._pending_acks.clear()
+
+    async def _deliver(self, header: dict, body: bytes):
+        try:
+            await self._handler(header["topic"], header["group"], decode_payload(header["codec"], body))
+        except Exception as e:
+            logger.error(f"❌ SocketTransport: Handler failed for '{header['topic']}' ({e}); requesting redelivery.",
+                         extra={"topic": header["topic"], "event_id": header["id"]})
+            await self._send({"op": "nack", "id": header["id"]})
+        else:
+            await self._send({"op": "ack", "id": header["id"]})
+
+    async def close(self):
+        if self._inflight:
+            await asyncio.gather(*self._inflight, return_exceptions=True)
+        if self._writer is not None:
+            self._writer.close()
+            try:
+                await self._writer.wait_closed()
+            except ConnectionError:
+                pass
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+            await asyncio.gather(self._reader_task, return_exceptions=True)
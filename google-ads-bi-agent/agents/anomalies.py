@@ -0,0 +1,168 @@
+import warnings
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Dias anteriores usados como linha de base de cada campanha
+BASELINE_DAYS = 28
+# Dias recentes somados na queda de conversões (um dia só é ruidoso demais para contagens)
+RECENT_DAYS = 3
+# Mínimo de dias com impressões na linha de base; campanhas mais novas não são avaliadas
+MIN_ACTIVE_DAYS = 7
+# |z| a partir do qual um desvio vira achado
+THRESHOLD = 3.0
+# Fator que torna o MAD comparável ao desvio-padrão em dados normais
+MAD_SCALE = 1.4826
+# Escala mínima, relativa à mediana: séries planas (ex.: gasto travado no orçamento diário)
+# ainda acusam um salto, sem que variações de centavos virem achados
+MIN_RELATIVE_SCALE = 0.05
+
+SERIES_COLUMNS = ["campaign_id", "campaign_name", "clicks", "impressions", "cost_micros", "conversions"]
+SIGNAL_LABELS = {
+    "spend_spike": "pico de gasto",
+    "conversion_drop": "queda de conversões",
+    "ctr_collapse": "queda de CTR",
+}
+
+
+def daily_matrices(frame: pd.DataFrame, start: date, days: int) -> Tuple[np.ndarray, np.ndarray, Dict[str, np.ndarray]]:
+    """
+    Linhas diárias (campaign_id, date, métricas) -> ids, nomes e uma matriz campanhas x dias
+    por métrica. Dias sem linha ficam com 0 (campanha sem entrega); linhas repetidas somam.
+    """
+    codes, ids = pd.factorize(frame['campaign_id'], sort=False)
+    day = (frame['date'].to_numpy().astype('datetime64[D]') - np.datetime64(start, 'D')).astype('int64')
+    inside = (day >= 0) & (day < days)
+    cells = codes[inside] * days + day[inside]
+    size = len(ids) * days
+    matrices = {}
+    for metric in ("cost_micros", "conversions", "clicks", "impressions"):
+        values = frame[metric].to_numpy(dtype='float64')[inside]
+        matrices[metric] = np.bincount(cells, weights=values, minlength=size).reshape(len(ids), days)
+    matrices["cost"] = matrices.pop("cost_micros") / 1_000_000
+    # Nome mais recente de cada campanha
+    names = pd.Series(frame['campaign_name'].to_numpy()).groupby(codes).last().to_numpy()
+    return np.asarray(ids, dtype=object), names, matrices
+
+
+def robust_zscore(value: np.ndarray, baseline: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    z-score de `value` (uma coluna por campanha) contra cada linha de `baseline`, com mediana
+    e MAD (um pico isolado na linha de base não infla a escala). MAD zero cai para o desvio-padrão,
+    e a escala nunca fica abaixo de MIN_RELATIVE_SCALE x mediana; NaN na linha de base é ignorado.
+    Devolve (z, mediana).
+    """
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # linhas só com NaN
+        median = np.nanmedian(baseline, axis=1)
+        mad = np.nanmedian(np.abs(baseline - median[:, None]), axis=1) * MAD_SCALE
+        scale = np.where(mad > 0, mad, np.nanstd(baseline, axis=1))
+        scale = np.maximum(scale, MIN_RELATIVE_SCALE * np.abs(median))
+    valid = np.isfinite(value) & np.isfinite(median) & (scale > 0)
+    z = np.zeros_like(value, dtype='float64')
+    np.divide(value - median, scale, out=z, where=valid)
+    return z, median
+
+
+def detect_anomalies(frame: pd.DataFrame, as_of: date, baseline_days: int = BASELINE_DAYS,
+                     recent_days: int = RECENT_DAYS, threshold: float = THRESHOLD,
+                     min_active_days: int = MIN_ACTIVE_DAYS) -> pd.DataFrame:
+    """
+    Achados por campanha no último dia (`as_of`), todas as campanhas de uma vez:
+
+    - spend_spike: custo do dia com z robusto >= threshold e pelo menos o dobro da mediana;
+    - ctr_collapse: CTR do dia com z robusto <= -threshold, abaixo de metade da mediana
+      (só com 100+ impressões no dia);
+    - conversion_drop: conversões dos últimos `recent_days` abaixo do esperado pela média
+      diária (z de Poisson via Anscombe <= -threshold), com o gasto ainda em pelo menos metade do ritmo.
+
+    A linha de base são os `baseline_days` dias antes da janela recente. Uma linha por achado,
+    do mais severo (|z|) ao menos severo.
+    """
+    days = baseline_days + recent_days
+    start = as_of - timedelta(days=days - 1)
+    columns = ["campaign_id", "campaign_name", "signal", "start", "end", "value", "baseline", "zscore"]
+    if frame.empty:
+        return pd.DataFrame(columns=columns)
+    ids, names, m = daily_matrices(frame, start, days)
+    base = slice(0, baseline_days)
+    active = (m["impressions"][:, base] > 0).sum(axis=1) >= min_active_days
+
+    # Pico de gasto: último dia contra a linha de base
+    cost_today = m["cost"][:, -1]
+    cost_z, cost_median = robust_zscore(cost_today, m["cost"][:, base])
+    spike = active & (cost_z >= threshold) & (cost_today >= 2 * cost_median) & (cost_today > 0)
+
+    # Queda de CTR: dias sem impressões não entram na mediana
+    impressions = m["impressions"]
+    ctr = np.divide(m["clicks"] * 100, impressions, out=np.full(impressions.shape, np.nan), where=impressions > 0)
+    ctr_z, ctr_median = robust_zscore(ctr[:, -1], ctr[:, base])
+    collapse = active & (impressions[:, -1] >= 100) & (ctr_z <= -threshold) & (ctr[:, -1] <= 0.5 * ctr_median)
+
+    # Queda de conversões: contagens pequenas, então Poisson sobre a janela recente, com a
+    # transformada de Anscombe (aproximadamente normal de variância 1 mesmo perto de zero)
+    expected = m["conversions"][:, base].mean(axis=1) * recent_days
+    observed = m["conversions"][:, baseline_days:].sum(axis=1)
+    conv_z = 2 * (np.sqrt(observed + 0.375) - np.sqrt(expected + 0.375))
+    still_spending = m["cost"][:, baseline_days:].sum(axis=1) >= 0.5 * m["cost"][:, base].mean(axis=1) * recent_days
+    drop = active & (conv_z <= -threshold) & still_spending
+
+    recent_start, end = (as_of - timedelta(days=recent_days - 1)).isoformat(), as_of.isoformat()
+    parts = []
+    for signal, mask, first_day, value, baseline, z in (
+        ("spend_spike", spike, end, cost_today, cost_median, cost_z),
+        ("ctr_collapse", collapse, end, ctr[:, -1], ctr_median, ctr_z),
+        ("conversion_drop", drop, recent_start, observed, expected, conv_z),
+    ):
+        rows = np.flatnonzero(mask)
+        parts.append(pd.DataFrame({
+            "campaign_id": ids[rows], "campaign_name": names[rows], "signal": signal,
+            "start": first_day, "end": end, "value": value[rows].round(2),
+            "baseline": baseline[rows].round(2), "zscore": z[rows].round(2),
+        }, columns=columns))
+    findings = pd.concat(parts, ignore_index=True)
+    return findings.iloc[np.argsort(-findings['zscore'].abs().to_numpy(), kind="stable")].reset_index(drop=True)
+
+
+def find_anomalies(store, customer_id: str, as_of: Optional[date] = None, **kwargs) -> Optional[pd.DataFrame]:
+    """
+    detect_anomalies sobre as séries diárias do CampaignStore local (uma leitura, partições
+    podadas pela janela). `as_of` é o último dia completo (padrão: ontem). None sem dados locais.
+    """
+    as_of = as_of or date.today() - timedelta(days=1)
+    days = kwargs.get("baseline_days", BASELINE_DAYS) + kwargs.get("recent_days", RECENT_DAYS)
+    table = store.scan([customer_id], as_of - timedelta(days=days - 1), as_of, columns=SERIES_COLUMNS)
+    if table.num_rows == 0:
+        return None
+    return detect_anomalies(table.to_pandas(), as_of, **kwargs)
+
+
+def format_anomalies(findings: Optional[pd.DataFrame], limit: int = 10) -> str:
+    """Achados mais severos, uma linha cada, para o prompt do LLM."""
+    if findings is None:
+        return "Sem séries diárias locais para esta conta."
+    if findings.empty:
+        return "Nenhuma anomalia nas séries diárias locais."
+    lines = []
+    for row in findings.head(limit).itertuples(index=False):
+        label = SIGNAL_LABELS[row.signal]
+        if row.signal == "conversion_drop":
+            lines.append(f"- {row.campaign_name}: {label} ({row.start} a {row.end}): {row.value:g} vs "
+                         f"{row.baseline:g} esperadas (z={row.zscore:+.1f})")
+        else:
+            unit = "%" if row.signal == "ctr_collapse" else ""
+            lines.append(f"- {row.campaign_name}: {label} em {row.end}: {row.value:.2f}{unit} vs "
+                         f"mediana {row.baseline:.2f}{unit} (z={row.zscore:+.1f})")
+    if len(findings) > limit:
+        lines.append(f"- ... e mais {len(findings) - limit} achados")
+    return "\n".join(lines)
+
+
+def findings_to_records(findings: Optional[pd.DataFrame]) -> List[Dict]:
+    """Achados como lista de dicts (JSON) para o relatório."""
+    if findings is None:
+        return []
+    return [{key: (value.item() if hasattr(value, "item") else value) for key, value in record.items()}
+            for record in findings.to_dict("records")]
@@ -0,0 +1,346 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+import pandas as pd
+
+from a2a.payloads import ColumnarPayload
+from agents.anomalies import findings_to_records
+from agents.extraction_scheduler import ExtractionScheduler
+from utils.rate_limit import TokenBucket
+from utils.telemetry import telemetry, trace
+
+logger = logging.getLogger(__name__)
+
+# Status gravados por customer. DONE/UNCHANGED/EMPTY contam como concluídos (não rodam de novo
+# ao retomar o mesmo run); FAILED é tentado outra vez. EMPTY: a extração não trouxe linhas
+# (conta sem veiculação no período), nada a analisar.
+DONE = "done"
+UNCHANGED = "unchanged"
+EMPTY = "empty"
+FAILED = "failed"
+COMPLETED = (DONE, UNCHANGED, EMPTY)
+
+
+def frame_fingerprint(df: pd.DataFrame, *parts: str) -> str:
+    """
+    Hash do conteúdo extraído (mais `parts`: período, prompt, modelo), independente da ordem
+    das linhas e colunas: a API não garante ordem, e a mesma conta com os mesmos números deve
+    dar o mesmo fingerprint de uma noite para a outra.
+    """
+    digest = hashlib.sha256("\x1f".join(parts).encode("utf-8"))
+    digest.update("\x1f".join(sorted(map(str, df.columns))).encode("utf-8"))
+    if len(df):
+        rows = pd.util.hash_pandas_object(df[sorted(df.columns)], index=False).to_numpy()
+        rows.sort()
+        digest.update(rows.tobytes())
+    return digest.hexdigest()[:32]
+
+
+class BatchCheckpoint:
+    """
+    Estado local (SQLite) de cada customer em cada execução do lote: uma linha por
+    (run_id, customer_id), gravada assim que a conta termina. Serve para retomar um run
+    interrompido e para achar o fingerprint do último relatório de uma conta.
+    """
+
+    def __init__(self, path: str = "data/batch_state.sqlite"):
+        self.path = path
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS batch_checkpoints (
+                run_id TEXT NOT NULL,
+                customer_id TEXT NOT NULL,
+                status TEXT NOT NULL,
+                fingerprint TEXT,
+                report_run TEXT,
+                rows INTEGER NOT NULL DEFAULT 0,
+                error TEXT,
+                finished_at REAL NOT NULL,
+                PRIMARY KEY (run_id, customer_id)
+            )
+        """)
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_batch_customer ON batch_checkpoints(customer_id, finished_at)"
+        )
+        self._conn.commit()
+
+    def record(self, run_id: str, customer_id: str, status: str, fingerprint: Optional[str] = None,
+               report_run: Optional[str] = None, rows: int = 0, error: Optional[str] = None):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO batch_checkpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (run_id, customer_id, status, fingerprint, report_run, rows, error, time.time()),
+            )
+            self._conn.commit()
+
+    def completed(self, run_id: str) -> Set[str]:
+        """Customers já concluídos neste run (pulados ao retomar)."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT customer_id FROM batch_checkpoints WHERE run_id = ? AND status IN (?, ?, ?)",
+                (run_id, *COMPLETED),
+            ).fetchall()
+        return {row[0] for row in rows}
+
+    def last_report(self, customer_id: str, before_run: str) -> Optional[Dict[str, str]]:
+        """Fingerprint e run do último relatório concluído da conta em outro run (ou None)."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT fingerprint, report_run FROM batch_checkpoints "
+                "WHERE customer_id = ? AND run_id != ? AND status IN (?, ?, ?) AND fingerprint IS NOT NULL "
+                "ORDER BY finished_at DESC LIMIT 1",
+                (customer_id, before_run, *COMPLETED),
+            ).fetchone()
+        return {"fingerprint": row[0], "report_run": row[1]} if row else None
+
+    def close(self):
+        self._conn.close()
+
+
+def _json_default(value: Any) -> Any:
+    # Escalares numpy (np.int64, np.float64, ...) e datas
+    if hasattr(value, "item"):
+        return value.item()
+    return str(value)
+
+
+class ReportWriter:
+    """
+    Relatórios de um run em `<root>/<run_id>/reports.jsonl`, uma linha por customer, anexada
+    e descarregada no disco antes do checkpoint. Uma queda no meio de uma escrita deixa no
+    máximo uma linha incompleta no fim, descartada ao reabrir; uma queda entre a linha e o
+    checkpoint repete a conta ao retomar (vale a última linha de cada customer).
+    `to_parquet` compacta o JSONL em uma tabela com uma linha por customer.
+    """
+
+    def __init__(self, root: str, run_id: str):
+        self.directory = os.path.join(root, run_id)
+        os.makedirs(self.directory, exist_ok=True)
+        self.path = os.path.join(self.directory, "reports.jsonl")
+        self._lock = threading.Lock()
+        self._repair()
+        self._file = open(self.path, "a", encoding="utf-8")
+
+    def _repair(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "rb+") as file:
+            data = file.read()
+            if data and not data.endswith(b"\n"):
+                file.truncate(data.rfind(b"\n") + 1)
+                logger.warning(f"⚠️ BatchRunner: Linha incompleta descartada em {self.path}")
+
+    def write(self, record: Dict):
+        line = json.dumps(record, default=_json_default, ensure_ascii=False) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def records(self) -> List[Dict]:
+        """Última linha de cada customer, na ordem em que foram gravadas."""
+        latest = {}
+        with open(self.path, encoding="utf-8") as file:
+            for line in file:
+                if line.strip():
+                    record = json.loads(line)
+                    latest.pop(record["customer_id"], None)
+                    latest[record["customer_id"]] = record
+        return list(latest.values())
+
+    def to_parquet(self) -> str:
+        """Uma linha por customer: status, totais do período, nº de anomalias e o relatório em JSON."""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        rows = []
+        for record in self.records():
+            report = record.get("report") or {}
+            stats = report.get("period_stats") or {}
+            rows.append({
+                "run_id": record["run_id"],
+                "customer_id": record["customer_id"],
+                "status": record["status"],
+                "fingerprint": record.get("fingerprint"),
+                "report_run": record.get("report_run"),
+                "rows": record.get("rows", 0),
+                "finished_at": record["finished_at"],
+                "total_spend": stats.get("total_spend"),
+                "total_conversions": stats.get("total_conversions"),
+                "global_cpa": stats.get("global_cpa"),
+                "anomalies": len(report["anomalies"]) if "anomalies" in report else None,
+                "report": json.dumps(report, default=_json_default, ensure_ascii=False) if report else None,
+            })
+        path = os.path.join(self.directory, "reports.parquet")
+        schema = pa.schema([
+            ("run_id", pa.string()), ("customer_id", pa.string()), ("status", pa.string()),
+            ("fingerprint", pa.string()), ("report_run", pa.string()), ("rows", pa.int64()),
+            ("finished_at", pa.float64()), ("total_spend", pa.float64()), ("total_conversions", pa.int64()),
+            ("global_cpa", pa.float64()), ("anomalies", pa.int64()), ("report", pa.string()),
+        ])
+        pq.write_table(pa.Table.from_pylist(rows, schema=schema), path)
+        return path
+
+    def close(self):
+        self._file.close()
+
+
+class BatchRunner:
+    """
+    Execução noturna retomável: extrai -> analisa -> grava cada customer da lista, sem um
+    timeout global (cada conta tem o seu). Usa o GoogleAdsAgent e o BIAnalyticsAgent
+    diretamente, sem passar pelo EventBus.
+
+    - Checkpoint por customer no BatchCheckpoint: rodar de novo o mesmo `run_id` (ex.: depois
+      de uma queda ou de um Ctrl+C) pula as contas concluídas e tenta de novo as que falharam.
+    - Contas com as entradas idênticas às do último relatório (mesmo fingerprint: extração,
+      período, prompt, modelo e o contexto do CampaignStore) não são analisadas: a linha aponta
+      para o run do relatório (`report_run`). Relatórios sem IA (modo degradado) são gravados
+      sem fingerprint, para serem refeitos quando o LLM voltar; erro do LLM é FAILED.
+    - Contas sem linhas no período ficam EMPTY (concluídas, sem relatório nem falha).
+    - Extração com retries/backoff/quota do ExtractionScheduler; `analysis_timeout` por conta.
+    """
+
+    def __init__(self, ads_agent, bi_agent, checkpoint: BatchCheckpoint, output_dir: str = "data/reports",
+                 run_id: Optional[str] = None, concurrency: int = 8, max_retries: int = 3,
+                 attempt_timeout: Optional[float] = 300.0, analysis_timeout: Optional[float] = 300.0,
+                 requests_per_second: Optional[float] = None, date_range: str = "LAST_30_DAYS",
+                 incremental: bool = False, window_days: int = 30, force: bool = False):
+        self.ads_agent = ads_agent
+        self.bi_agent = bi_agent
+        self.checkpoint = checkpoint
+        self.output_dir = output_dir
+        # Um run por noite por padrão: relançar no mesmo dia retoma
+        self.run_id = run_id or date.today().isoformat()
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.attempt_timeout = attempt_timeout
+        self.analysis_timeout = analysis_timeout
+        self.requests_per_second = requests_per_second
+        self.date_range = date_range
+        self.incremental = incremental
+        self.window_days = window_days
+        self.force = force
+
+    def _fingerprint(self, df: pd.DataFrame, context: Optional[Dict] = None) -> str:
+        period = f"incremental:{self.window_days}" if self.incremental else self.date_range
+        parts = [period, getattr(self.bi_agent, "prompt_fingerprint", ""), getattr(self.bi_agent, "model_name", "")]
+        if context and (context.get("history") is not None or context.get("anomalies") is not None):
+            # Histórico e anomalias também entram no prompt: mudam com o store e com o dia (as_of),
+            # mesmo com a extração do período igual. Sem dados locais, o dia não muda o relatório
+            parts.append(json.dumps({
+                "as_of": context.get("as_of"),
+                "history": context.get("history"),
+                "anomalies": findings_to_records(context.get("anomalies")),
+            }, sort_keys=True, default=_json_default))
+        return frame_fingerprint(df, *parts)
+
+    async def run(self, customer_ids: Iterable[str]) -> Dict:
+        """Processa os customers pendentes deste run e devolve o resumo (contagens por status, throughput)."""
+        customer_ids = list(dict.fromkeys(customer_ids))
+        done = await asyncio.to_thread(self.checkpoint.completed, self.run_id)
+        pending = [customer_id for customer_id in customer_ids if customer_id not in done]
+        logger.info(f"▶️ BatchRunner: run {self.run_id}: {len(pending)} pending, {len(customer_ids) - len(pending)} "
+                    f"already done.", extra={"run_id": self.run_id, "customers": len(customer_ids)})
+
+        writer = ReportWriter(self.output_dir, self.run_id)
+        counts = {DONE: 0, UNCHANGED: 0, EMPTY: 0, FAILED: 0}
+        failed = []
+
+        async def fetch(customer_id: str) -> pd.DataFrame:
+            with trace(f"{self.run_id}:{customer_id}"):
+                return await self.ads_agent.extract(customer_id, self.date_range, incremental=self.incremental,
+                                                    window_days=self.window_days)
+
+        async def persist(customer_id: str, status: str, rows: int = 0, **fields):
+            record = {"run_id": self.run_id, "customer_id": customer_id, "status": status, "rows": rows,
+                      "finished_at": time.time(), **fields}
+            if status != FAILED:
+                # Linha no disco antes do checkpoint: um customer concluído sempre tem relatório
+                await asyncio.to_thread(writer.write, record)
+            await asyncio.to_thread(self.checkpoint.record, self.run_id, customer_id, status,
+                                    fields.get("fingerprint"), fields.get("report_run"), rows, fields.get("error"))
+            counts[status] += 1
+            if status == FAILED:
+                failed.append(customer_id)
+            telemetry.count("batch_customers_total", status=status)
+
+        async def analyze(customer_id: str, df: pd.DataFrame):
+            with trace(f"{self.run_id}:{customer_id}"):
+                try:
+                    await self._analyze(customer_id, df, persist)
+                except Exception as e:
+                    logger.error(f"❌ BatchRunner: {customer_id} failed: {e!r}", extra={"customer_id": customer_id})
+                    await persist(customer_id, FAILED, len(df), error=repr(e))
+
+        scheduler = ExtractionScheduler(
+            fetch=fetch,
+            concurrency=self.concurrency,
+            max_retries=self.max_retries,
+            attempt_timeout=self.attempt_timeout,
+            rate_limiter=TokenBucket(self.requests_per_second) if self.requests_per_second else None,
+        )
+        try:
+            extraction = await scheduler.run(pending, on_result=analyze)
+            for failure in extraction["failed"]:
+                await persist(failure["customer_id"], FAILED, error=failure["error"])
+        finally:
+            writer.close()
+
+        summary = {
+            "run_id": self.run_id,
+            "total_customers": len(customer_ids),
+            "skipped_completed": len(customer_ids) - len(pending),
+            **counts,
+            "failed_customers": failed,
+            "retries": extraction["retries"],
+            "rows": extraction["rows"],
+            "elapsed_s": extraction["elapsed_s"],
+            "customers_per_s": extraction["customers_per_s"],
+            "reports": writer.path,
+        }
+        logger.info(f"✅ BatchRunner: run {self.run_id} done ({counts[DONE]} analyzed, {counts[UNCHANGED]} unchanged, "
+                    f"{counts[EMPTY]} empty, {counts[FAILED]} failed).", extra={"run_id": self.run_id})
+        return summary
+
+    async def _analyze(self, customer_id: str, df: pd.DataFrame, persist):
+        if len(df) == 0:
+            logger.info(f"⏭️ BatchRunner: {customer_id} has no rows in the period.", extra={"customer_id": customer_id})
+            await persist(customer_id, EMPTY)
+            return
+
+        context = await self.bi_agent.load_context(customer_id)
+        fingerprint = self._fingerprint(df, context)
+        previous = None if self.force else await asyncio.to_thread(self.checkpoint.last_report, customer_id, self.run_id)
+        if previous is not None and previous["fingerprint"] == fingerprint:
+            logger.info(f"⏭️ BatchRunner: {customer_id} unchanged since run {previous['report_run']}.",
+                        extra={"customer_id": customer_id})
+            await persist(customer_id, UNCHANGED, len(df), fingerprint=fingerprint, report_run=previous["report_run"])
+            return
+
+        with telemetry.span("batch.analyze") as span:
+            report = await asyncio.wait_for(
+                self.bi_agent.generate_performance_report(ColumnarPayload(df, customer_id=customer_id), context=context),
+                timeout=self.analysis_timeout,
+            )
+            span.record(rows=len(df))
+        strategy = report.get("strategy") or {}
+        if "error" in report or "error" in strategy:
+            raise RuntimeError(report.get("error") or strategy["error"])
+        if "warning" in strategy:
+            # Só os números (LLM não configurado): sem fingerprint, a próxima noite analisa de novo
+            logger.warning(f"⚠️ BatchRunner: {customer_id} reported without AI insights: {strategy['warning']}",
+                           extra={"customer_id": customer_id})
+            fingerprint = None
+        await persist(customer_id, DONE, len(df), fingerprint=fingerprint, report_run=self.run_id, report=report)
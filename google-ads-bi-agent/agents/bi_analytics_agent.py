@@ -1,18 +1,33 @@
+import asyncio
+import numpy as np
 import pandas as pd
 import json
 import os
-from typing import Dict, List, Any
-# Importação condicional para evitar crash se a lib não estiver instalada, embora esteja no reqs
-try:
-    from langchain_google_genai import ChatGoogleGenerativeAI
-    from langchain_core.prompts import ChatPromptTemplate
-    from langchain_core.output_parsers import JsonOutputParser
-    HAS_LANGCHAIN = True
-except ImportError:
-    HAS_LANGCHAIN = False
+import hashlib
+import logging
+import threading
+import importlib.util
+from collections import OrderedDict
+from datetime import date, timedelta
+from typing import Awaitable, Callable, Dict, List, Any, Optional, Union
+# LangChain/Gemini (~2-3s de import) só é carregado na primeira análise (ver _ensure_llm);
+# aqui só verificamos se está instalado, sem importar
+HAS_LANGCHAIN = all(importlib.util.find_spec(name) is not None for name in ("langchain_google_genai", "langchain_core"))
 
 from pydantic import BaseModel, Field
 
+from a2a.payloads import ColumnarPayload
+from agents.llm_executor import LLMExecutor
+from agents.anomalies import find_anomalies, findings_to_records, format_anomalies
+from agents.metrics_pool import MetricsPool
+from agents.prompt_builder import build_table_view
+from agents.streaming_aggregator import StreamingAggregator
+from agents.trends import build_history, format_history
+from utils.llm_cache import LLMCache
+from utils.telemetry import telemetry
+
+logger = logging.getLogger(__name__)
+
 # --- Modelos de Saída (Structured Output) ---
 class ActionItem(BaseModel):
     action: str = Field(description="Ação recomendada (ex: 'Pausar Campanha', 'Aumentar Budget')")
@@ -25,87 +40,438 @@ class StrategicReport(BaseModel):
     key_insights: List[str] = Field(description="Lista de insights de mercado ou comportamento")
     recommended_actions: List[ActionItem] = Field(description="Lista de ações táticas")
 
+# --- Prompt (montado uma única vez, no __init__ do agente) ---
+SYSTEM_PROMPT = """
+Você é um Especialista Sênior em Performance de Google Ads (PPC).
+Sua missão é analisar os dados fornecidos e gerar um plano de ação tático.
+Não invente números. Use as estatísticas fornecidas.
+Seja direto, crítico e focado em ROI.
+"""
+
+HUMAN_PROMPT = """
+Analise os dados desta semana:
+
+--- ESTATÍSTICAS GERAIS ---
+Gasto Total: R$ {total_spend}
+Conversões: {total_conversions}
+CPA Global: R$ {global_cpa}
+
+--- DESTAQUES ---
+Campanhas Top (Scale): {top_campaigns}
+Campanhas Ineficientes (CPA Alto): {inefficient_campaigns}
+Gasto sem Retorno (Waste): {wasteful_spend}
+
+--- HISTÓRICO (dados locais) ---
+{history}
+
+--- ANOMALIAS (séries diárias por campanha, dados locais) ---
+{anomalies}
+
+--- TABELA (CSV; campanhas priorizadas, demais agregadas na última linha) ---
+{df_view}
+
+Gere um relatório estruturado respondendo: O que devo fazer para melhorar o resultado?
+{format_instructions}
+"""
+
+# Máximo de itens de cada lista de destaques repassados ao prompt
+PROMPT_LIST_LIMIT = 10
+
+# Streams encerrados lembrados para ignorar páginas reentregues depois do fim
+FINISHED_STREAMS_KEPT = 1024
+
+# Callback de resultados parciais (modo streaming): recebe o corpo de um REPORT_PARTIAL
+PartialCallback = Callable[[Dict], Awaitable[None]]
+
 # --- A Classe do Agente ---
 class BIAnalyticsAgent:
-    def __init__(self, bus):
+    def __init__(self, bus, llm_cache: Optional[LLMCache] = None, model_name: str = "gemini-1.5-flash",
+                 llm_executor: Optional[LLMExecutor] = None, prompt_token_budget: Optional[int] = None,
+                 stream_reports: bool = False, metrics_pool: Optional[MetricsPool] = None, store=None,
+                 stream_end_timeout: float = 10.0):
         self.bus = bus
         self.api_key = os.getenv("GOOGLE_API_KEY")
+        self.model_name = model_name
         self.llm = None
         self.parser = None
+        self.prompt = None
+        self.format_instructions = None
+        # Orçamento (tokens estimados) da tabela de campanhas no prompt; None = LLM_PROMPT_TOKEN_BUDGET ou 2000
+        self.prompt_token_budget = prompt_token_budget
+        # Limites globais (RPM/TPM, concorrência, retry) das chamadas ao LLM; None = montado no primeiro uso
+        self.llm_executor = llm_executor
+        self._executor_llm = None
+        # Cache de respostas do LLM (utils/llm_cache.py); None = LLM_CACHE_ENABLED decide no primeiro uso
+        self.llm_cache = llm_cache
+        # Muda sempre que o texto do prompt muda, invalidando respostas antigas do cache
+        self.prompt_fingerprint = hashlib.sha256((SYSTEM_PROMPT + HUMAN_PROMPT).encode("utf-8")).hexdigest()[:16]
+        # stream_reports: publica REPORT_PARTIAL (period_stats na hora, strategy conforme o LLM gera)
+        # antes do REPORT_READY final
+        self.stream_reports = stream_reports
+        # Com metrics_pool, as estatísticas são calculadas em outros processos (agents/metrics_pool.py)
+        self.metrics_pool = metrics_pool
+        # CampaignStore local (my_mcp/campaign_store.py): comparações WoW/MoM e linha de base
+        # lidas do armazenamento colunar, sem chamar a API
+        self.store = store
+        # Modo streaming, por correlation_id (ou customer_id): estatísticas agregadas página a página
+        # e, só quando o LLM vai precisar da tabela, as próprias páginas
+        self._pending_stats: Dict[str, StreamingAggregator] = {}
+        self._pending_batches: Dict[str, List[pd.DataFrame]] = {}
+        # batch_index das páginas já agregadas: reentregas (at-least-once do broker) não contam
+        # duas vezes, e o DATA_STREAM_END confere se todas chegaram (esperando até
+        # stream_end_timeout pelas que ainda estão a caminho)
+        self._pending_pages: Dict[str, set] = {}
+        self._page_events: Dict[str, asyncio.Event] = {}
+        self.stream_end_timeout = stream_end_timeout
+        # Streams já encerrados (os mais recentes): páginas reentregues depois do fim são ignoradas
+        self._finished_streams: "OrderedDict[str, None]" = OrderedDict()
 
-        if HAS_LANGCHAIN:
-            self.parser = JsonOutputParser(pydantic_object=StrategicReport)
-            if self.api_key:
-                try:
-                    self.llm = ChatGoogleGenerativeAI(
-                        model="gemini-1.5-flash",
-                        temperature=0.1,
-                        google_api_key=self.api_key
-                    )
-                except Exception as e:
-                    print(f"⚠️ Erro ao configurar Gemini: {e}")
-            else:
-                print("⚠️ GOOGLE_API_KEY ausente. BI Agent rodará em modo degradado (sem IA).")
+        # Parser, prompt e cliente Gemini são montados na primeira análise (_ensure_llm):
+        # workers e processos curtos que nunca analisam não pagam o import do LangChain.
+        # O import roda em uma thread (warm_up), nunca no event loop; o lock evita montar duas vezes
+        self._llm_ready = False
+        self._llm_lock = threading.Lock()
+        self._warm_up_task: Optional[asyncio.Task] = None
+        if HAS_LANGCHAIN and not self.api_key:
+            logger.warning("⚠️ GOOGLE_API_KEY ausente. BI Agent rodará em modo degradado (sem IA).")
 
         # Inscrevendo-se no EventBus
         self.bus.subscribe("DATA_FETCHED", self.handle_data)
+        self.bus.subscribe("DATA_BATCH", self.handle_batch)
+        self.bus.subscribe("DATA_STREAM_END", self.handle_stream_end)
+        self.bus.subscribe("ERROR", self.handle_error)
+
+    @property
+    def llm_enabled(self) -> bool:
+        """Se a análise vai usar o LLM, sem montá-lo (o cliente pode ainda não ter sido criado)."""
+        if self._llm_ready or self.llm is not None:
+            return bool(self.llm)
+        return HAS_LANGCHAIN and bool(self.api_key)
 
-    async def handle_data(self, payload: List[Dict]):
-        print("🤖 BI Agent: Recebi dados via A2A. Iniciando análise...")
+    async def warm_up(self):
+        """
+        _ensure_llm em uma thread: o import do LangChain (~2-3s) não trava o event loop.
+        Processos de longa duração podem agendá-lo no início, antes da primeira análise.
+        """
+        if self._llm_ready:
+            return self.llm
+        return await asyncio.to_thread(self._ensure_llm)
+
+    def start_warm_up(self):
+        """
+        Agenda warm_up em segundo plano (precisa de um loop rodando); close() cancela.
+        Sem LLM configurado não faz nada. Uma falha no import só é registrada no log.
+        """
+        if self._warm_up_task is None and self.llm_enabled and not self._llm_ready:
+            self._warm_up_task = asyncio.get_running_loop().create_task(self.warm_up())
+            self._warm_up_task.add_done_callback(self._warm_up_done)
+
+    @staticmethod
+    def _warm_up_done(task: asyncio.Task):
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"⚠️ BI Agent: Falha ao pré-carregar o LLM: {task.exception()!r}")
+
+    def _ensure_llm(self):
+        """Importa LangChain e monta parser, prompt e (com GOOGLE_API_KEY) o cliente Gemini, uma vez só."""
+        if self._llm_ready:
+            return self.llm
+        with self._llm_lock:
+            if not self._llm_ready:
+                self._build_llm()
+                self._llm_ready = True
+        return self.llm
+
+    def _build_llm(self):
+        if not HAS_LANGCHAIN:
+            return
+        from langchain_core.output_parsers import JsonOutputParser
+        from langchain_core.prompts import ChatPromptTemplate
+
+        self.parser = JsonOutputParser(pydantic_object=StrategicReport)
+        self.format_instructions = self.parser.get_format_instructions()
+        self.prompt = ChatPromptTemplate.from_messages([
+            ("system", SYSTEM_PROMPT),
+            ("human", HUMAN_PROMPT),
+        ])
+        # self.llm já definido (testes, chamadores) tem precedência
+        if self.llm is None and self.api_key:
+            try:
+                from langchain_google_genai import ChatGoogleGenerativeAI
+                # Retries ficam só no LLMExecutor (com os limites de RPM/TPM); os do cliente se somariam
+                self.llm = ChatGoogleGenerativeAI(
+                    model=self.model_name,
+                    temperature=0.1,
+                    google_api_key=self.api_key,
+                    max_retries=0
+                )
+            except Exception as e:
+                logger.warning(f"⚠️ Erro ao configurar Gemini: {e}")
+
+    async def _get_executor(self) -> LLMExecutor:
+        """
+        LLMExecutor sobre `prompt | llm`, montado no primeiro uso (testes e chamadores
+        podem trocar self.llm depois do __init__). Limites via ambiente:
+        LLM_REQUESTS_PER_MINUTE, LLM_TOKENS_PER_MINUTE, LLM_CONCURRENCY, LLM_BATCH_SIZE.
+        """
+        if self.llm_executor is None or (self._executor_llm is not None and self._executor_llm is not self.llm):
+            await self.warm_up()
+            tokens_per_minute = os.getenv("LLM_TOKENS_PER_MINUTE")
+            self.llm_executor = LLMExecutor(
+                self.prompt | self.llm,
+                parse=self.parser.invoke,
+                requests_per_minute=float(os.getenv("LLM_REQUESTS_PER_MINUTE", "60")),
+                tokens_per_minute=float(tokens_per_minute) if tokens_per_minute else None,
+                concurrency=int(os.getenv("LLM_CONCURRENCY", "4")),
+                batch_size=int(os.getenv("LLM_BATCH_SIZE", "1")),
+            )
+            self._executor_llm = self.llm
+        return self.llm_executor
+
+    def close(self):
+        """Cancela o warm_up pendente e encerra o pool de processos e o cache do LLM, se existirem."""
+        if self._warm_up_task is not None and not self._warm_up_task.done():
+            self._warm_up_task.cancel()
+        if self.metrics_pool is not None:
+            self.metrics_pool.close()
+        if self.llm_cache:
+            self.llm_cache.close()
+
+    def llm_metrics(self) -> Dict:
+        """Latência e tokens das chamadas ao LLM até aqui (vazio se o LLM nunca foi chamado)."""
+        return self.llm_executor.metrics() if self.llm_executor is not None else {}
+
+    async def handle_data(self, payload: ColumnarPayload):
+        ids = self._ids(payload.meta)
+        logger.info("🤖 BI Agent: Recebi dados via A2A. Iniciando análise...", extra={**ids, "rows": len(payload)})
         try:
-            report = await self.generate_performance_report(payload)
-            await self.bus.publish("REPORT_READY", report)
+            report = await self.generate_performance_report(payload, on_partial=self._partial_publisher(ids))
+            await self.bus.publish("REPORT_READY", {**report, **ids})
         except Exception as e:
-            print(f"❌ BI Agent Error: {e}")
-            import traceback
-            traceback.print_exc()
-            await self.bus.publish("ERROR", {"source": "BI_AGENT", "message": str(e)})
+            logger.exception(f"❌ BI Agent Error: {e}", extra=ids)
+            await self.bus.publish("ERROR", {"source": "BI_AGENT", "message": str(e), **ids})
+
+    async def handle_batch(self, payload: ColumnarPayload):
+        """Agrega cada página assim que ela chega (modo streaming); sem LLM, a página é descartada em seguida."""
+        key = self._stream_key(payload.meta)
+        if key in self._finished_streams:
+            logger.info("🤖 BI Agent: Página de stream já encerrado ignorada.", extra=self._ids(payload.meta))
+            return
+        pages = self._pending_pages.setdefault(key, set())
+        batch_index = payload.meta.get('batch_index')
+        if batch_index in pages:
+            logger.info(f"🤖 BI Agent: Página {batch_index} reentregue ignorada.", extra=self._ids(payload.meta))
+            return
+        pages.add(batch_index if batch_index is not None else ("sem índice", len(pages)))
+        if len(payload):
+            # Sem metrics_pool aqui: a página já é pequena e o agregador só guarda somas/heaps
+            with telemetry.span("hard_metrics", mode="stream") as span:
+                frame = self._add_ratios(self._to_frame(payload))
+                self._pending_stats.setdefault(key, StreamingAggregator()).update(frame)
+                span.record(rows=len(frame))
+            if self.llm_enabled:
+                self._pending_batches.setdefault(key, []).append(frame)
+        event = self._page_events.get(key)
+        if event is not None:
+            event.set()
 
-    async def generate_performance_report(self, raw_data: List[Dict]) -> Dict:
+    async def handle_stream_end(self, payload: Dict):
+        key = self._stream_key(payload)
+        received = await self._wait_for_pages(key, payload['batches'])
+        aggregator, frames = self._finish_stream(key)
+        ids = self._ids(payload)
+        logger.info(f"🤖 BI Agent: Stream finalizado ({payload['rows']} registros em {payload['batches']} páginas). Iniciando análise...",
+                    extra={**ids, "rows": payload['rows'], "batches": payload['batches']})
+        if received < payload['batches']:
+            # Relatório sobre parte das páginas pareceria completo: melhor falhar o pedido
+            message = f"Stream incompleto: {received} de {payload['batches']} páginas recebidas."
+            logger.error(f"❌ BI Agent: {message}", extra=ids)
+            await self.bus.publish("ERROR", {"source": "BI_AGENT", "message": message, **ids})
+            return
+        try:
+            if aggregator is None:
+                report = {"error": "Nenhum dado recebido para análise."}
+            else:
+                df = pd.concat(frames, ignore_index=True) if frames else None
+                report = await self._report_from_stats(aggregator.result(), df, self._partial_publisher(ids),
+                                                       customer_id=payload.get('customer_id'))
+            await self.bus.publish("REPORT_READY", {**report, **ids})
+        except Exception as e:
+            logger.exception(f"❌ BI Agent Error: {e}", extra=ids)
+            await self.bus.publish("ERROR", {"source": "BI_AGENT", "message": str(e), **ids})
+
+    async def handle_error(self, payload: Dict):
+        """ERROR de um stream em andamento (ex.: a API falhou no meio): descarta as páginas já agregadas."""
+        key = payload.get('correlation_id') or payload.get('customer_id')
+        if payload.get('source') != "BI_AGENT" and key in self._pending_pages:
+            self._finish_stream(key)
+            logger.info("🤖 BI Agent: Stream interrompido por erro; páginas descartadas.", extra=self._ids(payload))
+
+    async def _wait_for_pages(self, key: str, expected: int) -> int:
+        """
+        Páginas ainda a caminho quando o DATA_STREAM_END chega (tópicos diferentes são entregues
+        em paralelo) têm até stream_end_timeout segundos. Devolve quantas páginas chegaram.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.stream_end_timeout
+        while len(self._pending_pages.get(key, ())) < expected:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            event = self._page_events.setdefault(key, asyncio.Event())
+            event.clear()
+            try:
+                await asyncio.wait_for(event.wait(), remaining)
+            except asyncio.TimeoutError:
+                break
+        return len(self._pending_pages.get(key, ()))
+
+    def _finish_stream(self, key: str):
+        """Remove o estado do stream e o marca como encerrado. Devolve (agregador, páginas)."""
+        self._pending_pages.pop(key, None)
+        self._page_events.pop(key, None)
+        self._finished_streams[key] = None
+        while len(self._finished_streams) > FINISHED_STREAMS_KEPT:
+            self._finished_streams.popitem(last=False)
+        return self._pending_stats.pop(key, None), self._pending_batches.pop(key, [])
+
+    def _partial_publisher(self, ids: Dict) -> Optional[PartialCallback]:
+        """Publica cada resultado parcial como REPORT_PARTIAL (com os ids do pedido e um número de sequência)."""
+        if not self.stream_reports:
+            return None
+        sequence = 0
+
+        async def publish(partial: Dict):
+            nonlocal sequence
+            await self.bus.publish("REPORT_PARTIAL", {**partial, "sequence": sequence, **ids})
+            sequence += 1
+        return publish
+
+    @staticmethod
+    def _ids(meta: Dict) -> Dict:
+        """customer_id/correlation_id da entrada, repassados ao REPORT_READY/ERROR."""
+        return {key: meta[key] for key in ("customer_id", "correlation_id") if meta.get(key) is not None}
+
+    @staticmethod
+    def _stream_key(meta: Dict) -> str:
+        return meta.get('correlation_id') or meta['customer_id']
+
+    async def generate_performance_report(self, raw_data: Union[ColumnarPayload, pd.DataFrame, List[Dict]],
+                                          on_partial: Optional[PartialCallback] = None,
+                                          context: Optional[Dict] = None) -> Dict:
         """
         Orquestra o pipeline: Dados Brutos -> Pandas (Hard Stats) -> LLM (Soft Skills) -> JSON
+
+        Com `on_partial`, recebe {"stage": "stats", "period_stats": ...} assim que os números
+        ficam prontos e {"stage": "strategy", "strategy": <JSON parcial>} a cada trecho do LLM.
+        `context` é o resultado de load_context (já lido pelo chamador); None = lê do store.
         """
-        if not raw_data:
+        if raw_data is None or len(raw_data) == 0:
             return {"error": "Nenhum dado recebido para análise."}
 
+        customer_id = raw_data.meta.get('customer_id') if isinstance(raw_data, ColumnarPayload) else None
+        return await self._report_from_frame(self._to_frame(raw_data), on_partial, customer_id, context)
+
+    @staticmethod
+    def _to_frame(raw_data: Union[ColumnarPayload, pd.DataFrame, List[Dict]]) -> pd.DataFrame:
+        """Aceita o payload colunar do Ads Agent, um DataFrame plano ou o formato legado (lista de dicts com 'metrics')."""
+        if isinstance(raw_data, ColumnarPayload):
+            raw_data = raw_data.frame
+        if isinstance(raw_data, pd.DataFrame):
+            return raw_data.copy(deep=False)
+        return pd.DataFrame([item['metrics'] | {'name': item['name'], 'id': item['id'], 'status': item['status']} for item in raw_data])
+
+    async def _report_from_frame(self, df: pd.DataFrame, on_partial: Optional[PartialCallback] = None,
+                                 customer_id: Optional[str] = None, context: Optional[Dict] = None) -> Dict:
         # 1. Análise Quantitativa (Pandas)
-        df = pd.DataFrame([item['metrics'] | {'name': item['name'], 'id': item['id'], 'status': item['status']} for item in raw_data])
-        stats = self._calculate_hard_metrics(df)
+        with telemetry.span("hard_metrics", mode="pool" if self.metrics_pool is not None else "inline") as span:
+            if self.metrics_pool is not None:
+                stats = await self.metrics_pool.compute(self._add_ratios(df))
+            else:
+                stats = self._calculate_hard_metrics(df)
+            span.record(rows=len(df))
+        return await self._report_from_stats(stats, df, on_partial, customer_id, context)
+
+    async def _report_from_stats(self, stats: Dict, df: Optional[pd.DataFrame], on_partial: Optional[PartialCallback] = None,
+                                 customer_id: Optional[str] = None, context: Optional[Dict] = None) -> Dict:
+        """`df` (com cpa/ctr_percent) só é usado na tabela do prompt; pode ser None sem LLM."""
+        if on_partial is not None:
+            # Números determinísticos saem na hora, sem esperar o LLM
+            await on_partial({"stage": "stats", "period_stats": stats})
+
+        if context is None:
+            context = await self.load_context(customer_id)
+        history, anomalies = context["history"], context["anomalies"]
         
         # 2. Análise Qualitativa (LLM ou Mock)
-        strategic_analysis = await self._generate_ai_insights(stats, df)
+        strategic_analysis = await self._generate_ai_insights(stats, df, on_partial, history, anomalies)
         
         # 3. Merge dos resultados
-        return {
+        report = {
             "period_stats": stats,
             "strategy": strategic_analysis
         }
+        if history is not None:
+            report["history"] = history
+        if anomalies is not None:
+            report["anomalies"] = findings_to_records(anomalies)
+        return report
+
+    async def load_context(self, customer_id: Optional[str]) -> Dict:
+        """
+        Janelas móveis e anomalias por campanha do armazenamento local, em paralelo (leituras
+        em thread: Parquet mapeado em memória), no último dia completo `as_of` (ontem).
+        """
+        as_of = date.today() - timedelta(days=1)
+        history, anomalies = await asyncio.gather(self._load_history(customer_id, as_of),
+                                                  self._load_anomalies(customer_id, as_of))
+        return {"as_of": as_of.isoformat(), "history": history, "anomalies": anomalies}
+
+    async def _load_history(self, customer_id: Optional[str], as_of: Optional[date] = None) -> Optional[Dict]:
+        """WoW/MoM e linha de base do CampaignStore; None sem store, sem customer_id ou sem dados locais."""
+        if self.store is None or customer_id is None:
+            return None
+        try:
+            return await asyncio.to_thread(build_history, self.store, customer_id, as_of)
+        except Exception as e:
+            # Histórico é complementar: falha de leitura não derruba o relatório
+            logger.warning(f"⚠️ BI Agent: Histórico local indisponível para {customer_id}: {e}", extra={"customer_id": customer_id})
+            return None
+
+    async def _load_anomalies(self, customer_id: Optional[str], as_of: Optional[date] = None) -> Optional[pd.DataFrame]:
+        """Achados de agents/anomalies.py nas séries diárias do CampaignStore; None sem store ou sem dados."""
+        if self.store is None or customer_id is None:
+            return None
+        try:
+            with telemetry.span("anomalies") as span:
+                findings = await asyncio.to_thread(find_anomalies, self.store, customer_id, as_of)
+                span.record(rows=0 if findings is None else len(findings))
+            return findings
+        except Exception as e:
+            logger.warning(f"⚠️ BI Agent: Detecção de anomalias indisponível para {customer_id}: {e}", extra={"customer_id": customer_id})
+            return None
 
     def _calculate_hard_metrics(self, df: pd.DataFrame) -> Dict:
         """Cálculos determinísticos para evitar alucinação numérica."""
-        # Evitar divisão por zero
-        df['cpa'] = df.apply(lambda x: x['cost'] / x['conversions'] if x['conversions'] > 0 else 0, axis=1)
-        df['ctr_percent'] = (df['clicks'] / df['impressions'] * 100).fillna(0)
-
-        # Identificando outliers
-        high_cpa_threshold = df['cpa'].mean() * 1.5
-        top_performers = df.nlargest(3, 'conversions')[['name', 'conversions', 'cpa']].to_dict('records')
-        low_performers = df[(df['cpa'] > high_cpa_threshold) & (df['conversions'] > 0)][['name', 'cpa']].to_dict('records')
-        zero_conversion_spend = df[(df['conversions'] == 0) & (df['cost'] > 0)].nlargest(3, 'cost')[['name', 'cost']].to_dict('records')
-
-        return {
-            "total_spend": round(df['cost'].sum(), 2),
-            "total_conversions": int(df['conversions'].sum()),
-            "global_cpa": round(df['cost'].sum() / df['conversions'].sum(), 2) if df['conversions'].sum() > 0 else 0,
-            "top_campaigns": top_performers,
-            "inefficient_campaigns": low_performers,
-            "wasteful_spend": zero_conversion_spend
-        }
+        self._add_ratios(df)
+        # Uma passada só (somas + heaps), a mesma usada lote a lote no modo streaming
+        return StreamingAggregator().update(df).result()
 
-    async def _generate_ai_insights(self, stats: Dict, df: pd.DataFrame) -> Dict:
+    @staticmethod
+    def _add_ratios(df: pd.DataFrame) -> pd.DataFrame:
+        """Colunas cpa e ctr_percent, usadas na tabela do prompt. Divisões vetorizadas e seguras (0 quando o denominador é 0)."""
+        cost = df['cost'].to_numpy(dtype='float64')
+        conversions = df['conversions'].to_numpy(dtype='float64')
+        clicks = df['clicks'].to_numpy(dtype='float64')
+        impressions = df['impressions'].to_numpy(dtype='float64')
+        df['cpa'] = np.divide(cost, conversions, out=np.zeros_like(cost), where=conversions > 0)
+        df['ctr_percent'] = np.divide(clicks * 100, impressions, out=np.zeros_like(clicks), where=impressions > 0)
+        return df
+
+    async def _generate_ai_insights(self, stats: Dict, df: pd.DataFrame, on_partial: Optional[PartialCallback] = None,
+                                    history: Optional[Dict] = None, anomalies: Optional[pd.DataFrame] = None) -> Dict:
         """Usa o LLM para interpretar os números e sugerir ações."""
         
-        if not self.llm:
+        if not await self.warm_up():
             return {
                 "warning": "IA não configurada (Sem Chave). Retornando placeholder.",
                 "summary": "Campanhas processadas, mas análise qualitativa indisponível.",
@@ -114,53 +480,87 @@ class BIAnalyticsAgent:
                 ]
             }
 
-        # Convertendo o DF para markdown para o LLM ler facilmente
-        df_view = df[['name', 'cost', 'conversions', 'cpa', 'ctr_percent']].to_markdown(index=False)
-
-        system_prompt = """
-        Você é um Especialista Sênior em Performance de Google Ads (PPC).
-        Sua missão é analisar os dados fornecidos e gerar um plano de ação tático.
-        Não invente números. Use as estatísticas fornecidas.
-        Seja direto, crítico e focado em ROI.
-        """
+        # Tabela compacta dentro do orçamento de tokens: o prompt não cresce com o tamanho da conta
+        budget = self.prompt_token_budget or int(os.getenv("LLM_PROMPT_TOKEN_BUDGET", "2000"))
+        with telemetry.span("prompt_build") as span:
+            # As campanhas com as anomalias mais severas entram primeiro na tabela
+            priority = None
+            if anomalies is not None and not anomalies.empty and 'id' in df.columns:
+                worst = pd.Index(anomalies['campaign_id'].drop_duplicates().head(PROMPT_LIST_LIMIT))
+                rank = worst.get_indexer(df['id'].astype(str))
+                rows = np.flatnonzero(rank >= 0)
+                priority = [("anomalia", rows[np.argsort(rank[rows], kind="stable")])]
+            df_view, view_info = build_table_view(df, token_budget=budget, priority=priority)
+            span.record(rows=len(df))
+        if view_info["rows_aggregated"]:
+            logger.info(f"✂️ BI Agent: Prompt com {view_info['rows_shown']}/{view_info['rows_total']} campanhas (~{view_info['tokens']} tokens).",
+                        extra=view_info)
+        inputs = {
+            "total_spend": stats['total_spend'],
+            "total_conversions": stats['total_conversions'],
+            "global_cpa": stats['global_cpa'],
+            "top_campaigns": stats['top_campaigns'],
+            # A lista completa fica no relatório; no prompt só as piores (já detalhadas na tabela)
+            "inefficient_campaigns": stats['inefficient_campaigns'][:PROMPT_LIST_LIMIT],
+            "wasteful_spend": stats['wasteful_spend'],
+            "history": format_history(history),
+            "anomalies": format_anomalies(anomalies),
+            "df_view": df_view,
+        }
 
-        human_prompt = """
-        Analise os dados desta semana:
+        # Relatório idêntico (mesmos números, mesmo prompt, mesmo modelo) -> resposta do cache, sem chamar o LLM
+        cache = self._get_llm_cache()
+        key = LLMCache.make_key(self.model_name, self.prompt_fingerprint, inputs) if cache else None
+        if cache:
+            cached = await asyncio.to_thread(cache.get, key)
+            if cached is not None:
+                logger.info("⚡ BI Agent: Insights servidos do cache local (LLM não chamado).")
+                telemetry.count("llm_cache_hits_total")
+                if on_partial is not None:
+                    await on_partial({"stage": "strategy", "strategy": cached})
+                return cached
 
-        --- ESTATÍSTICAS GERAIS ---
-        Gasto Total: R$ {total_spend}
-        Conversões: {total_conversions}
-        CPA Global: R$ {global_cpa}
+        try:
+            if on_partial is not None:
+                result = await self._stream_insights({**inputs, "format_instructions": self.format_instructions}, on_partial)
+            else:
+                executor = await self._get_executor()
+                result = await executor.ainvoke({**inputs, "format_instructions": self.format_instructions})
+        except Exception as e:
+            return {"error": f"Falha na geração de insights: {str(e)}"}
+        if cache:
+            await asyncio.to_thread(cache.put, key, self.model_name, result)
+        return result
 
-        --- DESTAQUES ---
-        Campanhas Top (Scale): {top_campaigns}
-        Campanhas Ineficientes (CPA Alto): {inefficient_campaigns}
-        Gasto sem Retorno (Waste): {wasteful_spend}
+    async def _stream_insights(self, prompt_inputs: Dict, on_partial: PartialCallback) -> Dict:
+        """Consome o LLM via astream, reparseando o JSON parcial a cada trecho; devolve o JSON final."""
+        from langchain_core.outputs import Generation
+        text = ""
+        last = None
+        executor = await self._get_executor()
+        async for chunk in executor.astream(prompt_inputs):
+            text += self._chunk_text(chunk)
+            partial = self.parser.parse_result([Generation(text=text)], partial=True)
+            if partial and partial != last:
+                last = partial
+                await on_partial({"stage": "strategy", "strategy": partial})
+        return self.parser.parse(text)
 
-        --- TABELA DETALHADA ---
-        {df_view}
+    @staticmethod
+    def _chunk_text(chunk) -> str:
+        # Gemini pode devolver o conteúdo como lista de partes
+        content = getattr(chunk, "content", chunk)
+        if isinstance(content, list):
+            return "".join(part if isinstance(part, str) else part.get("text", "") for part in content)
+        return content
 
-        Gere um relatório estruturado respondendo: O que devo fazer para melhorar o resultado?
-        {format_instructions}
+    def _get_llm_cache(self) -> Optional[LLMCache]:
         """
-
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", system_prompt),
-            ("human", human_prompt),
-        ])
-
-        chain = prompt | self.llm | self.parser
-        
-        try:
-            return await chain.ainvoke({
-                "total_spend": stats['total_spend'],
-                "total_conversions": stats['total_conversions'],
-                "global_cpa": stats['global_cpa'],
-                "top_campaigns": stats['top_campaigns'],
-                "inefficient_campaigns": stats['inefficient_campaigns'],
-                "wasteful_spend": stats['wasteful_spend'],
-                "df_view": df_view,
-                "format_instructions": self.parser.get_format_instructions()
-            })
-        except Exception as e:
-            return {"error": f"Falha na geração de insights: {str(e)}"}
+        Cache local criado no primeiro uso, só com LLM_CACHE_ENABLED=true. O arquivo fica no
+        diretório de dados (`<warehouse>/_llm_cache.sqlite`), não no diretório corrente;
+        LLM_CACHE_PATH muda o arquivo.
+        """
+        if self.llm_cache is None and os.getenv("LLM_CACHE_ENABLED", "false").lower() in ("1", "true", "yes"):
+            root = self.store.root if self.store is not None else os.getenv("WAREHOUSE_PATH", "data/warehouse")
+            self.llm_cache = LLMCache(os.getenv("LLM_CACHE_PATH") or os.path.join(root, "_llm_cache.sqlite"))
+        return self.llm_cache
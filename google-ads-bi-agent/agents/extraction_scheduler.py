@@ -0,0 +1,109 @@
+import asyncio
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Sized
+
+from utils.rate_limit import TokenBucket
+
+
+class ExtractionScheduler:
+    """
+    Pool de workers para extração de muitos customers.
+
+    - `concurrency` workers consomem uma fila de customer_ids (memória O(concurrency),
+      não O(customers)).
+    - Cada customer tem até `max_retries` novas tentativas com backoff exponencial + jitter.
+    - Um TokenBucket opcional limita a taxa global de chamadas à API (quota).
+    - `attempt_timeout` impede que uma conta lenta prenda um worker indefinidamente.
+    - Se `on_result` levanta, o customer entra em `failed` (não em `succeeded`) e o lote continua.
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[str], Awaitable[Sized]],
+        concurrency: int = 8,
+        max_retries: int = 3,
+        backoff_base: float = 1.0,
+        backoff_max: float = 30.0,
+        attempt_timeout: Optional[float] = None,
+        rate_limiter: Optional[TokenBucket] = None,
+    ):
+        if concurrency < 1:
+            raise ValueError("concurrency must be >= 1")
+        self.fetch = fetch
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.attempt_timeout = attempt_timeout
+        self.rate_limiter = rate_limiter
+
+    async def run(
+        self,
+        customer_ids: Iterable[str],
+        on_result: Optional[Callable[[str, Sized], Awaitable[Any]]] = None,
+    ) -> Dict:
+        """Processa todos os customers e retorna o resumo de throughput da execução."""
+        queue: asyncio.Queue = asyncio.Queue()
+        for customer_id in customer_ids:
+            queue.put_nowait(customer_id)
+
+        summary = {
+            "total_customers": queue.qsize(),
+            "succeeded": 0,
+            "failed": [],
+            "retries": 0,
+            "rows": 0,
+        }
+        started = time.monotonic()
+
+        async def worker():
+            while True:
+                try:
+                    customer_id = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                try:
+                    rows = await self._fetch_with_retry(customer_id, summary)
+                except Exception as e:
+                    summary["failed"].append({"customer_id": customer_id, "error": str(e)})
+                    continue
+                if on_result is not None:
+                    try:
+                        await on_result(customer_id, rows)
+                    except Exception as e:
+                        # Uma falha ao entregar o resultado (ex.: BackpressureError, transporte)
+                        # conta só para este customer; o worker segue com a fila
+                        summary["failed"].append({"customer_id": customer_id, "error": f"on_result: {e}"})
+                        continue
+                summary["succeeded"] += 1
+                summary["rows"] += len(rows)
+
+        workers = min(self.concurrency, summary["total_customers"]) or 1
+        await asyncio.gather(*(worker() for _ in range(workers)))
+
+        elapsed = time.monotonic() - started
+        summary["elapsed_s"] = round(elapsed, 3)
+        summary["customers_per_s"] = round(summary["succeeded"] / elapsed, 2) if elapsed > 0 else 0.0
+        summary["rows_per_s"] = round(summary["rows"] / elapsed, 2) if elapsed > 0 else 0.0
+        return summary
+
+    async def _fetch_with_retry(self, customer_id: str, summary: Dict) -> Sized:
+        attempt = 0
+        while True:
+            if self.rate_limiter is not None:
+                await self.rate_limiter.acquire()
+            try:
+                if self.attempt_timeout is not None:
+                    return await asyncio.wait_for(self.fetch(customer_id), timeout=self.attempt_timeout)
+                return await self.fetch(customer_id)
+            except Exception:
+                if attempt >= self.max_retries:
+                    raise
+                summary["retries"] += 1
+                await asyncio.sleep(self._backoff(attempt))
+                attempt += 1
+
+    def _backoff(self, attempt: int) -> float:
+        # Full jitter: evita que workers que falharam juntos tentem de novo juntos
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
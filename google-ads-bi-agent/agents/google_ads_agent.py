@@ -1,70 +1,308 @@
-import json
+import base64
+import asyncio
 import logging
-from typing import List, Dict
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict
 
-# Em um cenário real MCP, usaríamos um MCP Client para conectar ao server.
-# Para este MVP "in-process", importaremos a função da ferramenta diretamente
-# do nosso arquivo server.py
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from a2a.payloads import ColumnarPayload, new_correlation_id
+from agents.extraction_scheduler import ExtractionScheduler
+from my_mcp.google_ads_client import CAMPAIGN_COLUMNS
+from utils.rate_limit import TokenBucket
+from utils.telemetry import telemetry, trace
+
+logger = logging.getLogger(__name__)
+
+# Transportes para as ferramentas MCP (my_mcp/server.py):
+# - "inprocess": importa a função da ferramenta diretamente (padrão, sem overhead de protocolo)
+# - "stdio" / "http": cliente MCP real com sessão persistente (my_mcp/client.py); com
+#   mcp_batching=True, chamadas concorrentes são agrupadas em fetch_campaign_data_batch
 
 class GoogleAdsAgent:
-    def __init__(self, bus):
+    def __init__(self, bus, ads_client=None, batch_size: int = 10_000, store=None, io_workers: int = 16,
+                 transport: str = "inprocess", mcp_url: str = "http://127.0.0.1:8000/mcp", mcp_batching: bool = True,
+                 history_days: int = 60):
+        if transport not in ("inprocess", "stdio", "http"):
+            raise ValueError(f"Unsupported transport: {transport}")
         self.bus = bus
+        self.transport = transport
+        self.mcp_url = mcp_url
+        self.mcp_batching = mcp_batching
+        self._mcp_client = None
+        self._mcp_batcher = None
+        self.ads_client = ads_client
+        self.batch_size = batch_size
+        self.store = store
+        self._sync = None
+        # Com store, toda extração também sincroniza os últimos `history_days` dias no histórico
+        # diário local (WoW/MoM de 30 vs. 30 dias, anomalias); 0 desliga
+        self.history_days = history_days
+        # Executor dedicado e limitado para toda chamada bloqueante (gRPC, disco):
+        # o event loop nunca espera a API, e uma conta lenta ocupa só uma thread
+        self.io_executor = ThreadPoolExecutor(max_workers=io_workers, thread_name_prefix="ads-io")
         self.bus.subscribe("CMD_START_EXTRACT", self.handle_command)
+        self.bus.subscribe("CMD_START_BATCH_EXTRACT", self.handle_batch_command)
 
     async def handle_command(self, payload: Dict):
-        print("📥 Google Ads Agent: Received extraction command.")
         customer_id = payload.get("customer_id")
-        
+        # Identifica este pipeline em DATA_FETCHED/REPORT_READY/ERROR (ver EventBus.request)
+        correlation_id = payload.get("correlation_id") or new_correlation_id()
+        with trace(correlation_id):
+            await self._handle_command(payload, customer_id, correlation_id)
+
+    async def _handle_command(self, payload: Dict, customer_id: str, correlation_id: str):
+        logger.info("📥 Google Ads Agent: Received extraction command.", extra={"customer_id": customer_id})
         try:
-            # Simulating MCP Client Call
-            # In a real distributed system, this would be: client.call_tool("fetch_campaign_data", ...)
+            if payload.get("stream"):
+                await self._stream_extract(customer_id, payload.get("date_range", "LAST_30_DAYS"), correlation_id)
+                return
+
+            processed_data = await self.extract(customer_id, payload.get("date_range", "LAST_30_DAYS"),
+                                                incremental=payload.get("incremental", False),
+                                                window_days=payload.get("window_days", 30))
+
+            logger.info(f"✅ Google Ads Agent: Data fetched ({len(processed_data)} records). Publishing...",
+                        extra={"customer_id": customer_id, "rows": len(processed_data)})
+            await self.bus.publish("DATA_FETCHED", ColumnarPayload(
+                processed_data, customer_id=customer_id, correlation_id=correlation_id
+            ))
+
+        except Exception as e:
+            logger.exception(f"❌ Google Ads Agent Error: {e}", extra={"customer_id": customer_id})
+            await self.bus.publish("ERROR", {
+                "source": "ADS_AGENT", "message": str(e),
+                "customer_id": customer_id, "correlation_id": correlation_id,
+            }, key=correlation_id)
+
+    async def handle_batch_command(self, payload: Dict):
+        """
+        Extração em lote: `customer_ids` explícitos ou todas as contas sob `manager_id`.
+        Publica um DATA_FETCHED por customer e, ao final, BATCH_EXTRACT_DONE com o resumo.
+
+        Parâmetros opcionais: concurrency, max_retries, attempt_timeout,
+        requests_per_second (quota global), date_range.
 
+        Cada DATA_FETCHED leva o correlation_id "<lote>:<customer_id>", para que o
+        relatório (ou erro) de uma conta não seja confundido com o do lote inteiro.
+        """
+        correlation_id = payload.get("correlation_id") or new_correlation_id()
+        with trace(correlation_id):
+            try:
+                await self._handle_batch_command(payload, correlation_id)
+            except Exception as e:
+                # Sem resposta, quem espera BATCH_EXTRACT_DONE (bus.request) ficaria preso até o timeout
+                logger.exception(f"❌ Google Ads Agent Batch Error: {e}")
+                await self.bus.publish("ERROR", {
+                    "source": "ADS_AGENT", "message": str(e), "correlation_id": correlation_id,
+                }, key=correlation_id)
+
+    async def _handle_batch_command(self, payload: Dict, correlation_id: str):
+        customer_ids = payload.get("customer_ids")
+        if not customer_ids and payload.get("manager_id"):
+            customer_ids = await self._run_io(self._get_ads_client().list_child_customers, payload["manager_id"])
+        customer_ids = customer_ids or []
+        logger.info(f"📥 Google Ads Agent: Received batch extraction command ({len(customer_ids)} customers).",
+                    extra={"customers": len(customer_ids)})
+
+        date_range = payload.get("date_range", "LAST_30_DAYS")
+        rps = payload.get("requests_per_second")
+        async def fetch(customer_id: str) -> pd.DataFrame:
+            # Mesmo trace_id do DATA_FETCHED/REPORT_READY desta conta
+            with trace(f"{correlation_id}:{customer_id}"):
+                return await self.extract(customer_id, date_range)
+
+        scheduler = ExtractionScheduler(
+            fetch=fetch,
+            concurrency=payload.get("concurrency", 8),
+            max_retries=payload.get("max_retries", 3),
+            attempt_timeout=payload.get("attempt_timeout"),
+            rate_limiter=TokenBucket(rps) if rps else None,
+        )
+
+        async def publish_result(customer_id: str, processed_data: pd.DataFrame):
+            await self.bus.publish("DATA_FETCHED", ColumnarPayload(
+                processed_data, customer_id=customer_id, correlation_id=f"{correlation_id}:{customer_id}"
+            ))
+
+        summary = await scheduler.run(customer_ids, on_result=publish_result)
+        logger.info(f"✅ Google Ads Agent: Batch done ({summary['succeeded']}/{summary['total_customers']} customers, "
+                    f"{summary['rows_per_s']} rows/s, {len(summary['failed'])} failed).")
+        await self.bus.publish("BATCH_EXTRACT_DONE", {**summary, "correlation_id": correlation_id})
+
+    async def extract(self, customer_id: str, date_range: str = "LAST_30_DAYS", incremental: bool = False,
+                      window_days: int = 30) -> pd.DataFrame:
+        """
+        DataFrame normalizado de uma conta, sem publicar nada no bus (usado pelo BatchRunner).
+        Com `incremental`, sincroniza o CampaignStore e lê a janela de `window_days` dias dele.
+        Sem `incremental`, mas com store, a sincronização diária roda junto da consulta do
+        período, para que o BI Agent tenha histórico e anomalias no relatório.
+        """
+        if incremental:
+            return await self._incremental_extract(customer_id, window_days)
+        if self.store is None or not self.history_days:
+            return await self._fetch_customer(customer_id, date_range)
+        processed_data, _ = await asyncio.gather(self._fetch_customer(customer_id, date_range),
+                                                 self._sync_history(customer_id))
+        return processed_data
+
+    async def _sync_history(self, customer_id: str):
+        """Sincroniza o histórico diário; uma falha não derruba a extração (os dias ficam para a próxima)."""
+        try:
+            await self._run_io(self._get_sync().sync, customer_id, self.history_days)
+        except Exception as e:
+            logger.warning(f"⚠️ Google Ads Agent: histórico local não sincronizado: {e}", extra={"customer_id": customer_id})
+
+    async def _fetch_customer(self, customer_id: str, date_range: str = "LAST_30_DAYS") -> pd.DataFrame:
+        with telemetry.span("fetch", transport=self.transport) as span:
+            raw_data = await self._fetch_raw(customer_id, date_range)
+            if isinstance(raw_data, pa.Table):
+                span.record(rows=raw_data.num_rows, bytes=raw_data.nbytes)
+            else:
+                span.record(rows=len(raw_data))
+        return self._process_data(raw_data)
+
+    async def _fetch_raw(self, customer_id: str, date_range: str):
+        """Linhas da ferramenta MCP pelo transporte configurado (tabela Arrow ou lista de dicts)."""
+        if self.transport == "inprocess":
             # Importando do novo pacote renomeado para evitar conflito com 'mcp' lib
             try:
-                from my_mcp.server import fetch_campaign_data
+                from my_mcp.server import fetch_campaign_table
             except ImportError:
                  # Fallback path hack se rodar da raiz
                  import sys
                  sys.path.append('google-ads-bi-agent')
-                 from my_mcp.server import fetch_campaign_data
+                 from my_mcp.server import fetch_campaign_table
 
-            # Executando a ferramenta (Sync tool wrapped in async call if needed)
-            import asyncio
-            # Simulando latência de rede
-            await asyncio.sleep(0.5)
+            # Ferramenta síncrona: roda fora do event loop para não bloquear os outros workers.
+            # In-process a tabela Arrow chega direto, sem serializar para JSON.
+            raw_data = await self._run_io(fetch_campaign_table, customer_id, date_range)
+        elif self.mcp_batching:
+            raw_data = await self._get_mcp_batcher().fetch(customer_id, date_range)
+        else:
+            # Payload binário (Arrow IPC) em vez de JSON
+            encoded = await self._get_mcp_client().call_tool(
+                "fetch_campaign_data_arrow", {"customer_id": customer_id, "date_range": date_range}
+            )
+            raw_data = pa.ipc.open_stream(pa.py_buffer(base64.b64decode(encoded))).read_all()
+        return raw_data
 
-            raw_json = fetch_campaign_data(customer_id)
-            raw_data = json.loads(raw_json)
+    def _get_mcp_client(self):
+        if self._mcp_client is None:
+            from my_mcp.client import McpToolClient
+            self._mcp_client = McpToolClient(self.transport, self.mcp_url)
+        return self._mcp_client
 
-            processed_data = self._process_data(raw_data)
+    def _get_mcp_batcher(self):
+        if self._mcp_batcher is None:
+            from my_mcp.client import CampaignDataBatcher
+            self._mcp_batcher = CampaignDataBatcher(self._get_mcp_client())
+        return self._mcp_batcher
 
-            print(f"✅ Google Ads Agent: Data fetched ({len(processed_data)} records). Publishing...")
-            await self.bus.publish("DATA_FETCHED", processed_data)
+    async def close(self):
+        """Encerra a sessão MCP (se houver) e o executor de I/O."""
+        if self._mcp_client is not None:
+            await self._mcp_client.close()
+        self.io_executor.shutdown(wait=False)
 
-        except Exception as e:
-            print(f"❌ Google Ads Agent Error: {e}")
-            import traceback
-            traceback.print_exc()
-            await self.bus.publish("ERROR", {"source": "ADS_AGENT", "message": str(e)})
-
-    def _process_data(self, raw_data: List[Dict]) -> List[Dict]:
-        """Normaliza os dados brutos vindos do MCP Tool."""
-        processed_data = []
-        for row in raw_data:
-            cost_real = row.get('cost_micros', 0) / 1_000_000
-            conversions = row.get('conversions', 0)
-            cpa = round(cost_real / conversions, 2) if conversions > 0 else 0.0
-            
-            processed_data.append({
-                "id": str(row.get('campaign_id')),
-                "name": row.get('campaign_name'),
-                "status": row.get('status'),
-                "metrics": {
-                    "clicks": row.get('clicks'),
-                    "impressions": row.get('impressions'),
-                    "cost": round(cost_real, 2),
-                    "conversions": conversions,
-                    "cpa": cpa
-                }
-            })
-        return processed_data
+    async def _stream_extract(self, customer_id: str, date_range: str, correlation_id: str):
+        """
+        Modo streaming: publica um DATA_BATCH por página recebida do cliente
+        e um DATA_STREAM_END ao final, sem materializar a conta inteira.
+        Tudo com key=correlation_id: com o broker, as páginas, o fim e um eventual
+        ERROR do stream chegam ao mesmo worker BI (o estado parcial vive nele).
+        """
+        from my_mcp.google_ads_client import CAMPAIGN_QUERY
+
+        client = self._get_ads_client()
+        query = CAMPAIGN_QUERY.format(date_range=date_range)
+
+        batch_index = 0
+        total_rows = 0
+        async for batch in client.aiter_query_batches(customer_id, query, self.batch_size, executor=self.io_executor):
+            processed_data = self._process_data(batch)
+            total_rows += len(processed_data)
+            await self.bus.publish("DATA_BATCH", ColumnarPayload(
+                processed_data, customer_id=customer_id, correlation_id=correlation_id, batch_index=batch_index
+            ), key=correlation_id)
+            batch_index += 1
+
+        logger.info(f"✅ Google Ads Agent: Streamed {total_rows} records in {batch_index} batches.",
+                    extra={"customer_id": customer_id, "rows": total_rows, "batches": batch_index})
+        await self.bus.publish("DATA_STREAM_END", {
+            "customer_id": customer_id,
+            "correlation_id": correlation_id,
+            "batches": batch_index,
+            "rows": total_rows
+        }, key=correlation_id)
+
+    async def _incremental_extract(self, customer_id: str, window_days: int) -> pd.DataFrame:
+        """
+        Modo incremental: sincroniza só os dias novos (+ janela de restatement) no
+        CampaignStore local e monta a janela pedida a partir dos dados locais.
+        """
+        from datetime import date, timedelta
+
+        sync = self._get_sync()
+        await self._run_io(sync.sync, customer_id, window_days)
+
+        today = date.today()
+        totals = await self._run_io(
+            sync.store.campaign_totals, customer_id, today - timedelta(days=window_days), today - timedelta(days=1)
+        )
+        return self._process_data(totals)
+
+    async def _run_io(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.io_executor, functools.partial(func, *args))
+
+    def _get_sync(self):
+        if self._sync is None:
+            from my_mcp.campaign_store import CampaignStore
+            from my_mcp.incremental_sync import IncrementalSync
+
+            if self.store is None:
+                self.store = CampaignStore()
+            self._sync = IncrementalSync(self._get_ads_client(), self.store, batch_size=self.batch_size)
+        return self._sync
+
+    def _get_ads_client(self):
+        if self.ads_client is None:
+            from my_mcp.google_ads_client import GoogleAdsClientWrapper
+            self.ads_client = GoogleAdsClientWrapper.shared()
+        return self.ads_client
+
+    def _process_data(self, raw_data) -> pd.DataFrame:
+        """
+        Normaliza os dados brutos vindos do MCP Tool (lista de linhas, dict de colunas ou tabela Arrow)
+        em um DataFrame tipado e plano: id, name, status, clicks, impressions, cost, conversions, cpa.
+        Tudo vetorizado: nenhuma chamada Python por linha.
+        """
+        with telemetry.span("normalize") as span:
+            processed = self._normalize(raw_data)
+            span.record(rows=len(processed), bytes=int(processed.memory_usage(index=False, deep=False).sum()))
+        return processed
+
+    @staticmethod
+    def _normalize(raw_data) -> pd.DataFrame:
+        if isinstance(raw_data, pa.Table):
+            raw_data = raw_data.to_pandas()
+        raw = pd.DataFrame(raw_data, columns=list(CAMPAIGN_COLUMNS))
+
+        cost = raw['cost_micros'].fillna(0).to_numpy(dtype='float64') / 1_000_000
+        conversions = raw['conversions'].fillna(0).to_numpy(dtype='float64')
+        cpa = np.divide(cost, conversions, out=np.zeros_like(cost), where=conversions > 0)
+
+        return pd.DataFrame({
+            "id": raw['campaign_id'].astype(str),
+            "name": raw['campaign_name'],
+            "status": raw['status'],
+            "clicks": raw['clicks'].fillna(0).to_numpy(dtype='int64'),
+            "impressions": raw['impressions'].fillna(0).to_numpy(dtype='int64'),
+            "cost": cost.round(2),
+            "conversions": conversions,
+            "cpa": cpa.round(2),
+        })
@@ -0,0 +1,201 @@
+import asyncio
+import random
+import time
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from agents.prompt_builder import estimate_tokens
+from utils.rate_limit import TokenBucket
+from utils.telemetry import LatencyStats, telemetry
+
+
+class LLMExecutor:
+    """
+    Camada de execução compartilhada para as chamadas ao LLM de todos os relatórios.
+
+    - Dois TokenBuckets globais: requisições/minuto e tokens/minuto (quota do Gemini).
+      O consumo de tokens é reservado por estimativa (estimate_tokens + `output_tokens`).
+    - `concurrency` limita as rodadas em andamento (semáforo).
+    - Falhas (429, timeout, ...) são repetidas até `max_retries` vezes com backoff
+      exponencial + full jitter, como no ExtractionScheduler. É a única camada de retry:
+      o modelo deve ser criado sem retries próprios (ChatGoogleGenerativeAI(max_retries=0)).
+    - Com `batch_size` > 1, chamadas que chegam em até `batch_delay` segundos viram uma
+      única rodada `abatch` (vários customers por rodada).
+    - astream() repassa os chunks do modelo conforme chegam (mesmos limites e retries,
+      mas só repete a chamada se ela falhar antes do primeiro chunk).
+    - metrics(): latência por chamada, tempo até o primeiro chunk (astream) e tokens usados
+      (usage_metadata da resposta, ou a estimativa quando o modelo não informa), para
+      dimensionar a execução noturna.
+
+    `runnable` deve devolver a mensagem do modelo (ex.: `prompt | llm`); `parse`, se dado,
+    é aplicado a cada resposta (ex.: `JsonOutputParser.invoke`).
+    """
+
+    def __init__(
+        self,
+        runnable,
+        parse: Optional[Callable[[Any], Any]] = None,
+        requests_per_minute: float = 60,
+        tokens_per_minute: Optional[float] = None,
+        concurrency: int = 4,
+        max_retries: int = 3,
+        backoff_base: float = 1.0,
+        backoff_max: float = 30.0,
+        batch_size: int = 1,
+        batch_delay: float = 0.02,
+        output_tokens: int = 1024,
+    ):
+        if concurrency < 1 or batch_size < 1:
+            raise ValueError("concurrency and batch_size must be >= 1")
+        self.runnable = runnable
+        self.parse = parse
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.batch_size = batch_size
+        self.batch_delay = batch_delay
+        self.output_tokens = output_tokens
+        # Capacidade = a cota de um minuto: permite rajadas dentro do limite por minuto
+        self.request_bucket = TokenBucket(requests_per_minute / 60, capacity=max(1.0, requests_per_minute))
+        self.token_bucket = TokenBucket(tokens_per_minute / 60, capacity=tokens_per_minute) if tokens_per_minute else None
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._pending: List[Tuple[Dict[str, Any], asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._inflight = set()
+        self.latency = LatencyStats()
+        self.first_chunk_latency = LatencyStats()
+        self.counters = {"calls": 0, "rounds": 0, "retries": 0, "failures": 0,
+                         "input_tokens": 0, "output_tokens": 0, "estimated_tokens": 0}
+
+    async def ainvoke(self, inputs: Dict[str, Any]) -> Any:
+        """Executa uma chamada respeitando limites e retries; levanta a última exceção se todas falharem."""
+        attempt = 0
+        while True:
+            result = await (self._submit(inputs) if self.batch_size > 1 else self._single(inputs))
+            if not isinstance(result, Exception):
+                return self.parse(result) if self.parse is not None else result
+            if attempt >= self.max_retries:
+                self.counters["failures"] += 1
+                raise result
+            self.counters["retries"] += 1
+            await asyncio.sleep(self._backoff(attempt))
+            attempt += 1
+
+    async def astream(self, inputs: Dict[str, Any]) -> AsyncIterator[Any]:
+        """Chunks da resposta do modelo (`runnable.astream`), na ordem em que chegam."""
+        estimate = self._estimate_tokens(inputs)
+        attempt = 0
+        while True:
+            await self._acquire([estimate])
+            started = time.perf_counter()
+            response = None
+            try:
+                async with self._semaphore:
+                    with telemetry.span("llm", mode="astream"):
+                        async for chunk in self.runnable.astream(inputs):
+                            if response is None:
+                                first_chunk = time.perf_counter() - started
+                                self.first_chunk_latency.record(first_chunk)
+                                telemetry.observe("llm_first_chunk_seconds", first_chunk)
+                            response = chunk if response is None else response + chunk
+                            yield chunk
+            except Exception:
+                # Depois do primeiro chunk o consumidor já recebeu parte da resposta: não repete
+                if response is not None or attempt >= self.max_retries:
+                    self.counters["failures"] += 1
+                    raise
+                self.counters["retries"] += 1
+                await asyncio.sleep(self._backoff(attempt))
+                attempt += 1
+                continue
+
+            self.counters["rounds"] += 1
+            self.counters["calls"] += 1
+            self.latency.record(time.perf_counter() - started)
+            self._record_usage(response, estimate)
+            return
+
+    async def _acquire(self, estimates: List[int]):
+        await self.request_bucket.acquire(min(len(estimates), self.request_bucket.capacity))
+        if self.token_bucket is not None:
+            await self.token_bucket.acquire(min(sum(estimates), self.token_bucket.capacity))
+
+    async def _single(self, inputs: Dict[str, Any]):
+        return (await self._round([inputs]))[0]
+
+    def _submit(self, inputs: Dict[str, Any]) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((inputs, future))
+        if len(self._pending) >= self.batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.batch_delay, self._flush)
+        return future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        pending, self._pending = self._pending, []
+        if pending:
+            task = asyncio.get_running_loop().create_task(self._send(pending))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _send(self, pending: List[Tuple[Dict[str, Any], asyncio.Future]]):
+        results = await self._round([inputs for inputs, _ in pending])
+        for (_, future), result in zip(pending, results):
+            if not future.done():
+                future.set_result(result)
+
+    async def _round(self, batch: List[Dict[str, Any]]) -> List[Any]:
+        """Uma ida ao modelo (ainvoke ou abatch). Exceções voltam na lista, uma por entrada."""
+        estimates = [self._estimate_tokens(inputs) for inputs in batch]
+        await self._acquire(estimates)
+
+        async with self._semaphore:
+            started = time.perf_counter()
+            with telemetry.span("llm", mode="ainvoke" if len(batch) == 1 else "abatch") as span:
+                if len(batch) == 1:
+                    try:
+                        results = [await self.runnable.ainvoke(batch[0])]
+                    except Exception as e:
+                        results = [e]
+                else:
+                    results = await self.runnable.abatch(batch, return_exceptions=True)
+                span.record(rows=len(batch))
+            elapsed = time.perf_counter() - started
+
+        self.counters["rounds"] += 1
+        for result, estimate in zip(results, estimates):
+            self.counters["calls"] += 1
+            self.latency.record(elapsed)
+            if not isinstance(result, Exception):
+                self._record_usage(result, estimate)
+        return list(results)
+
+    def _record_usage(self, message, estimate: int):
+        usage = getattr(message, "usage_metadata", None)
+        if isinstance(usage, dict) and "input_tokens" in usage:
+            self.counters["input_tokens"] += usage.get("input_tokens", 0)
+            self.counters["output_tokens"] += usage.get("output_tokens", 0)
+            telemetry.count("llm_tokens_total", usage.get("input_tokens", 0), kind="input")
+            telemetry.count("llm_tokens_total", usage.get("output_tokens", 0), kind="output")
+        else:
+            self.counters["estimated_tokens"] += estimate
+            telemetry.count("llm_tokens_total", estimate, kind="estimated")
+
+    def _estimate_tokens(self, inputs: Dict[str, Any]) -> int:
+        return sum(estimate_tokens(str(value)) for value in inputs.values()) + self.output_tokens
+
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def metrics(self) -> Dict[str, Any]:
+        counters = dict(self.counters)
+        total = counters["input_tokens"] + counters["output_tokens"] + counters["estimated_tokens"]
+        counters["total_tokens"] = total
+        counters["tokens_per_call"] = round(total / counters["calls"], 1) if counters["calls"] else 0.0
+        counters["latency"] = self.latency.snapshot()
+        counters["first_chunk_latency"] = self.first_chunk_latency.snapshot()
+        return counters
@@ -0,0 +1,117 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+from typing import Dict, List, Optional
+
+import pandas as pd
+import pyarrow as pa
+
+from agents.streaming_aggregator import StreamingAggregator, inefficient_rows
+
+# Colunas que o agregador lê; o resto do DataFrame não cruza a fronteira de processo
+METRIC_COLUMNS = ["name", "cost", "conversions", "cpa"]
+
+
+class MetricsPool:
+    """
+    Estágio de análise em vários processos para as estatísticas de _calculate_hard_metrics.
+
+    Cada tarefa recebe um trecho do DataFrame como stream Arrow IPC escrito direto em
+    memória compartilhada (`multiprocessing.shared_memory`): o worker lê os buffers sem
+    cópia e sem pickle de DataFrame. Com `min_rows_per_task` linhas ou mais, a conta é
+    dividida em trechos contíguos processados em paralelo, em duas fases:
+
+    1. Cada worker devolve só somas e heaps (top conversões, gasto sem conversão), que
+       são juntados em ordem no processo principal.
+    2. Com a média global de CPA, os workers filtram as campanhas ineficientes do mesmo
+       bloco, ainda mapeado, e devolvem só essas linhas.
+
+    Nada proporcional às linhas com conversão volta por pickle; o resultado é o mesmo
+    de uma passada única. O event loop só espera futures; o trabalho de CPU (e o GIL)
+    fica nos workers.
+    """
+
+    def __init__(self, workers: Optional[int] = None, min_rows_per_task: int = 250_000):
+        self.workers = workers or multiprocessing.cpu_count()
+        self.min_rows_per_task = min_rows_per_task
+        # spawn: o processo principal tem threads (executores de I/O), e fork com threads não é seguro
+        self.executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+
+    async def compute(self, df: pd.DataFrame) -> Dict:
+        """Estatísticas de um DataFrame com cpa já calculado (ver BIAnalyticsAgent._add_ratios)."""
+        # Conversão e escrita em thread: o loop continua atendendo I/O enquanto os buffers são montados
+        table = await asyncio.to_thread(pa.Table.from_pandas, df[METRIC_COLUMNS], preserve_index=False)
+        parts = max(1, min(self.workers, len(df) // self.min_rows_per_task))
+        step = -(-table.num_rows // parts) if table.num_rows else 1
+        slices = [table.slice(start, step) for start in range(0, max(table.num_rows, 1), step)]
+        blocks = []
+        try:
+            for part in slices:
+                blocks.append(await asyncio.to_thread(_write_shared, part))
+            loop = asyncio.get_running_loop()
+            aggregates = await asyncio.gather(*(
+                loop.run_in_executor(self.executor, _aggregate_shared, shm.name, size) for shm, size in blocks))
+            merged = aggregates[0]
+            for aggregate in aggregates[1:]:
+                merged.merge(aggregate)
+            stats = merged.result()
+
+            threshold = merged.inefficiency_threshold()
+            inefficient = await asyncio.gather(*(
+                loop.run_in_executor(self.executor, _inefficient_shared, shm.name, size, threshold)
+                for shm, size in blocks))
+            stats["inefficient_campaigns"] = [row for rows in inefficient for row in rows]
+            return stats
+        finally:
+            for shm, _ in blocks:
+                shm.close()
+                shm.unlink()
+
+    def close(self):
+        self.executor.shutdown(wait=True, cancel_futures=True)
+
+
+def _write_shared(table: pa.Table):
+    """Serializa `table` como stream Arrow IPC direto em um bloco de memória compartilhada."""
+    mock = pa.MockOutputStream()
+    with pa.ipc.new_stream(mock, table.schema) as writer:
+        writer.write_table(table)
+    size = mock.size()
+    shm = SharedMemory(create=True, size=max(size, 1))
+    buffer = pa.py_buffer(shm.buf)
+    sink = pa.FixedSizeBufferWriter(buffer)
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    sink.close()
+    del sink, buffer  # libera a view antes de shm.close()
+    return shm, size
+
+
+def _read_shared(name: str, size: int, consume):
+    """Roda no worker: lê o stream da memória compartilhada (sem cópia) e passa cada lote a `consume`."""
+    # O resource tracker é o do processo principal (herdado no spawn), dono do bloco e do unlink
+    shm = SharedMemory(name=name)
+    try:
+        reader = pa.ipc.open_stream(pa.py_buffer(shm.buf[:size]))
+        for batch in reader:
+            consume(batch)
+            del batch
+        # Só cópias (escalares e arrays indexados) saem daqui, nada aponta para o bloco
+        del reader
+    finally:
+        shm.close()
+
+
+def _aggregate_shared(name: str, size: int) -> StreamingAggregator:
+    """1ª fase: somas e heaps. max_inefficient=0 não guarda as linhas com conversão."""
+    aggregator = StreamingAggregator(max_inefficient=0)
+    _read_shared(name, size, aggregator.update)
+    return aggregator
+
+
+def _inefficient_shared(name: str, size: int, threshold: float) -> List[Dict]:
+    """2ª fase: campanhas com CPA acima do limiar global, na ordem das linhas do trecho."""
+    rows = []
+    _read_shared(name, size, lambda batch: rows.extend(inefficient_rows(batch, threshold)))
+    return rows
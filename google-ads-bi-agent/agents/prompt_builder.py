@@ -0,0 +1,82 @@
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Colunas da tabela enviada ao LLM (CSV compacto, valores com 2 casas)
+VIEW_COLUMNS = {"name": "campanha", "cost": "custo", "conversions": "conv", "cpa": "cpa", "ctr_percent": "ctr%"}
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimativa barata (~4 caracteres por token), suficiente para orçamento de prompt."""
+    return len(text) // 4 + 1
+
+
+def _largest(values: np.ndarray, k: int) -> np.ndarray:
+    """Posições dos k maiores valores, em ordem decrescente; O(n) via argpartition."""
+    if k >= len(values):
+        return np.argsort(-values, kind="stable")
+    top = np.argpartition(-values, k)[:k]
+    return top[np.argsort(-values[top], kind="stable")]
+
+
+def build_table_view(
+    df: pd.DataFrame,
+    token_budget: int = 2000,
+    section_rows: int = 10,
+    priority: Optional[Sequence[Tuple[str, pd.Index]]] = None,
+) -> Tuple[str, Dict[str, Any]]:
+    """
+    Tabela de campanhas para o prompt, limitada a `token_budget` tokens estimados.
+
+    As linhas entram por prioridade: grupos extras de `priority` (ex.: anomalias),
+    top conversões, gasto sem conversão, CPA alto (até `section_rows` cada) e depois
+    as de maior custo. As que não couberem viram uma linha de agregados, então os
+    totais continuam completos. Espera `df` já com `cpa` e `ctr_percent`
+    (ver _calculate_hard_metrics).
+
+    Só as candidatas (no máximo o que caberia no orçamento) são formatadas, então o
+    custo cresce com o orçamento, não com o tamanho da conta.
+    """
+    cost = df['cost'].to_numpy(dtype='float64')
+    conversions = df['conversions'].to_numpy(dtype='float64')
+    cpa = df['cpa'].to_numpy(dtype='float64')
+
+    # Grupos de posições (iloc), em ordem de prioridade
+    groups = [(label, np.asarray(positions, dtype=int)) for label, positions in (priority or [])]
+    groups.append(("top", _largest(conversions, section_rows)))
+    waste = np.flatnonzero((conversions == 0) & (cost > 0))
+    groups.append(("sem_conv", waste[_largest(cost[waste], section_rows)]))
+    high_cpa = np.flatnonzero((cpa > cpa.mean() * 1.5) & (conversions > 0)) if len(cpa) else np.array([], dtype=int)
+    groups.append(("cpa_alto", high_cpa[_largest(cpa[high_cpa], section_rows)]))
+
+    # Nenhuma linha CSV cabe em menos de ~6 tokens: limita as candidatas sem olhar o resto da conta
+    max_candidates = max(1, token_budget // 6)
+    groups.append(("gasto", _largest(cost, max_candidates)))
+
+    positions = np.concatenate([group for _, group in groups])
+    labels = np.concatenate([np.full(len(group), label, dtype=object) for label, group in groups])
+    _, first = np.unique(positions, return_index=True)  # primeira ocorrência = grupo de maior prioridade
+    order = np.sort(first)[:max_candidates]
+    positions, labels = positions[order], labels[order]
+
+    candidates = df.iloc[positions][list(VIEW_COLUMNS)].rename(columns=VIEW_COLUMNS).round(2)
+    candidates.insert(0, "grupo", labels)
+    header, *lines = candidates.to_csv(index=False, lineterminator="\n").splitlines()
+
+    # Reserva espaço para o cabeçalho e a linha de agregados
+    available = token_budget - estimate_tokens(header) - 40
+    used = np.cumsum([estimate_tokens(line) for line in lines]) if lines else np.array([], dtype=int)
+    keep = int(np.searchsorted(used, available, side="right"))
+
+    rendered = [header] + lines[:keep]
+    omitted = len(df) - keep
+    if omitted > 0:
+        rest_mask = np.ones(len(df), dtype=bool)
+        rest_mask[positions[:keep]] = False
+        rest_cost, rest_conv = cost[rest_mask].sum(), conversions[rest_mask].sum()
+        rest_cpa = rest_cost / rest_conv if rest_conv > 0 else 0.0
+        rendered.append(f"agregado,outras {omitted} campanhas,{rest_cost:.2f},{rest_conv:.2f},{rest_cpa:.2f},")
+
+    text = "\n".join(rendered)
+    return text, {"rows_total": len(df), "rows_shown": keep, "rows_aggregated": omitted, "tokens": estimate_tokens(text)}
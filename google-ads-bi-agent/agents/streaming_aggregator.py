@@ -0,0 +1,166 @@
+import heapq
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Union
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+Batch = Union[pd.DataFrame, pa.RecordBatch, pa.Table, Mapping[str, Any]]
+
+
+class StreamingAggregator:
+    """
+    Estatísticas de _calculate_hard_metrics em uma passada, lote a lote.
+
+    - Somas correntes de custo, conversões e CPA (média para o limiar de CPA alto).
+    - Heaps de tamanho `top_k` para top conversões e gasto sem conversão; empates
+      ficam com a linha que apareceu primeiro, como em `DataFrame.nlargest`.
+    - Campanhas ineficientes dependem da média final, então as linhas com conversão
+      guardam (nome, CPA) até result(): o resultado é idêntico ao atual, em
+      memória proporcional às linhas com conversão. Com `max_inefficient`, guarda só
+      as N de maior CPA (memória constante) e devolve essas N, em ordem de CPA.
+
+    Cada lote (DataFrame, RecordBatch/Table Arrow ou dict de arrays) precisa de
+    `name`, `cost` e `conversions`; `cpa` é calculado se não vier.
+    """
+
+    def __init__(self, top_k: int = 3, max_inefficient: Optional[int] = None):
+        self.top_k = top_k
+        self.max_inefficient = max_inefficient
+        self.rows = 0
+        self.total_cost = 0.0
+        self.total_conversions = 0.0
+        self.cpa_sum = 0.0
+        # Heaps de mínimo com chave (valor, -posição): o topo é o pior dos mantidos
+        self._top: List[tuple] = []
+        self._waste: List[tuple] = []
+        self._inefficient_heap: List[tuple] = []
+        self._converting: List[tuple] = []  # (nomes, CPAs) das linhas com conversão, por lote
+
+    def update(self, batch: Batch) -> "StreamingAggregator":
+        if isinstance(batch, (pa.RecordBatch, pa.Table)):
+            batch = {name: batch.column(name).to_numpy(zero_copy_only=False) for name in batch.schema.names}
+        names = np.asarray(batch['name'], dtype=object)
+        cost = np.asarray(batch['cost'], dtype='float64')
+        raw_conversions = np.asarray(batch['conversions'])
+        conversions = raw_conversions.astype('float64', copy=False)
+        if 'cpa' in batch:
+            cpa = np.asarray(batch['cpa'], dtype='float64')
+        else:
+            cpa = np.divide(cost, conversions, out=np.zeros_like(cost), where=conversions > 0)
+        n = len(cost)
+        if n == 0:
+            return self
+        offset = self.rows
+
+        self.total_cost += cost.sum()
+        self.total_conversions += conversions.sum()
+        self.cpa_sum += cpa.sum()
+
+        # Só as k melhores do lote podem entrar nos heaps globais
+        for i in _best(conversions, self.top_k):
+            self._push(self._top, self.top_k, (conversions[i], -(offset + i)),
+                       {'name': names[i], 'conversions': raw_conversions[i].item(), 'cpa': cpa[i].item()})
+
+        waste = np.flatnonzero((conversions == 0) & (cost > 0))
+        for i in waste[_best(cost[waste], self.top_k)]:
+            self._push(self._waste, self.top_k, (cost[i], -(offset + i)), {'name': names[i], 'cost': cost[i].item()})
+
+        converting = np.flatnonzero(conversions > 0)
+        if self.max_inefficient is None:
+            self._converting.append((names[converting], cpa[converting]))
+        else:
+            for i in converting[_best(cpa[converting], self.max_inefficient)]:
+                self._push(self._inefficient_heap, self.max_inefficient, (cpa[i], -(offset + i)),
+                           {'name': names[i], 'cpa': cpa[i].item()})
+
+        self.rows += n
+        return self
+
+    def merge(self, other: "StreamingAggregator") -> "StreamingAggregator":
+        """
+        Junta o agregado de um trecho posterior (ex.: calculado em outro processo). Juntar
+        os trechos na ordem das linhas dá o mesmo resultado de uma passada única.
+        """
+        offset = self.rows
+        self.total_cost += other.total_cost
+        self.total_conversions += other.total_conversions
+        self.cpa_sum += other.cpa_sum
+        # Chaves guardam -posição: desloca as posições do outro trecho para depois das nossas
+        for mine, theirs, size in ((self._top, other._top, self.top_k), (self._waste, other._waste, self.top_k),
+                                   (self._inefficient_heap, other._inefficient_heap, self.max_inefficient or 0)):
+            for (value, neg_position), record in theirs:
+                self._push(mine, size, (value, neg_position - offset), record)
+        self._converting.extend(other._converting)
+        self.rows += other.rows
+        return self
+
+    @staticmethod
+    def _push(heap: List[tuple], size: int, key: tuple, record: Dict):
+        if size <= 0:
+            return
+        if len(heap) < size:
+            heapq.heappush(heap, (key, record))
+        elif key > heap[0][0]:
+            heapq.heapreplace(heap, (key, record))
+
+    def inefficiency_threshold(self) -> float:
+        """CPA acima do qual uma campanha com conversão é ineficiente (1,5x a média); NaN sem linhas."""
+        return (self.cpa_sum / self.rows) * 1.5 if self.rows else float('nan')
+
+    def result(self) -> Dict:
+        threshold = self.inefficiency_threshold()
+
+        if self.max_inefficient is None:
+            inefficient = []
+            for names, cpa in self._converting:
+                inefficient.extend(_above(names, cpa, threshold))
+        else:
+            inefficient = [record for key, record in sorted(self._inefficient_heap, key=lambda item: item[0], reverse=True)
+                           if key[0] > threshold]
+
+        return {
+            "total_spend": round(self.total_cost, 2),
+            "total_conversions": int(self.total_conversions),
+            "global_cpa": round(self.total_cost / self.total_conversions, 2) if self.total_conversions > 0 else 0,
+            "top_campaigns": _ranked(self._top),
+            "inefficient_campaigns": inefficient,
+            "wasteful_spend": _ranked(self._waste),
+        }
+
+
+def aggregate_batches(batches: Iterable[Batch], top_k: int = 3, max_inefficient: Optional[int] = None) -> Dict:
+    """Estatísticas de um relatório inteiro a partir de um iterável de lotes, sem materializá-lo."""
+    aggregator = StreamingAggregator(top_k=top_k, max_inefficient=max_inefficient)
+    for batch in batches:
+        aggregator.update(batch)
+    return aggregator.result()
+
+
+def inefficient_rows(batch: Batch, threshold: float) -> List[Dict]:
+    """Linhas com conversão e CPA acima de `threshold`, na ordem do lote (2ª passada, ver MetricsPool)."""
+    if isinstance(batch, (pa.RecordBatch, pa.Table)):
+        batch = {name: batch.column(name).to_numpy(zero_copy_only=False) for name in batch.schema.names}
+    conversions = np.asarray(batch['conversions']).astype('float64', copy=False)
+    converting = np.flatnonzero(conversions > 0)
+    return _above(np.asarray(batch['name'], dtype=object)[converting],
+                  np.asarray(batch['cpa'], dtype='float64')[converting], threshold)
+
+
+def _above(names: np.ndarray, cpa: np.ndarray, threshold: float) -> List[Dict]:
+    return [{'name': names[i], 'cpa': cpa[i].item()} for i in np.flatnonzero(cpa > threshold)]
+
+
+def _best(values: np.ndarray, k: int) -> np.ndarray:
+    """Posições dos k maiores valores, em ordem; empates ficam com a primeira ocorrência. O(n)."""
+    if k <= 0 or len(values) == 0:
+        return np.array([], dtype=int)
+    if k >= len(values):
+        return np.argsort(-values, kind="stable")
+    kth = np.partition(values, len(values) - k)[len(values) - k]
+    candidates = np.flatnonzero(values >= kth)  # inclui todos os empatados com o k-ésimo
+    return candidates[np.argsort(-values[candidates], kind="stable")][:k]
+
+
+def _ranked(heap: List[tuple]) -> List[Dict]:
+    return [record for _, record in sorted(heap, key=lambda item: item[0], reverse=True)]
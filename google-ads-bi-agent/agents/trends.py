@@ -0,0 +1,116 @@
+from datetime import date, timedelta
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+# Janelas comparadas com a janela imediatamente anterior de mesmo tamanho (dias completos)
+WINDOWS = {"wow": 7, "mom": 30}
+# Dias usados na linha de base (média/desvio diários) da tendência
+BASELINE_DAYS = 28
+TREND_METRICS = ["cost", "conversions", "clicks", "impressions", "cpa", "ctr_percent"]
+
+
+def daily_frame(daily_totals: pd.DataFrame) -> pd.DataFrame:
+    """Totais diários do CampaignStore (cost_micros, ...) -> uma linha por dia com cost, cpa e ctr_percent."""
+    cost = daily_totals['cost_micros'].to_numpy(dtype='float64') / 1_000_000
+    conversions = daily_totals['conversions'].to_numpy(dtype='float64')
+    clicks = daily_totals['clicks'].to_numpy(dtype='float64')
+    impressions = daily_totals['impressions'].to_numpy(dtype='float64')
+    return pd.DataFrame({
+        "date": pd.to_datetime(daily_totals['date']),
+        "cost": cost,
+        "conversions": conversions,
+        "clicks": clicks,
+        "impressions": impressions,
+        "cpa": np.divide(cost, conversions, out=np.zeros_like(cost), where=conversions > 0),
+        "ctr_percent": np.divide(clicks * 100, impressions, out=np.zeros_like(clicks), where=impressions > 0),
+    })
+
+
+def _window_totals(daily: pd.DataFrame, start: date, end: date) -> Dict:
+    mask = (daily['date'] >= pd.Timestamp(start)) & (daily['date'] <= pd.Timestamp(end))
+    window = daily.loc[mask]
+    cost, conversions = window['cost'].sum(), window['conversions'].sum()
+    clicks, impressions = window['clicks'].sum(), window['impressions'].sum()
+    return {
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "days": int(mask.sum()),
+        "cost": round(float(cost), 2),
+        "conversions": round(float(conversions), 2),
+        "clicks": int(clicks),
+        "impressions": int(impressions),
+        # Razões da janela (soma/soma), não média das razões diárias
+        "cpa": round(float(cost / conversions), 2) if conversions > 0 else 0.0,
+        "ctr_percent": round(float(clicks * 100 / impressions), 2) if impressions > 0 else 0.0,
+    }
+
+
+def window_comparison(daily: pd.DataFrame, end: date, days: int) -> Dict:
+    """Janela [end - days + 1, end] contra a anterior de mesmo tamanho, com variação % por métrica."""
+    current_start = end - timedelta(days=days - 1)
+    previous_end = current_start - timedelta(days=1)
+    current = _window_totals(daily, current_start, end)
+    previous = _window_totals(daily, previous_end - timedelta(days=days - 1), previous_end)
+    change = {}
+    for metric in TREND_METRICS:
+        before = previous[metric]
+        # Sem dados na janela anterior (ou base zero) não há variação a comparar
+        change[metric] = round((current[metric] - before) / before * 100, 1) if previous["days"] and before else None
+    return {"current": current, "previous": previous, "change_pct": change}
+
+
+def trend_baseline(daily: pd.DataFrame, end: date, days: int = BASELINE_DAYS) -> Dict:
+    """Média e desvio diários de cada métrica em [end - days + 1, end], com o z-score do último dia."""
+    mask = (daily['date'] > pd.Timestamp(end - timedelta(days=days))) & (daily['date'] <= pd.Timestamp(end))
+    window = daily.loc[mask].sort_values('date')
+    baseline = {"days": int(len(window))}
+    if window.empty:
+        return baseline
+    values = window[TREND_METRICS].to_numpy(dtype='float64')
+    mean, std, last = values.mean(axis=0), values.std(axis=0), values[-1]
+    zscore = np.divide(last - mean, std, out=np.zeros_like(mean), where=std > 0)
+    for i, metric in enumerate(TREND_METRICS):
+        baseline[metric] = {"mean": round(float(mean[i]), 2), "std": round(float(std[i]), 2),
+                            "last": round(float(last[i]), 2), "zscore": round(float(zscore[i]), 2)}
+    return baseline
+
+
+def build_history(store, customer_id: str, as_of: Optional[date] = None) -> Optional[Dict]:
+    """
+    Comparações WoW/MoM e linha de base a partir do CampaignStore local, sem chamar a API.
+    `as_of` é o último dia completo (padrão: ontem). None se a conta não tem dados locais
+    no período.
+    """
+    as_of = as_of or date.today() - timedelta(days=1)
+    longest = max(max(WINDOWS.values()) * 2, BASELINE_DAYS)
+    # Uma leitura só (partições podadas pelo intervalo de datas) cobre todas as janelas
+    totals = store.daily_totals(customer_id, as_of - timedelta(days=longest - 1), as_of)
+    if totals.empty:
+        return None
+    daily = daily_frame(totals)
+    history = {"as_of": as_of.isoformat()}
+    for name, days in WINDOWS.items():
+        history[name] = window_comparison(daily, as_of, days)
+    history["baseline"] = trend_baseline(daily, as_of)
+    return history
+
+
+def format_history(history: Optional[Dict]) -> str:
+    """Resumo curto do histórico para o prompt do LLM."""
+    if not history:
+        return "Sem histórico local para esta conta."
+    lines = []
+    for name, label in (("wow", "Semana vs semana anterior"), ("mom", "30 dias vs 30 anteriores")):
+        comparison = history[name]
+        parts = []
+        for metric in ("cost", "conversions", "cpa", "ctr_percent"):
+            change = comparison["change_pct"][metric]
+            parts.append(f"{metric} {comparison['current'][metric]} ({'n/d' if change is None else f'{change:+.1f}%'})")
+        lines.append(f"{label}: " + ", ".join(parts))
+    baseline = history["baseline"]
+    if baseline["days"]:
+        lines.append(f"Último dia vs média de {baseline['days']} dias (z-score): " + ", ".join(
+            f"{metric} {baseline[metric]['zscore']:+.2f}" for metric in ("cost", "conversions", "cpa")))
+    return "\n".join(lines)
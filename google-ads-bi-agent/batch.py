@@ -0,0 +1,148 @@
+import asyncio
+import argparse
+import json
+import os
+import signal
+import sys
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+
+# Carrega variáveis de ambiente
+load_dotenv()
+
+from a2a.event_bus import EventBus
+from utils.structured_log import configure_logging
+from utils.telemetry import telemetry
+
+
+def read_customer_ids(args) -> list:
+    """IDs da linha de comando e/ou de --customers-file (um por linha, '#' comenta)."""
+    customer_ids = list(args.customer_ids)
+    if args.customers_file:
+        with open(args.customers_file) as file:
+            customer_ids += [line.split("#")[0].strip() for line in file]
+    return [customer_id.replace("-", "") for customer_id in customer_ids if customer_id]
+
+
+async def run_batch(args, run_id=None):
+    """
+    Um run completo: extrai -> analisa -> grava cada customer (agents/batch_runner.py).
+    Relançar com o mesmo run_id retoma do checkpoint.
+    """
+    # Agentes (pandas, pyarrow, ...) só são importados quando o lote roda
+    from my_mcp.google_ads_client import GoogleAdsClientWrapper
+    from my_mcp.campaign_store import CampaignStore
+    from agents.google_ads_agent import GoogleAdsAgent
+    from agents.bi_analytics_agent import BIAnalyticsAgent
+    from agents.batch_runner import BatchCheckpoint, BatchRunner, ReportWriter
+
+    GoogleAdsClientWrapper.shared().warm_up()
+    # Os agentes se inscrevem no bus, mas o runner os chama diretamente (sem eventos)
+    bus = EventBus()
+    store = CampaignStore(os.getenv("WAREHOUSE_PATH", "data/warehouse"))
+    ads_agent = GoogleAdsAgent(bus, store=store, transport=os.getenv("MCP_TRANSPORT", "inprocess"),
+                               mcp_url=os.getenv("MCP_URL", "http://127.0.0.1:8000/mcp"))
+    bi_agent = BIAnalyticsAgent(bus, store=store)
+    checkpoint = BatchCheckpoint(args.state)
+
+    try:
+        customer_ids = read_customer_ids(args)
+        if not customer_ids and args.manager_id:
+            customer_ids = await ads_agent._run_io(ads_agent._get_ads_client().list_child_customers, args.manager_id)
+        if not customer_ids:
+            print("⚠️ Nenhum customer: informe IDs, --customers-file ou --manager-id.")
+            return None
+
+        runner = BatchRunner(
+            ads_agent, bi_agent, checkpoint,
+            output_dir=args.output,
+            run_id=run_id or args.run_id,
+            concurrency=args.concurrency,
+            max_retries=args.max_retries,
+            attempt_timeout=args.timeout,
+            analysis_timeout=args.timeout,
+            requests_per_second=args.rps,
+            date_range=args.date_range,
+            incremental=args.incremental,
+            window_days=args.window_days,
+            force=args.force,
+        )
+        print(f"▶️ Batch run {runner.run_id}: {len(customer_ids)} customers")
+        summary = await runner.run(customer_ids)
+        if args.parquet:
+            # O JSONL continua sendo a fonte (retomada); o Parquet é a tabela final para consulta
+            writer = ReportWriter(args.output, runner.run_id)
+            summary["parquet"] = await asyncio.to_thread(writer.to_parquet)
+            writer.close()
+        print(f"✅ Batch run {runner.run_id}: {json.dumps(summary, ensure_ascii=False)}")
+        print(f"🧠 LLM metrics: {json.dumps(bi_agent.llm_metrics())}")
+        print(f"📈 Pipeline stages: {json.dumps(telemetry.stage_summary())}")
+        return summary
+    finally:
+        await ads_agent.close()
+        bi_agent.close()
+        checkpoint.close()
+
+
+def seconds_until(hhmm: str, now=None) -> float:
+    """Segundos até o próximo HH:MM (hoje, ou amanhã se já passou)."""
+    now = now or datetime.now()
+    hour, minute = map(int, hhmm.split(":"))
+    target = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if target <= now:
+        target += timedelta(days=1)
+    return (target - now).total_seconds()
+
+
+async def main(args):
+    configure_logging()
+    # SIGTERM (cron, systemd, Kubernetes) encerra como Ctrl+C: o que terminou já está no checkpoint
+    task = asyncio.current_task()
+    try:
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, task.cancel)
+    except (NotImplementedError, RuntimeError):
+        pass  # Windows
+
+    if not args.at:
+        summary = await run_batch(args)
+        return 1 if summary and summary["failed"] else 0
+
+    # Modo agendado: um run por noite, com run_id = data do disparo
+    while True:
+        wait = seconds_until(args.at)
+        print(f"🕑 Próximo run às {args.at} (em {wait / 3600:.1f}h)")
+        await asyncio.sleep(wait)
+        await run_batch(args, run_id=datetime.now().date().isoformat())
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Lote noturno retomável: extrai, analisa e grava um relatório por customer.")
+    parser.add_argument("customer_ids", nargs="*", help="IDs de customer")
+    parser.add_argument("--customers-file", help="arquivo com um customer_id por linha")
+    parser.add_argument("--manager-id", help="todas as contas sob esta MCC (sem IDs explícitos)")
+    parser.add_argument("--run-id", help="identificador do run (padrão: data de hoje); repetir retoma")
+    parser.add_argument("--output", default=os.getenv("BATCH_OUTPUT", "data/reports"),
+                        help="diretório dos relatórios (<output>/<run_id>/reports.jsonl)")
+    parser.add_argument("--state", default=os.getenv("BATCH_STATE", "data/batch_state.sqlite"),
+                        help="banco SQLite de checkpoints")
+    parser.add_argument("--parquet", action="store_true", help="compacta o run em <output>/<run_id>/reports.parquet")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--max-retries", type=int, default=3)
+    parser.add_argument("--timeout", type=float, default=300.0, help="timeout por conta, extração e análise (s)")
+    parser.add_argument("--rps", type=float, help="quota global de chamadas à API por segundo")
+    parser.add_argument("--date-range", default="LAST_30_DAYS")
+    parser.add_argument("--incremental", action="store_true", help="extração incremental via CampaignStore")
+    parser.add_argument("--window-days", type=int, default=30)
+    parser.add_argument("--force", action="store_true", help="analisa mesmo contas sem mudança nos dados")
+    parser.add_argument("--at", metavar="HH:MM", help="modo agendado: roda todo dia neste horário")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    # Uso: python batch.py --customers-file contas.txt --parquet
+    try:
+        sys.exit(asyncio.run(main(parse_args())))
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        print("\n⏹️ Interrompido: relance o mesmo run para retomar do checkpoint.")
+        sys.exit(130)
@@ -0,0 +1,92 @@
+"""
+Benchmark: throughput de fetch_campaign_data por transporte MCP.
+
+Compara chamada in-process, sessão stdio persistente e HTTP local
+(streamable-http), com e sem agrupamento em fetch_campaign_data_batch.
+O servidor roda em modo mock, então o tempo medido é overhead de transporte.
+
+Uso (a partir de google-ads-bi-agent/):
+    python -m benchmarks.bench_mcp_transport --customers 500 --concurrency 32
+"""
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+from unittest.mock import MagicMock
+
+from agents.google_ads_agent import GoogleAdsAgent
+from my_mcp.client import PROJECT_ROOT
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_http_server(port: int) -> subprocess.Popen:
+    process = subprocess.Popen(
+        [sys.executable, "-m", "my_mcp.server", "--transport", "streamable-http", "--port", str(port)],
+        cwd=PROJECT_ROOT,
+        env={**os.environ, "PYTHONPATH": PROJECT_ROOT},
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 15
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return process
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("HTTP MCP server did not start")
+
+
+async def run_case(agent: GoogleAdsAgent, customers: int, concurrency: int) -> float:
+    # Uma chamada de aquecimento abre a sessão (spawn/handshake fora da medição)
+    await agent._fetch_customer("0")
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i: int):
+        async with semaphore:
+            await agent._fetch_customer(str(i))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(customers)))
+    elapsed = time.perf_counter() - started
+    await agent.close()
+    return elapsed
+
+
+async def main(args):
+    port = free_port()
+    http_server = start_http_server(port)
+    url = f"http://127.0.0.1:{port}/mcp"
+    cases = [
+        ("in-process", dict(transport="inprocess")),
+        ("stdio", dict(transport="stdio", mcp_batching=False)),
+        ("stdio + batch", dict(transport="stdio", mcp_batching=True)),
+        ("http", dict(transport="http", mcp_url=url, mcp_batching=False)),
+        ("http + batch", dict(transport="http", mcp_url=url, mcp_batching=True)),
+    ]
+    try:
+        print(f"{'transport':>14} | {'total (s)':>9} | {'calls/s':>9}")
+        print("-" * 40)
+        for name, kwargs in cases:
+            agent = GoogleAdsAgent(MagicMock(), **kwargs)
+            elapsed = await run_case(agent, args.customers, args.concurrency)
+            print(f"{name:>14} | {elapsed:>9.3f} | {args.customers / elapsed:>9.1f}")
+    finally:
+        http_server.terminate()
+        http_server.wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--customers", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=32)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,75 @@
+"""
+Benchmark: estatísticas de muitas contas no event loop vs. MetricsPool (processos).
+
+Mede o tempo total e o atraso máximo do event loop (LoopLagMonitor) calculando
+as estatísticas de N contas de M linhas. No pool, os trechos viajam como Arrow
+IPC em memória compartilhada.
+
+Uso (a partir de google-ads-bi-agent/):
+    python -m benchmarks.bench_metrics_pool --customers 16 --rows 500000 --workers 4
+"""
+import argparse
+import asyncio
+import time
+
+import numpy as np
+import pandas as pd
+
+from agents.metrics_pool import MetricsPool
+from agents.streaming_aggregator import StreamingAggregator
+from utils.loop_monitor import LoopLagMonitor
+
+
+def make_frame(n: int, seed: int) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    conversions = rng.poisson(2, n).astype(float)
+    conversions[rng.random(n) < 0.3] = 0
+    cost = rng.uniform(0, 500, n)
+    return pd.DataFrame({
+        "name": pd.array(np.char.add(f"c{seed}_", np.arange(n).astype(str)), dtype=object),
+        "cost": cost,
+        "conversions": conversions,
+        "cpa": np.divide(cost, conversions, out=np.zeros(n), where=conversions > 0),
+    })
+
+
+async def run_serial(frames):
+    for df in frames.values():
+        StreamingAggregator().update(df).result()
+        await asyncio.sleep(0)
+
+
+async def run_pool(pool, frames):
+    return await asyncio.gather(*(pool.compute(df) for df in frames.values()))
+
+
+async def timed(coro_factory):
+    monitor = LoopLagMonitor(interval=0.01)
+    monitor.start()
+    started = time.perf_counter()
+    await coro_factory()
+    elapsed = time.perf_counter() - started
+    return elapsed, (await monitor.stop())["max_ms"]
+
+
+async def main(args):
+    frames = {str(i): make_frame(args.rows, i) for i in range(args.customers)}
+    pool = MetricsPool(args.workers)
+    try:
+        await pool.compute(make_frame(10, 0))  # sobe os workers fora da medição
+        print(f"{'modo':>16} | {'total (s)':>9} | {'lag máx (ms)':>12}")
+        print("-" * 44)
+        for name, factory in (("event loop", lambda: run_serial(frames)),
+                              (f"pool ({args.workers} proc)", lambda: run_pool(pool, frames))):
+            elapsed, lag = await timed(factory)
+            print(f"{name:>16} | {elapsed:>9.2f} | {lag:>12.1f}")
+    finally:
+        pool.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--customers", type=int, default=16)
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--workers", type=int, default=4)
+    asyncio.run(main(parser.parse_args()))
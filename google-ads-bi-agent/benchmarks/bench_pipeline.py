@@ -0,0 +1,224 @@
+"""
+Benchmark de regressão: pipeline ponta a ponta sobre contas sintéticas (my_mcp/synthetic.py).
+
+Para cada escala (campanhas por conta) roda pedidos CMD_START_EXTRACT pelo EventBus em
+memória, com o cliente Google Ads em modo mock gerando a conta sintética (gasto
+assimétrico, cauda sem conversões, segmentos) e o LLM trocado por um stub. Mede:
+- ponta a ponta: latência do bus.request e linhas/s
+- por estágio, via telemetria (utils/telemetry.py): fetch (extração, inclui gerar a
+  conta), normalize, bus.dispatch, hard_metrics e prompt_build
+- pico de memória Python (tracemalloc), numa rodada separada para não distorcer os tempos
+
+--save NOME grava benchmarks/baselines/NOME.json (fora do git: cada máquina tem a sua);
+--compare NOME compara com essa linha de base e sai com código 1 se o ponta a ponta, algum
+estágio ou o pico de memória piorar mais que --threshold.
+
+Uso (a partir de google-ads-bi-agent/):
+    python -m benchmarks.bench_pipeline --scales 100 1000 10000 --segments 3 --save local
+    python -m benchmarks.bench_pipeline --scales 100 1000 10000 --segments 3 --compare local
+"""
+import argparse
+import asyncio
+import gc
+import json
+import logging
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Dict, List
+
+from a2a.event_bus import EventBus
+from agents.bi_analytics_agent import BIAnalyticsAgent
+from agents.google_ads_agent import GoogleAdsAgent
+from my_mcp.google_ads_client import GoogleAdsClientWrapper
+from my_mcp.synthetic import SyntheticAccount
+from utils.telemetry import telemetry
+
+BASELINE_DIR = os.path.join(os.path.dirname(__file__), "baselines")
+# Diferenças absolutas abaixo disto (ms) são ruído, mesmo que grandes em %
+NOISE_FLOOR_MS = 0.5
+
+STUB_STRATEGY = {
+    "summary": "Relatório de benchmark (LLM simulado).",
+    "recommended_actions": [{"action": "Nenhuma", "campaign_name": "-", "reasoning": "stub", "priority": "BAIXA"}],
+}
+
+
+class StubLLM:
+    """Ocupa o lugar do LLMExecutor: estratégia fixa, sem rede (latência opcional)."""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.calls = 0
+        self.prompt_chars = 0
+
+    async def ainvoke(self, inputs: Dict) -> Dict:
+        self.calls += 1
+        self.prompt_chars += len(str(inputs.get("df_view", "")))
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return STUB_STRATEGY
+
+    def metrics(self) -> Dict:
+        return {"calls": self.calls, "prompt_chars": self.prompt_chars}
+
+
+async def run_pipeline(account: SyntheticAccount, requests: int, llm_latency: float = 0.0) -> List[float]:
+    """Sobe bus + agentes sobre a conta sintética e devolve a latência (s) de cada pedido."""
+    EventBus._instance = None
+    wrapper = GoogleAdsClientWrapper(synthetic=account)
+    wrapper.cache = None  # cada pedido passa pelo gerador, nunca pelo cache de consultas
+    GoogleAdsClientWrapper.set_shared(wrapper)
+
+    bus = EventBus()
+    ads_agent = GoogleAdsAgent(bus, transport="inprocess")
+    bi_agent = BIAnalyticsAgent(bus)
+    stub = StubLLM(llm_latency)
+    bi_agent.llm = stub
+    bi_agent.llm_executor = stub
+    # Parser/prompt do LLM são montados na primeira análise; custo de partida (ver bench_startup), não por pedido
+    bi_agent._ensure_llm()
+    # Coleta completa agora, e não no meio do primeiro pedido medido
+    gc.collect()
+    await bus.connect()
+
+    latencies = []
+    try:
+        for i in range(requests):
+            started = time.perf_counter()
+            report = await bus.request("CMD_START_EXTRACT", {"customer_id": f"{9_000_000_000 + i}"}, timeout=600)
+            latencies.append(time.perf_counter() - started)
+            if "error" in report:
+                raise RuntimeError(f"Pipeline falhou: {report['error']}")
+    finally:
+        await bus.close()
+        await ads_agent.close()
+        bi_agent.close()
+        GoogleAdsClientWrapper.reset_shared()
+    return latencies
+
+
+def measure_scale(campaigns: int, segments: int, requests: int, seed: int, llm_latency: float) -> Dict:
+    account = SyntheticAccount(campaigns=campaigns, segments=segments, seed=seed)
+    # Aquecimento: imports tardios, primeiro uso de pandas/pyarrow
+    asyncio.run(run_pipeline(account, 1, llm_latency))
+
+    telemetry.reset()
+    latencies = asyncio.run(run_pipeline(account, requests, llm_latency))
+    stages = {name: {"mean_ms": values["mean_ms"], "p95_ms": values["p95_ms"],
+                     **({"rows_per_s": values["rows_per_s"]} if "rows_per_s" in values else {})}
+              for name, values in telemetry.stage_summary().items()}
+
+    tracemalloc.start()
+    asyncio.run(run_pipeline(account, 1, llm_latency))
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    latencies.sort()
+    mean = sum(latencies) / len(latencies)
+    return {
+        "campaigns": campaigns,
+        "segments": segments,
+        "rows": account.rows_per_day,
+        "requests": requests,
+        "end_to_end": {
+            "mean_ms": round(mean * 1000, 3),
+            "p95_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000, 3),
+            "rows_per_s": round(account.rows_per_day / mean, 1),
+        },
+        "stages": stages,
+        "peak_mb": round(peak / 2**20, 2),
+    }
+
+
+def baseline_path(name: str) -> str:
+    return name if name.endswith(".json") else os.path.join(BASELINE_DIR, f"{name}.json")
+
+
+def compare(current: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """Linhas de comparação impressas; devolve as regressões encontradas."""
+    regressions = []
+    previous = {str(result["rows"]): result for result in baseline["results"]}
+    print(f"\n{'linhas':>8} | {'métrica':>44} | {'base':>10} | {'atual':>10} | {'Δ%':>7}")
+    print("-" * 92)
+    for result in current["results"]:
+        before = previous.get(str(result["rows"]))
+        if before is None:
+            print(f"{result['rows']:>8} | {'(sem linha de base)':>44} |")
+            continue
+        pairs = [("ponta a ponta (ms)", before["end_to_end"]["mean_ms"], result["end_to_end"]["mean_ms"], NOISE_FLOOR_MS)]
+        pairs += [(f"{stage} (ms)", before["stages"][stage]["mean_ms"], values["mean_ms"], NOISE_FLOOR_MS)
+                  for stage, values in result["stages"].items() if stage in before["stages"]]
+        pairs.append(("pico de memória (MB)", before["peak_mb"], result["peak_mb"], 1.0))
+        for label, old, new, floor in pairs:
+            change = (new - old) / old if old else 0.0
+            regressed = change > threshold and new - old > floor
+            flag = " ⚠️" if regressed else ""
+            print(f"{result['rows']:>8} | {label[:44]:>44} | {old:>10.2f} | {new:>10.2f} | {change * 100:>+6.1f}%{flag}")
+            if regressed:
+                regressions.append(f"{result['rows']} linhas, {label}: {old:.2f} -> {new:.2f} ({change * 100:+.1f}%)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", type=int, nargs="+", default=[100, 1_000, 10_000], help="campanhas por conta")
+    parser.add_argument("--segments", type=int, default=3, help="linhas (segmentos) por campanha")
+    parser.add_argument("--requests", type=int, default=5, help="pedidos medidos por escala")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="latência simulada do LLM (s)")
+    parser.add_argument("--save", metavar="NOME", help="grava a linha de base (benchmarks/baselines/NOME.json)")
+    parser.add_argument("--compare", metavar="NOME", help="compara com uma linha de base gravada")
+    parser.add_argument("--threshold", type=float, default=0.2, help="piora relativa tolerada (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    # Sem cache de insights (cada pedido monta o prompt) e sem logs por pedido na saída
+    os.environ["LLM_CACHE_ENABLED"] = "false"
+    logging.disable(logging.ERROR)
+
+    results = []
+    print(f"{'linhas':>8} | {'ponta a ponta (ms)':>18} | {'linhas/s':>10} | {'pico (MB)':>9}")
+    print("-" * 56)
+    for campaigns in args.scales:
+        result = measure_scale(campaigns, args.segments, args.requests, args.seed, args.llm_latency)
+        results.append(result)
+        print(f"{result['rows']:>8} | {result['end_to_end']['mean_ms']:>18.2f} | "
+              f"{result['end_to_end']['rows_per_s']:>10.0f} | {result['peak_mb']:>9.1f}")
+        for stage, values in result["stages"].items():
+            rate = f"{values['rows_per_s']:>10.0f}" if "rows_per_s" in values else f"{'':>10}"
+            print(f"{'':>8} |   {stage[:34]:<34} {values['mean_ms']:>9.2f} ms | {rate}")
+
+    current = {
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "config": {"segments": args.segments, "requests": args.requests, "seed": args.seed,
+                   "llm_latency": args.llm_latency},
+        "results": results,
+    }
+    if args.save:
+        path = baseline_path(args.save)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w") as file:
+            json.dump(current, file, indent=2)
+        print(f"\n💾 Linha de base gravada em {path}")
+    if args.compare:
+        with open(baseline_path(args.compare)) as file:
+            baseline = json.load(file)
+        if baseline.get("config") != current["config"]:
+            print(f"⚠️ Configuração diferente da linha de base: {baseline.get('config')}")
+        regressions = compare(current, baseline, args.threshold)
+        if regressions:
+            print(f"\n❌ {len(regressions)} regressão(ões) acima de {args.threshold:.0%}:")
+            for line in regressions:
+                print(f"   - {line}")
+            sys.exit(1)
+        print(f"\n✅ Sem regressões acima de {args.threshold:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+Benchmark: tabela do prompt via df.to_markdown (legado) vs. build_table_view.
+
+Mede tempo de montagem e tokens estimados da tabela de campanhas enviada ao
+LLM para contas de tamanhos crescentes.
+
+Uso (a partir de google-ads-bi-agent/):
+    python -m benchmarks.bench_prompt_builder
+    python -m benchmarks.bench_prompt_builder --sizes 1000 100000 --budget 4000
+"""
+import argparse
+import time
+from unittest.mock import MagicMock
+
+from agents.bi_analytics_agent import BIAnalyticsAgent
+from agents.google_ads_agent import GoogleAdsAgent
+from agents.prompt_builder import build_table_view, estimate_tokens
+from benchmarks.bench_vectorized import make_rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1_000, 10_000, 100_000])
+    parser.add_argument("--budget", type=int, default=2000)
+    parser.add_argument("--markdown-max", type=int, default=10_000, help="to_markdown só até este tamanho (lento)")
+    args = parser.parse_args()
+
+    ads_agent = GoogleAdsAgent(MagicMock())
+    bi_agent = BIAnalyticsAgent(MagicMock())
+
+    print(f"{'rows':>8} | {'markdown (s)':>12} | {'md tokens':>10} | {'builder (s)':>11} | {'tokens':>7} | {'shown':>6}")
+    print("-" * 70)
+    for n in args.sizes:
+        df = ads_agent._process_data(make_rows(n))
+        bi_agent._calculate_hard_metrics(df)
+
+        md_time, md_tokens = "-", "-"
+        if n <= args.markdown_max:
+            started = time.perf_counter()
+            markdown = df[['name', 'cost', 'conversions', 'cpa', 'ctr_percent']].to_markdown(index=False)
+            md_time, md_tokens = f"{time.perf_counter() - started:.3f}", estimate_tokens(markdown)
+
+        started = time.perf_counter()
+        _, info = build_table_view(df, token_budget=args.budget)
+        elapsed = time.perf_counter() - started
+        print(f"{n:>8} | {md_time:>12} | {md_tokens:>10} | {elapsed:>11.4f} | {info['tokens']:>7} | {info['rows_shown']:>6}")
+
+
+if __name__ == "__main__":
+    main()
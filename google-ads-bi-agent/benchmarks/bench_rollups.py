@@ -0,0 +1,61 @@
+"""
+Benchmark: perguntas recorrentes de dashboard (gasto/conversões/CPA por janela) a partir
+das linhas brutas do CampaignStore vs. células pré-agregadas do RollupIndex.
+
+Uso (a partir de google-ads-bi-agent/):
+    python -m benchmarks.bench_rollups --days 365 --campaigns 2000
+"""
+import argparse
+import tempfile
+import time
+from datetime import date, timedelta
+
+from benchmarks.bench_warehouse import populate
+from my_mcp.campaign_store import CampaignStore
+
+
+def raw_window(store: CampaignStore, customer_id: str, start: date, end: date):
+    """Sem índice: lê as linhas da janela e soma."""
+    totals = store.daily_totals(customer_id, start, end)
+    cost, conversions = totals["cost_micros"].sum() / 1_000_000, totals["conversions"].sum()
+    return cost, conversions, cost / conversions if conversions else 0.0
+
+
+def timed_us(fn, repeat: int = 200) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best * 1_000_000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--campaigns", type=int, default=2000)
+    args = parser.parse_args()
+
+    end = date.today() - timedelta(days=1)
+    with tempfile.TemporaryDirectory() as tmp:
+        store = CampaignStore(tmp)
+        started = time.perf_counter()
+        populate(store, 1, args.days, args.campaigns, end)
+        print(f"📦 {args.days} dias x {args.campaigns} campanhas gravados (com rollups) em "
+              f"{time.perf_counter() - started:.1f}s")
+
+        print(f"{'janela':>22} | {'linhas brutas (µs)':>18} | {'rollups (µs)':>12} | {'células':>7}")
+        print("-" * 70)
+        for days in (7, 30, 90, 365):
+            start = end - timedelta(days=min(days, args.days) - 1)
+            raw = timed_us(lambda: raw_window(store, "0", start, end), repeat=5)
+            cells = store.rollups.window("0", start, end)["cells"]
+            rolled = timed_us(lambda: store.rollups.window("0", start, end))
+            print(f"{f'últimos {days} dias':>22} | {raw:>18.0f} | {rolled:>12.0f} | {cells:>7}")
+        by_campaign = timed_us(lambda: store.rollups.window("0", end - timedelta(days=29), end, by_campaign=True), repeat=20)
+        print(f"{'30 dias por campanha':>22} | {'':>18} | {by_campaign:>12.0f} |")
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
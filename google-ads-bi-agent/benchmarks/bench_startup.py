@@ -0,0 +1,113 @@
+"""
+Benchmark: tempo de partida (import + construção) de cada ponto de entrada, com orçamento.
+
+Cada alvo roda em um processo Python novo (cache de import frio, como um worker ou um
+servidor MCP stdio recém-criado), --runs vezes; vale a mediana. Também lista quais
+dependências pesadas cada alvo carregou: LangChain/Gemini só deve aparecer na primeira
+análise, google-ads só no modo real, pandas/pyarrow só onde há dados.
+
+Sai com código 1 se algum alvo passar do orçamento (multiplicado por --budget-scale, para
+máquinas mais lentas). --profile ALVO mostra os imports mais caros (python -X importtime).
+
+Uso (a partir de google-ads-bi-agent/):
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --runs 7 --budget-scale 1.5
+    python -m benchmarks.bench_startup --profile bi_agent
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Dependências cuja presença em sys.modules é reportada
+HEAVY_MODULES = ("pandas", "pyarrow", "langchain_google_genai", "google.ads.googleads.client", "mcp")
+
+# alvo -> (código medido, orçamento em segundos)
+TARGETS = {
+    "broker": ("import a2a.broker", 0.3),
+    "main": ("import main", 0.3),
+    "worker": ("import worker", 0.3),
+    "event_bus": ("import a2a.event_bus", 0.3),
+    "ads_agent": ("from agents.google_ads_agent import GoogleAdsAgent", 1.0),
+    "bi_agent": (
+        "import os\n"
+        "os.environ.setdefault('GOOGLE_API_KEY', 'bench-dummy-key')\n"
+        "from unittest.mock import MagicMock\n"
+        "from agents.bi_analytics_agent import BIAnalyticsAgent\n"
+        "BIAnalyticsAgent(MagicMock())",
+        1.2,
+    ),
+    "mcp_server": ("import my_mcp.server", 1.0),
+}
+
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+exec(compile({code!r}, "<bench>", "exec"))
+elapsed = time.perf_counter() - started
+print(json.dumps({{"seconds": elapsed, "loaded": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def run_once(code: str) -> dict:
+    env = {**os.environ, "LOG_LEVEL": "CRITICAL"}
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE.format(code=code, heavy=HEAVY_MODULES)],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def profile(code: str, top: int = 15):
+    """Imports com maior tempo acumulado, via -X importtime."""
+    stderr = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=ROOT,
+                            capture_output=True, text=True).stderr
+    rows = []
+    for line in stderr.splitlines():
+        if line.startswith("import time:") and "|" in line and "cumulative" not in line:
+            _, cumulative, name = line.split("|")
+            rows.append((int(cumulative), name.rstrip()))
+    print(f"{'acumulado (ms)':>15} | módulo")
+    print("-" * 60)
+    for cumulative, name in sorted(rows, reverse=True)[:top]:
+        print(f"{cumulative / 1000:>15.1f} | {name}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-scale", type=float, default=1.0)
+    parser.add_argument("--targets", nargs="+", choices=list(TARGETS), default=list(TARGETS))
+    parser.add_argument("--profile", choices=list(TARGETS), help="mostra os imports mais caros deste alvo")
+    args = parser.parse_args()
+
+    if args.profile:
+        profile(TARGETS[args.profile][0])
+        return
+
+    over_budget = []
+    print(f"{'alvo':>12} | {'mediana (ms)':>12} | {'orçamento':>9} | dependências pesadas carregadas")
+    print("-" * 90)
+    for name in args.targets:
+        code, budget = TARGETS[name]
+        runs = [run_once(code) for _ in range(args.runs)]
+        median = statistics.median(run["seconds"] for run in runs)
+        budget *= args.budget_scale
+        flag = "" if median <= budget else " ❌"
+        if flag:
+            over_budget.append(name)
+        loaded = ", ".join(runs[-1]["loaded"]) or "-"
+        print(f"{name:>12} | {median * 1000:>12.0f} | {budget * 1000:>7.0f}ms | {loaded}{flag}")
+
+    if over_budget:
+        print(f"\n❌ Acima do orçamento: {', '.join(over_budget)} (veja --profile ALVO)")
+        sys.exit(1)
+    print("\n✅ Todos os alvos dentro do orçamento")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Benchmark: estatísticas do relatório com DataFrame único vs. StreamingAggregator.
+
+Gera um relatório segmentado (dia x campanha x grupo x dispositivo) de N linhas em
+lotes e compara tempo e pico de memória (tracemalloc) de:
+- concatenar tudo e calcular como antes (várias passadas em memória);
+- agregar lote a lote em uma passada (max_inefficient limita a memória a O(1)).
+
+Uso (a partir de google-ads-bi-agent/):
+    python -m benchmarks.bench_streaming_aggregator --rows 2000000 --batch 100000
+"""
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from agents.streaming_aggregator import aggregate_batches
+
+
+def make_batches(rows: int, batch: int, seed: int = 42):
+    rng = np.random.default_rng(seed)
+    for start in range(0, rows, batch):
+        n = min(batch, rows - start)
+        conversions = rng.poisson(1, n)
+        conversions[rng.random(n) < 0.5] = 0
+        yield pd.DataFrame({
+            "name": pd.array(np.char.add("seg_", np.arange(start, start + n).astype(str)), dtype=object),
+            "cost": rng.uniform(0, 100, n).round(2),
+            "conversions": conversions,
+        })
+
+
+def in_memory_stats(df: pd.DataFrame):
+    """Cálculo anterior: DataFrame inteiro, uma passada por estatística."""
+    cost = df['cost'].to_numpy(dtype='float64')
+    conversions = df['conversions'].to_numpy(dtype='float64')
+    df['cpa'] = np.divide(cost, conversions, out=np.zeros_like(cost), where=conversions > 0)
+    high_cpa_threshold = df['cpa'].mean() * 1.5
+    df.nlargest(3, 'conversions')[['name', 'conversions', 'cpa']].to_dict('records')
+    df[(df['cpa'] > high_cpa_threshold) & (df['conversions'] > 0)][['name', 'cpa']].to_dict('records')
+    df[(df['conversions'] == 0) & (df['cost'] > 0)].nlargest(3, 'cost')[['name', 'cost']].to_dict('records')
+    return round(df['cost'].sum(), 2), int(df['conversions'].sum())
+
+
+def measure(fn):
+    tracemalloc.start()
+    started = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 1024 / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--batch", type=int, default=100_000)
+    args = parser.parse_args()
+
+    cases = [
+        ("in-memory (legado)", lambda: in_memory_stats(pd.concat(make_batches(args.rows, args.batch), ignore_index=True))),
+        ("streaming (exato)", lambda: aggregate_batches(make_batches(args.rows, args.batch))),
+        ("streaming (max_inefficient=100)", lambda: aggregate_batches(make_batches(args.rows, args.batch), max_inefficient=100)),
+    ]
+    print(f"{'modo':>32} | {'tempo (s)':>9} | {'pico (MB)':>9}")
+    print("-" * 57)
+    for name, fn in cases:
+        elapsed, peak = measure(fn)
+        print(f"{name:>32} | {elapsed:>9.2f} | {peak:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
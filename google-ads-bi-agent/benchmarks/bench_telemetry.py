@@ -0,0 +1,64 @@
+"""
+Benchmark: custo da instrumentação por chamada no caminho quente.
+
+Compara um laço vazio com: span habilitado (com record de linhas/bytes), span
+desabilitado (TELEMETRY_ENABLED=false), logger.debug filtrado por nível e o print
+que o EventBus fazia a cada publish (redirecionado para um buffer).
+
+Uso (a partir de google-ads-bi-agent/):
+    python -m benchmarks.bench_telemetry --calls 200000
+"""
+import argparse
+import contextlib
+import io
+import logging
+import time
+
+from utils.telemetry import Telemetry
+
+
+def per_call_ns(fn, calls: int) -> float:
+    started = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - started) / calls * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=200_000)
+    args = parser.parse_args()
+
+    enabled, disabled = Telemetry(), Telemetry(enabled=False)
+    logger = logging.getLogger("bench.telemetry")
+    logger.setLevel(logging.INFO)
+    sink = io.StringIO()
+
+    def span(telemetry):
+        def run():
+            with telemetry.span("normalize") as s:
+                s.record(rows=1000, bytes=65536)
+        return run
+
+    def printed():
+        with contextlib.redirect_stdout(sink):
+            print("📨 EventBus: Publishing to 'DATA_FETCHED' with payload size 65536 bytes")
+        sink.seek(0)
+        sink.truncate()
+
+    cases = [
+        ("baseline (nada)", lambda: None),
+        ("span habilitado", span(enabled)),
+        ("span desabilitado", span(disabled)),
+        ("logger.debug (nível INFO)", lambda: logger.debug("📨 EventBus: Publishing", extra={"topic": "T"})),
+        ("isEnabledFor(DEBUG)", lambda: logger.isEnabledFor(logging.DEBUG)),
+        ("print por publish (legado)", printed),
+    ]
+    print(f"{'caso':>28} | {'ns/chamada':>10}")
+    print("-" * 42)
+    for name, fn in cases:
+        print(f"{name:>28} | {per_call_ns(fn, args.calls):>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Benchmark: pipeline por linha (legado) vs. pipeline colunar vetorizado.
+
+Mede _process_data + montagem do DataFrame + _calculate_hard_metrics com
+N linhas de campanha sintéticas.
+
+Uso (a partir de google-ads-bi-agent/):
+    python -m benchmarks.bench_vectorized
+    python -m benchmarks.bench_vectorized --sizes 10000 100000
+"""
+import argparse
+import time
+from unittest.mock import MagicMock
+
+import numpy as np
+import pandas as pd
+
+from agents.bi_analytics_agent import BIAnalyticsAgent
+from agents.google_ads_agent import GoogleAdsAgent
+
+
+def make_rows(n: int, seed: int = 42):
+    rng = np.random.default_rng(seed)
+    conversions = rng.poisson(2, n)
+    conversions[rng.random(n) < 0.3] = 0
+    return [
+        {"campaign_id": i, "campaign_name": f"Campanha_{i}", "clicks": int(c), "impressions": int(im),
+         "cost_micros": int(cm), "conversions": int(cv), "status": "ENABLED"}
+        for i, c, im, cm, cv in zip(
+            range(n), rng.integers(0, 1_000, n), rng.integers(1, 50_000, n),
+            rng.integers(0, 500_000_000, n), conversions,
+        )
+    ]
+
+
+# --- Implementação anterior (referência) ---
+def legacy_process_data(raw_data):
+    processed_data = []
+    for row in raw_data:
+        cost_real = row.get('cost_micros', 0) / 1_000_000
+        conversions = row.get('conversions', 0)
+        cpa = round(cost_real / conversions, 2) if conversions > 0 else 0.0
+        processed_data.append({
+            "id": str(row.get('campaign_id')),
+            "name": row.get('campaign_name'),
+            "status": row.get('status'),
+            "metrics": {
+                "clicks": row.get('clicks'),
+                "impressions": row.get('impressions'),
+                "cost": round(cost_real, 2),
+                "conversions": conversions,
+                "cpa": cpa
+            }
+        })
+    return processed_data
+
+
+def legacy_hard_metrics(df):
+    df['cpa'] = df.apply(lambda x: x['cost'] / x['conversions'] if x['conversions'] > 0 else 0, axis=1)
+    df['ctr_percent'] = (df['clicks'] / df['impressions'] * 100).fillna(0)
+    high_cpa_threshold = df['cpa'].mean() * 1.5
+    df.nlargest(3, 'conversions')[['name', 'conversions', 'cpa']].to_dict('records')
+    df[(df['cpa'] > high_cpa_threshold) & (df['conversions'] > 0)][['name', 'cpa']].to_dict('records')
+    df[(df['conversions'] == 0) & (df['cost'] > 0)].nlargest(3, 'cost')[['name', 'cost']].to_dict('records')
+
+
+def run_legacy(rows):
+    processed = legacy_process_data(rows)
+    df = pd.DataFrame([item['metrics'] | {'name': item['name'], 'id': item['id'], 'status': item['status']} for item in processed])
+    legacy_hard_metrics(df)
+
+
+def run_vectorized(rows, ads_agent, bi_agent):
+    df = bi_agent._to_frame(ads_agent._process_data(rows))
+    bi_agent._calculate_hard_metrics(df)
+
+
+def timed(fn, *args):
+    started = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    args = parser.parse_args()
+
+    bus = MagicMock()
+    ads_agent = GoogleAdsAgent(bus)
+    bi_agent = BIAnalyticsAgent(bus)
+
+    print(f"{'rows':>10} | {'legacy (s)':>11} | {'vectorized (s)':>14} | {'speedup':>8}")
+    print("-" * 54)
+    for n in args.sizes:
+        rows = make_rows(n)
+        legacy = timed(run_legacy, rows)
+        vectorized = timed(run_vectorized, rows, ads_agent, bi_agent)
+        print(f"{n:>10} | {legacy:>11.3f} | {vectorized:>14.3f} | {legacy / vectorized:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
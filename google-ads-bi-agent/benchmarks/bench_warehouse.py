@@ -0,0 +1,93 @@
+"""
+Benchmark: consultas de janela no CampaignStore (Parquet particionado por customer/data).
+
+Grava D dias x C campanhas para alguns customers e mede:
+- leitura legada: um pq.read_table por dia + concat (todas as colunas);
+- scan com poda de partições e projeção de colunas (pyarrow.dataset, mmap);
+- daily_totals (agregação por dia no Arrow) e build_history (WoW/MoM + linha de base).
+
+Uso (a partir de google-ads-bi-agent/):
+    python -m benchmarks.bench_warehouse --days 365 --campaigns 2000 --customers 3
+"""
+import argparse
+import tempfile
+import time
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from agents.trends import build_history
+from my_mcp.campaign_store import CampaignStore
+
+
+def populate(store: CampaignStore, customers: int, days: int, campaigns: int, end: date, seed: int = 42):
+    rng = np.random.default_rng(seed)
+    ids = np.arange(campaigns).astype(str)
+    for customer in range(customers):
+        for offset in range(days):
+            store.write_day(str(customer), end - timedelta(days=offset), pd.DataFrame({
+                "campaign_id": ids,
+                "campaign_name": np.char.add("camp_", ids),
+                "status": "ENABLED",
+                "clicks": rng.poisson(20, campaigns),
+                "impressions": rng.poisson(1000, campaigns),
+                "cost_micros": rng.integers(0, 50_000_000, campaigns),
+                "conversions": rng.poisson(1, campaigns).astype(float),
+            }))
+
+
+def legacy_read(store: CampaignStore, customer_id: str, start: date, end: date) -> pd.DataFrame:
+    """Leitura anterior: um arquivo por dia, todas as colunas, concat no fim."""
+    tables = []
+    for day in store.days(customer_id):
+        if start <= day <= end:
+            table = pq.read_table(store._partition_path(customer_id, day), memory_map=True)
+            tables.append(table.append_column("date", pa.array([day.isoformat()] * table.num_rows, pa.string())))
+    return pa.concat_tables(tables).to_pandas()
+
+
+def timed(fn, repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--campaigns", type=int, default=2000)
+    parser.add_argument("--customers", type=int, default=3)
+    args = parser.parse_args()
+
+    end = date.today() - timedelta(days=1)
+    with tempfile.TemporaryDirectory() as tmp:
+        store = CampaignStore(tmp)
+        started = time.perf_counter()
+        populate(store, args.customers, args.days, args.campaigns, end)
+        print(f"📦 {args.customers} customers x {args.days} dias x {args.campaigns} campanhas "
+              f"gravados em {time.perf_counter() - started:.1f}s")
+
+        last_60 = end - timedelta(days=59)
+        cases = [
+            ("legado: 60 dias, todas as colunas", lambda: legacy_read(store, "0", last_60, end)),
+            ("scan: 60 dias, todas as colunas", lambda: store.scan(["0"], last_60, end)),
+            ("scan: 60 dias, 2 colunas", lambda: store.scan(["0"], last_60, end, columns=["cost_micros", "conversions"])),
+            ("daily_totals: 60 dias", lambda: store.daily_totals("0", last_60, end)),
+            ("build_history (WoW/MoM/base)", lambda: build_history(store, "0", as_of=end)),
+            ("scan: todos customers, 7 dias", lambda: store.scan(start=end - timedelta(days=6), end=end)),
+        ]
+        print(f"{'consulta':>36} | {'melhor (ms)':>11}")
+        print("-" * 51)
+        for name, fn in cases:
+            print(f"{name:>36} | {timed(fn):>11.1f}")
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,21 @@
 import asyncio
 import os
+import sys
 import json
 from dotenv import load_dotenv
 
 # Carrega variáveis de ambiente
 load_dotenv()
 
-from a2a.event_bus import EventBus
-from agents.google_ads_agent import GoogleAdsAgent
-from agents.bi_analytics_agent import BIAnalyticsAgent
+from a2a.event_bus import EventBus, RequestFailed
+from a2a.transports import SocketTransport
+from utils.loop_monitor import LoopLagMonitor
+from utils.structured_log import configure_logging
+from utils.telemetry import telemetry
 
-async def main():
+async def main(customer_ids=None):
+    # LOG_LEVEL / LOG_FORMAT=json: logs dos agentes e do EventBus (ver utils/structured_log.py)
+    configure_logging()
     print("🚀 Google Ads BI Agent System (Async A2A + Gemini + MCP)")
     print("=======================================================")
     
@@ -22,40 +27,143 @@ async def main():
     # 1. Inicializa o Barramento de Eventos
     bus = EventBus()
 
-    # 2. Inicializa os Agentes (Eles se inscrevem no Bus no __init__)
-    ads_agent = GoogleAdsAgent(bus)
-    bi_agent = BIAnalyticsAgent(bus)
-    
-    # Variável de controle para encerrar o loop (Future)
-    loop = asyncio.get_running_loop()
-    completion_future = loop.create_future()
+    # Mede a responsividade do event loop durante toda a execução
+    loop_monitor = LoopLagMonitor()
+    loop_monitor.start()
 
-    # 3. Handler para encerramento
-    async def finish_pipeline(payload):
-        print("\n✅ Pipeline Finished! Report received.")
-        print("-" * 40)
-        print(json.dumps(payload, indent=2, ensure_ascii=False))
-        print("-" * 40)
-        if not completion_future.done():
-            completion_future.set_result(True)
+    # TELEMETRY_PORT: expõe /metrics (Prometheus) e /metrics.json durante a execução
+    telemetry_server = None
+    if os.getenv("TELEMETRY_PORT"):
+        telemetry_server = await telemetry.start_http_server(port=int(os.getenv("TELEMETRY_PORT")))
+        print(f"📈 Telemetry: http://127.0.0.1:{os.getenv('TELEMETRY_PORT')}/metrics")
 
-    async def handle_error(payload):
-        print(f"\n❌ Pipeline Error: {payload}")
-        if not completion_future.done():
-            completion_future.set_result(False)
+    # EVENT_BUS_BROKER=host:port: modo multi-processo. Os agentes rodam em workers
+    # (`python worker.py ads|bi`) conectados ao broker (`python -m a2a.broker`).
+    broker = os.getenv("EVENT_BUS_BROKER")
+    ads_agent = None
+    bi_agent = None
+    if broker:
+        bus.use_transport(SocketTransport(broker))
+    else:
+        # Agentes (pandas, pyarrow, ...) só são importados quando rodam neste processo
+        from my_mcp.google_ads_client import GoogleAdsClientWrapper
+        from my_mcp.campaign_store import CampaignStore
+        from agents.google_ads_agent import GoogleAdsAgent
+        from agents.bi_analytics_agent import BIAnalyticsAgent
+        from agents.metrics_pool import MetricsPool
 
-    bus.subscribe("REPORT_READY", finish_pipeline)
-    bus.subscribe("ERROR", handle_error)
+        # Cliente Google Ads compartilhado: config, credenciais e canal gRPC prontos antes do primeiro comando
+        GoogleAdsClientWrapper.shared().warm_up()
 
-    # 4. Inicia o Fluxo
-    print("\n▶️ Sending Start Command...")
-    await bus.publish("CMD_START_EXTRACT", {"customer_id": "1234567890"})
+        # 2. Inicializa os Agentes (Eles se inscrevem no Bus no __init__)
+        # MCP_TRANSPORT: inprocess (padrão) | stdio | http (MCP_URL aponta para o servidor HTTP)
+        # Armazenamento colunar local compartilhado: o Ads Agent grava o histórico diário a cada
+        # extração e o BI Agent lê as janelas WoW/MoM e as anomalias dele, sem chamar a API
+        store = CampaignStore(os.getenv("WAREHOUSE_PATH", "data/warehouse"))
+        ads_agent = GoogleAdsAgent(
+            bus,
+            store=store,
+            transport=os.getenv("MCP_TRANSPORT", "inprocess"),
+            mcp_url=os.getenv("MCP_URL", "http://127.0.0.1:8000/mcp"),
+        )
+        # BI_STREAM_REPORTS=true: REPORT_PARTIAL com os números na hora e a estratégia conforme o LLM gera
+        # BI_METRICS_WORKERS=N: estatísticas calculadas em N processos (útil no modo lote, contas grandes)
+        metrics_workers = int(os.getenv("BI_METRICS_WORKERS", "0"))
+        bi_agent = BIAnalyticsAgent(
+            bus,
+            stream_reports=os.getenv("BI_STREAM_REPORTS", "").lower() in ("1", "true", "yes"),
+            metrics_pool=MetricsPool(metrics_workers) if metrics_workers > 0 else None,
+            store=store,
+        )
+        # Import do LangChain (~2-3s) em uma thread enquanto a extração roda (shutdown cancela)
+        bi_agent.start_warm_up()
+
+    customer_ids = customer_ids or ["1234567890"]
+    if len(customer_ids) > 1:
+        # Modo lote: um relatório (ou erro) por customer; para milhares de contas, use batch.py
+        # (checkpoint, retomada, relatórios em disco)
+        # Análises em fila limitada: a extração não espera o LLM, mas desacelera se a fila encher
+        bus.configure_topic("DATA_FETCHED", maxsize=64, workers=4, policy="block")
+        results = {"reports": 0, "errors": 0}
+        analyzed = asyncio.Event()
+        expected = None
+
+        def tally(kind):
+            async def handler(data):
+                results[kind] += 1
+                if kind == "errors":
+                    print(f"❌ {data.get('customer_id')}: {data.get('message')}")
+                else:
+                    print(f"📄 Report ready for {data.get('customer_id')}")
+                if expected is not None and results["reports"] + results["errors"] >= expected:
+                    analyzed.set()
+            return handler
+
+        bus.subscribe("REPORT_READY", tally("reports"))
+        bus.subscribe("ERROR", tally("errors"))
+        await bus.connect()
+
+        # BATCH_TIMEOUT (s): limite do lote inteiro, extração e análises
+        deadline = asyncio.get_running_loop().time() + float(os.getenv("BATCH_TIMEOUT", "3600"))
+        print(f"\n▶️ Sending Batch Start Command ({len(customer_ids)} customers)...")
+        try:
+            summary = await bus.request(
+                "CMD_START_BATCH_EXTRACT", {"customer_ids": customer_ids}, reply_topic="BATCH_EXTRACT_DONE",
+                timeout=deadline - asyncio.get_running_loop().time(),
+            )
+            print(f"\n✅ Batch Extraction Finished: {json.dumps(summary, indent=2, ensure_ascii=False)}")
+            # Falhas de extração já vieram no resumo; espera um REPORT_READY/ERROR por conta extraída
+            # (no modo broker as análises rodam nos workers, não há fila local para esperar)
+            expected = summary["succeeded"]
+            if results["reports"] + results["errors"] < expected:
+                await asyncio.wait_for(analyzed.wait(), deadline - asyncio.get_running_loop().time())
+            print(f"📊 Reports: {results['reports']} ready, {results['errors']} failed")
+        except RequestFailed as e:
+            print(f"\n❌ Batch Error: {e.payload}")
+        except asyncio.TimeoutError:
+            print(f"\n⏳ Batch timeout ({results['reports']} reports, {results['errors']} errors so far).")
+        print(f"📊 EventBus metrics: {json.dumps(bus.metrics(), indent=2)}")
+        if bi_agent is not None:
+            print(f"🧠 LLM metrics: {json.dumps(bi_agent.llm_metrics(), indent=2)}")
+        await shutdown(bus, ads_agent, bi_agent, loop_monitor, telemetry_server)
+        return
 
-    # 5. Mantém rodando até finalizar ou Timeout (30s)
+    async def show_partial(partial):
+        print(f"⏩ Partial report #{partial['sequence']} ({partial['stage']}) for {partial.get('customer_id')}")
+
+    bus.subscribe("REPORT_PARTIAL", show_partial)
+    await bus.connect()
+
+    # 3. Inicia o Fluxo e aguarda o REPORT_READY deste pedido (correlation_id), com timeout de 30s
+    print("\n▶️ Sending Start Command...")
     try:
-        await asyncio.wait_for(completion_future, timeout=30.0)
+        report = await bus.request("CMD_START_EXTRACT", {"customer_id": customer_ids[0]}, timeout=30.0)
+        print("\n✅ Pipeline Finished! Report received.")
+        print("-" * 40)
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+        print("-" * 40)
+    except RequestFailed as e:
+        print(f"\n❌ Pipeline Error: {e.payload}")
     except asyncio.TimeoutError:
         print("\n⏳ Timeout waiting for pipeline completion.")
 
+    await shutdown(bus, ads_agent, bi_agent, loop_monitor, telemetry_server)
+
+async def shutdown(bus, ads_agent, bi_agent, loop_monitor, telemetry_server=None):
+    await bus.close()
+    if ads_agent is not None:
+        await ads_agent.close()
+    if bi_agent is not None:
+        bi_agent.close()
+    print(f"⏱️ Event loop lag: {await loop_monitor.stop()}")
+    print(f"📈 Pipeline stages: {json.dumps(telemetry.stage_summary(), indent=2)}")
+    # TELEMETRY_JSON=caminho: histogramas, contadores e spans recentes em JSON
+    if os.getenv("TELEMETRY_JSON"):
+        telemetry.dump_json(os.getenv("TELEMETRY_JSON"))
+    if telemetry_server is not None:
+        telemetry_server.close()
+        await telemetry_server.wait_closed()
+
 if __name__ == "__main__":
-    asyncio.run(main())
+    # Uso: python main.py [customer_id ...]  (mais de um ID ativa o modo lote)
+    asyncio.run(main(sys.argv[1:]))
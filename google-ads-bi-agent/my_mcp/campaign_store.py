@@ -0,0 +1,203 @@
+import os
+import sqlite3
+import logging
+import threading
+from datetime import date, timedelta
+from typing import List, Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.fs as pafs
+import pyarrow.parquet as pq
+
+from my_mcp.rollup_index import RollupIndex
+
+logger = logging.getLogger(__name__)
+
+# Columns stored in each day partition (the date itself is the partition key).
+STORE_SCHEMA = pa.schema([
+    ("campaign_id", pa.string()),
+    ("campaign_name", pa.string()),
+    ("status", pa.string()),
+    ("clicks", pa.int64()),
+    ("impressions", pa.int64()),
+    ("cost_micros", pa.int64()),
+    ("conversions", pa.float64()),
+])
+
+# Hive partition keys, read back as strings (ISO dates compare correctly as strings)
+PARTITIONING = ds.partitioning(pa.schema([("customer_id", pa.string()), ("date", pa.string())]), flavor="hive")
+DATE_PARTITIONING = ds.partitioning(pa.schema([("date", pa.string())]), flavor="hive")
+
+METRIC_SUMS = ["clicks", "impressions", "cost_micros", "conversions"]
+
+
+class CampaignStore:
+    """
+    Local columnar store of daily campaign metrics.
+
+    Layout: `<root>/customer_id=<id>/date=<YYYY-MM-DD>/part-0.parquet`, one
+    partition per customer per day. Writing a day replaces that partition,
+    which is how restated days are merged. Per-customer sync state (the
+    high-water mark) is kept in `<root>/_state.sqlite`.
+
+    Reads go through `pyarrow.dataset` over memory-mapped files: customer and
+    date filters prune partitions before any file is opened, other filters
+    and the column list are pushed down to the Parquet reader.
+
+    With `rollups=True` (default), every write_day() also updates the
+    day/week/month cells of `<root>/_rollups.sqlite` (see RollupIndex).
+    """
+
+    def __init__(self, root: str = "data/warehouse", rollups: bool = True):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self._lock = threading.Lock()
+        self._filesystem = pafs.LocalFileSystem(use_mmap=True)
+        self._conn = sqlite3.connect(os.path.join(root, "_state.sqlite"), check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS sync_state (
+                customer_id TEXT PRIMARY KEY,
+                high_water_mark TEXT NOT NULL,
+                updated_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        self._conn.commit()
+        self.rollups = RollupIndex(os.path.join(root, "_rollups.sqlite")) if rollups else None
+
+    # --- Partitions ---
+
+    def _customer_dir(self, customer_id: str) -> str:
+        return os.path.join(self.root, f"customer_id={customer_id}")
+
+    def _partition_path(self, customer_id: str, day: date) -> str:
+        return os.path.join(self._customer_dir(customer_id), f"date={day.isoformat()}", "part-0.parquet")
+
+    def write_day(self, customer_id: str, day: date, frame: pd.DataFrame):
+        """Replaces the partition for (customer_id, day). An empty frame marks the day as synced with no data."""
+        table = pa.Table.from_pandas(
+            frame.reindex(columns=STORE_SCHEMA.names).astype({"campaign_id": str}),
+            schema=STORE_SCHEMA,
+            preserve_index=False,
+        )
+        path = self._partition_path(customer_id, day)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write-then-rename so readers never see a half-written partition (dot files are skipped by scans)
+        tmp_path = os.path.join(os.path.dirname(path), ".part-0.parquet.tmp")
+        pq.write_table(table, tmp_path)
+        os.replace(tmp_path, path)
+        if self.rollups is not None:
+            self.rollups.apply_day(customer_id, day, table)
+
+    def customers(self) -> List[str]:
+        return sorted(
+            name.split("=", 1)[1] for name in os.listdir(self.root)
+            if name.startswith("customer_id=") and os.path.isdir(os.path.join(self.root, name))
+        )
+
+    def days(self, customer_id: str) -> List[date]:
+        customer_dir = self._customer_dir(customer_id)
+        if not os.path.isdir(customer_dir):
+            return []
+        return sorted(
+            date.fromisoformat(name.split("=", 1)[1])
+            for name in os.listdir(customer_dir)
+            if name.startswith("date=") and os.path.exists(os.path.join(customer_dir, name, "part-0.parquet"))
+        )
+
+    def scan(self, customer_ids: Optional[List[str]] = None, start: Optional[date] = None, end: Optional[date] = None,
+             columns: Optional[List[str]] = None, filter: Optional[ds.Expression] = None) -> pa.Table:
+        """
+        Arrow table for the given customers (all if None) and [start, end], with
+        `date` (and `customer_id` for multi-customer scans) partition columns.
+        `filter` is an extra pyarrow.dataset expression, e.g. `ds.field("cost_micros") > 0`.
+        """
+        columns = list(columns) if columns is not None else list(STORE_SCHEMA.names)
+        expression = filter
+        for clause in (
+            ds.field("date") >= start.isoformat() if start else None,
+            ds.field("date") <= end.isoformat() if end else None,
+        ):
+            if clause is not None:
+                expression = clause if expression is None else expression & clause
+
+        if customer_ids is not None and len(customer_ids) == 1:
+            # One customer: discovery only walks that customer's directory
+            base, partitioning = self._customer_dir(customer_ids[0]), DATE_PARTITIONING
+            wanted = columns + ["date"]
+        else:
+            base, partitioning = self.root, PARTITIONING
+            if customer_ids is not None:
+                clause = ds.field("customer_id").isin(list(customer_ids))
+                expression = clause if expression is None else expression & clause
+            wanted = columns + ["date", "customer_id"]
+
+        if not os.path.isdir(base):
+            return self._empty(wanted)
+        dataset = ds.dataset(base, schema=None, format="parquet", partitioning=partitioning, filesystem=self._filesystem)
+        if not dataset.files:
+            return self._empty(wanted)
+        return dataset.to_table(columns=wanted, filter=expression)
+
+    @staticmethod
+    def _empty(columns: List[str]) -> pa.Table:
+        return pa.schema([STORE_SCHEMA.field(c) if c in STORE_SCHEMA.names else pa.field(c, pa.string())
+                          for c in columns]).empty_table()
+
+    def read(self, customer_id: str, start: date, end: date, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """Reads [start, end] for one customer, with a `date` column added."""
+        return self.scan([customer_id], start, end, columns).to_pandas()
+
+    def daily_totals(self, customer_id: str, start: date, end: date) -> pd.DataFrame:
+        """One row per stored day in [start, end] with summed metrics; aggregated in Arrow, never row by row."""
+        table = self.scan([customer_id], start, end, columns=METRIC_SUMS)
+        totals = table.group_by("date").aggregate([(column, "sum") for column in METRIC_SUMS])
+        totals = totals.rename_columns([name.removesuffix("_sum") for name in totals.column_names])
+        return totals.sort_by("date").to_pandas()
+
+    def campaign_totals(self, customer_id: str, start: date, end: date) -> pd.DataFrame:
+        """Sums metrics per campaign over [start, end]; name and status come from the latest day."""
+        df = self.read(customer_id, start, end)
+        if df.empty:
+            return df.drop(columns="date")
+        df = df.sort_values("date")
+        return df.groupby("campaign_id", as_index=False, sort=False).agg(
+            campaign_name=("campaign_name", "last"),
+            status=("status", "last"),
+            clicks=("clicks", "sum"),
+            impressions=("impressions", "sum"),
+            cost_micros=("cost_micros", "sum"),
+            conversions=("conversions", "sum"),
+        )
+
+    # --- Sync state ---
+
+    def get_high_water_mark(self, customer_id: str) -> Optional[date]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT high_water_mark FROM sync_state WHERE customer_id = ?", (customer_id,)
+            ).fetchone()
+        return date.fromisoformat(row[0]) if row else None
+
+    def set_high_water_mark(self, customer_id: str, day: date):
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO sync_state (customer_id, high_water_mark) VALUES (?, ?) "
+                "ON CONFLICT(customer_id) DO UPDATE SET high_water_mark = excluded.high_water_mark, "
+                "updated_at = CURRENT_TIMESTAMP",
+                (customer_id, day.isoformat()),
+            )
+            self._conn.commit()
+
+    def close(self):
+        self._conn.close()
+        if self.rollups is not None:
+            self.rollups.close()
+
+
+def date_range(start: date, end: date):
+    day = start
+    while day <= end:
+        yield day
+        day += timedelta(days=1)
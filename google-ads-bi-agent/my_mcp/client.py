@@ -0,0 +1,154 @@
+import os
+import sys
+import json
+import asyncio
+import logging
+from contextlib import AsyncExitStack
+from typing import Any, Dict, List, Optional
+
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+from mcp.client.streamable_http import streamablehttp_client
+
+logger = logging.getLogger(__name__)
+
+# Project root (google-ads-bi-agent/), used as cwd for the spawned stdio server
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class McpToolClient:
+    """
+    Persistent MCP client session to the GoogleAdsService server.
+
+    `transport="stdio"` spawns `python -m my_mcp.server` once and keeps it;
+    `transport="http"` connects to a running server over streamable HTTP
+    (`python -m my_mcp.server --transport streamable-http`).
+
+    The session lives in a dedicated background task (the MCP transports
+    require their context to be entered and exited by the same task), and
+    is shared by every caller: concurrent call_tool() requests are
+    multiplexed over the same connection.
+    """
+
+    def __init__(self, transport: str = "stdio", url: str = "http://127.0.0.1:8000/mcp"):
+        if transport not in ("stdio", "http"):
+            raise ValueError(f"Unsupported MCP transport: {transport}")
+        self.transport = transport
+        self.url = url
+        self._session: Optional[ClientSession] = None
+        self._runner: Optional[asyncio.Task] = None
+        self._ready: Optional[asyncio.Future] = None
+        self._closing: Optional[asyncio.Event] = None
+        self._connect_lock = asyncio.Lock()
+
+    async def connect(self):
+        async with self._connect_lock:
+            if self._session is not None:
+                return
+            loop = asyncio.get_running_loop()
+            self._ready = loop.create_future()
+            self._closing = asyncio.Event()
+            self._runner = loop.create_task(self._run_session())
+            await self._ready
+
+    async def _run_session(self):
+        try:
+            async with AsyncExitStack() as stack:
+                if self.transport == "stdio":
+                    params = StdioServerParameters(
+                        command=sys.executable,
+                        args=["-m", "my_mcp.server"],
+                        cwd=PROJECT_ROOT,
+                        env={**os.environ, "PYTHONPATH": PROJECT_ROOT},
+                    )
+                    read, write = await stack.enter_async_context(stdio_client(params))
+                else:
+                    read, write, _ = await stack.enter_async_context(streamablehttp_client(self.url))
+                session = await stack.enter_async_context(ClientSession(read, write))
+                await session.initialize()
+                self._session = session
+                logger.info(f"MCP session connected ({self.transport}).")
+                self._ready.set_result(None)
+                await self._closing.wait()
+        except Exception as e:
+            if not self._ready.done():
+                self._ready.set_exception(e)
+            else:
+                logger.error(f"MCP session closed with error: {e}")
+        finally:
+            self._session = None
+
+    async def call_tool(self, name: str, arguments: Dict[str, Any]) -> str:
+        """Calls a tool and returns its text content."""
+        if self._session is None:
+            await self.connect()
+        result = await self._session.call_tool(name, arguments)
+        text = "".join(getattr(item, "text", "") for item in result.content)
+        if result.isError:
+            raise RuntimeError(f"MCP tool {name} failed: {text}")
+        return text
+
+    async def close(self):
+        if self._runner is not None:
+            self._closing.set()
+            await self._runner
+            self._runner = None
+
+
+class CampaignDataBatcher:
+    """
+    Coalesces concurrent fetch_campaign_data requests into fetch_campaign_data_batch calls.
+
+    Requests arriving within `max_delay` seconds of each other (up to
+    `max_batch` customers) share one MCP round trip, amortizing framing and
+    server dispatch overhead across customers.
+    """
+
+    def __init__(self, client: McpToolClient, max_batch: int = 50, max_delay: float = 0.005):
+        self.client = client
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._pending: Dict[str, Dict[str, List[asyncio.Future]]] = {}
+        self._timers: Dict[str, asyncio.TimerHandle] = {}
+        self._inflight = set()
+
+    async def fetch(self, customer_id: str, date_range: str = "LAST_30_DAYS") -> List[Dict[str, Any]]:
+        """Returns the rows fetch_campaign_data would return for this customer."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        pending = self._pending.setdefault(date_range, {})
+        pending.setdefault(customer_id, []).append(future)
+
+        if len(pending) >= self.max_batch:
+            self._flush(date_range)
+        elif date_range not in self._timers:
+            self._timers[date_range] = loop.call_later(self.max_delay, self._flush, date_range)
+        return await future
+
+    def _flush(self, date_range: str):
+        timer = self._timers.pop(date_range, None)
+        if timer is not None:
+            timer.cancel()
+        pending = self._pending.pop(date_range, None)
+        if pending:
+            task = asyncio.get_running_loop().create_task(self._send(date_range, pending))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _send(self, date_range: str, pending: Dict[str, List[asyncio.Future]]):
+        try:
+            raw = await self.client.call_tool(
+                "fetch_campaign_data_batch", {"customer_ids": list(pending), "date_range": date_range}
+            )
+            results = json.loads(raw)
+        except Exception as e:
+            for futures in pending.values():
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+            return
+        for customer_id, futures in pending.items():
+            rows = results.get(customer_id, [])
+            for future in futures:
+                if not future.done():
+                    future.set_result(rows)
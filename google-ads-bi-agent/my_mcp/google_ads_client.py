@@ -1,26 +1,118 @@
 import os
+import re
 import yaml
+import importlib.util
+import asyncio
 import logging
-from typing import List, Dict, Any
+import threading
+from typing import List, Dict, Any, Iterator, Iterable, AsyncIterator, Optional
+
+from datetime import date, timedelta
+from concurrent.futures import Executor
+
+from my_mcp.query_cache import QueryCache
 
-# Config logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Conditional import for real client to allow running in envs without google-ads installed
-try:
-    from google.ads.googleads.client import GoogleAdsClient as OfficialClient
-    from google.ads.googleads.errors import GoogleAdsException
-    GOOGLE_ADS_LIB_AVAILABLE = True
-except ImportError:
-    GOOGLE_ADS_LIB_AVAILABLE = False
+
+def _google_ads_installed() -> bool:
+    try:
+        return importlib.util.find_spec("google.ads.googleads") is not None
+    except ModuleNotFoundError:
+        return False
+
+
+# The google-ads library is only imported when a real client authenticates
+# (see _load_google_ads): mock runs and MCP handshakes don't pay for it
+GOOGLE_ADS_LIB_AVAILABLE = _google_ads_installed()
+if not GOOGLE_ADS_LIB_AVAILABLE:
     logger.warning("⚠️ google-ads library not found. Running in restricted mode (Mock only).")
 
+
+class GoogleAdsException(Exception):
+    """Stand-in until _load_google_ads() rebinds the name to the library's exception."""
+
+
+def _load_google_ads():
+    """Imports the google-ads client on first real use and returns the GoogleAdsClient class."""
+    global GoogleAdsException
+    from google.ads.googleads.client import GoogleAdsClient
+    from google.ads.googleads.errors import GoogleAdsException
+    return GoogleAdsClient
+
+# Default number of rows per streamed batch. Peak memory of a streamed
+# extraction is bounded by this value, not by the size of the account.
+DEFAULT_BATCH_SIZE = 10_000
+
+# Columns produced for each campaign row (execute_query / iter_query_batches).
+CAMPAIGN_COLUMNS = ("campaign_id", "campaign_name", "clicks", "impressions", "cost_micros", "conversions", "status")
+
+# Daily-segmented variant, used by the incremental sync (one row per campaign per day).
+DAILY_CAMPAIGN_COLUMNS = CAMPAIGN_COLUMNS + ("date",)
+
+DAILY_CAMPAIGN_QUERY = """
+    SELECT
+        segments.date,
+        campaign.id,
+        campaign.name,
+        campaign.status,
+        metrics.clicks,
+        metrics.impressions,
+        metrics.cost_micros,
+        metrics.conversions
+    FROM campaign
+    WHERE segments.date BETWEEN '{start}' AND '{end}'
+"""
+
+CAMPAIGN_QUERY = """
+    SELECT
+        campaign.id,
+        campaign.name,
+        campaign.status,
+        metrics.clicks,
+        metrics.impressions,
+        metrics.cost_micros,
+        metrics.conversions
+    FROM campaign
+    WHERE segments.date DURING {date_range}
+"""
+
+CHILD_CUSTOMERS_QUERY = """
+    SELECT
+        customer_client.id,
+        customer_client.manager,
+        customer_client.level
+    FROM customer_client
+    WHERE customer_client.level <= {max_depth}
+"""
+
+
 class GoogleAdsClientWrapper:
-    def __init__(self, config_path="config/settings.yaml"):
+    # Process-wide registry of shared wrappers, one per config file (see shared())
+    _registry: Dict[str, "GoogleAdsClientWrapper"] = {}
+    _registry_lock = threading.Lock()
+
+    def __init__(self, config_path="config/settings.yaml", cache: Optional[QueryCache] = None,
+                 synthetic: Optional["SyntheticAccount"] = None):
         self.config = self._load_config(config_path)
         self.use_mock = self.config.get('google_ads', {}).get('use_mock', True)
+        # Mock data: the three classic campaigns, or a generated account
+        # (explicit instance, or `google_ads: {synthetic: {campaigns: ..., ...}}` in settings.yaml)
+        synthetic_config = self.config.get('google_ads', {}).get('synthetic')
+        if synthetic is None and synthetic_config:
+            from my_mcp.synthetic import SyntheticAccount
+            synthetic = SyntheticAccount.from_config(synthetic_config)
+        self.synthetic = synthetic
         self.client = None
+        # Service stubs are cached: each get_service() call opens a new gRPC channel
+        self._services: Dict[str, Any] = {}
+        self._services_lock = threading.Lock()
+
+        # Local result cache: explicit instance, or `cache: {enabled: true, ...}` in settings.yaml
+        cache_config = self.config.get('cache', {})
+        if cache is None and cache_config.get('enabled', False):
+            cache = QueryCache.from_config(cache_config)
+        self.cache = cache
         
         if not self.use_mock:
             if not GOOGLE_ADS_LIB_AVAILABLE:
@@ -30,6 +122,57 @@ class GoogleAdsClientWrapper:
         else:
             logger.warning("⚠️ Starting GoogleAdsClient in MOCK MODE")
 
+    @classmethod
+    def shared(cls, config_path="config/settings.yaml") -> "GoogleAdsClientWrapper":
+        """
+        Returns the process-wide wrapper for `config_path`, creating it on first use.
+
+        Config is read and credentials are loaded once per process; gRPC
+        channels, service stubs and OAuth token refreshes are then reused by
+        every caller and every customer.
+        """
+        key = os.path.abspath(config_path)
+        with cls._registry_lock:
+            if key not in cls._registry:
+                cls._registry[key] = cls(config_path)
+            return cls._registry[key]
+
+    @classmethod
+    def set_shared(cls, wrapper: "GoogleAdsClientWrapper", config_path="config/settings.yaml"):
+        """Installs `wrapper` as the shared one for `config_path` (e.g. a synthetic account in benchmarks)."""
+        with cls._registry_lock:
+            cls._registry[os.path.abspath(config_path)] = wrapper
+
+    @classmethod
+    def reset_shared(cls):
+        """Drops every shared wrapper (e.g. after config changes or in tests)."""
+        with cls._registry_lock:
+            cls._registry.clear()
+
+    def warm_up(self):
+        """
+        Opens the GoogleAdsService channel and refreshes the OAuth token up
+        front, so the first real query doesn't pay for the connection setup.
+        """
+        if self.use_mock:
+            return
+        self._get_service("GoogleAdsService")
+        credentials = getattr(self.client, "credentials", None)
+        if credentials is not None and not credentials.valid:
+            from google.auth.transport.requests import Request
+            credentials.refresh(Request())
+        logger.info("✅ Google Ads client warmed up.")
+
+    def _get_service(self, name: str):
+        service = self._services.get(name)
+        if service is None:
+            with self._services_lock:
+                service = self._services.get(name)
+                if service is None:
+                    service = self.client.get_service(name)
+                    self._services[name] = service
+        return service
+
     def _load_config(self, path) -> dict:
         try:
             # Adjust path if running from root or elsewhere, simplistic approach
@@ -38,7 +181,7 @@ class GoogleAdsClientWrapper:
                 pass
                 
             with open(path, 'r') as file:
-                return yaml.safe_load(file)
+                return yaml.safe_load(file) or {}
         except FileNotFoundError:
             logger.error(f"Config file not found at: {path}")
             return {}
@@ -47,9 +190,9 @@ class GoogleAdsClientWrapper:
         try:
             ads_config = self.config.get('google_ads', {})
             # Remove use_mock and other custom keys if necessary before passing to Google
-            clean_config = {k: v for k, v in ads_config.items() if k != 'use_mock'}
+            clean_config = {k: v for k, v in ads_config.items() if k not in ('use_mock', 'synthetic')}
             
-            self.client = OfficialClient.load_from_dict(clean_config)
+            self.client = _load_google_ads().load_from_dict(clean_config)
             logger.info("✅ Successfully authenticated with Google Ads API.")
         except Exception as e:
             logger.error(f"❌ Authentication failed: {e}")
@@ -58,36 +201,167 @@ class GoogleAdsClientWrapper:
     def execute_query(self, customer_id: str, query: str) -> List[Dict[str, Any]]:
         """
         Executes a GAQL query.
+        Results are served from / stored in the local cache when one is configured.
         """
+        if self.cache is not None:
+            cached = self.cache.get(customer_id, query)
+            if cached is not None:
+                return cached
+
+        results = self._search(customer_id, query)
+        # Empty results are not cached: a new account may start serving rows any time
+        if self.cache is not None and results:
+            self.cache.put(customer_id, query, results)
+        return results
+
+    def _search(self, customer_id: str, query: str) -> List[Dict[str, Any]]:
         if self.use_mock:
-            return self._mock_response()
+            return list(self._mock_response(query, customer_id))
 
         try:
-            ga_service = self.client.get_service("GoogleAdsService")
+            ga_service = self._get_service("GoogleAdsService")
             response = ga_service.search(customer_id=customer_id, query=query)
-            
-            results = []
-            for row in response:
-                item = {
-                    "campaign_id": row.campaign.id,
-                    "campaign_name": row.campaign.name,
-                    "clicks": row.metrics.clicks,
-                    "impressions": row.metrics.impressions,
-                    "cost_micros": row.metrics.cost_micros,
-                    "conversions": row.metrics.conversions,
-                    "status": row.campaign.status.name
-                }
-                results.append(item)
-            return results
+            return [self._row_to_item(row) for row in response]
 
         except GoogleAdsException as ex:
+            # Propagated: an empty list would look like an account without campaigns
+            # and skip the caller's retries (ExtractionScheduler) and ERROR event
             logger.error(f"Google API Error: {ex.error.code().name}")
-            return []
+            raise
 
-    def _mock_response(self):
-        """Mock data for testing"""
+    def iter_query_batches(self, customer_id: str, query: str, batch_size: int = DEFAULT_BATCH_SIZE,
+                           columns: Iterable[str] = CAMPAIGN_COLUMNS) -> Iterator[Dict[str, list]]:
+        """
+        Streams a GAQL query through `search_stream`, yielding column batches.
+
+        Each batch is a dict of column name -> list of values (`columns`,
+        CAMPAIGN_COLUMNS by default) with at most `batch_size` rows, so consumers can
+        start working on the first page while the rest is still in flight.
+
+        Cached results are replayed from the cache; streamed results are not
+        written to it, since that would require holding the whole result.
+        """
+        if batch_size <= 0:
+            raise ValueError("batch_size must be positive")
+
+        rows = self.cache.get(customer_id, query) if self.cache is not None else None
+        if rows is None:
+            rows = self._mock_response(query, customer_id) if self.use_mock else self._stream_rows(customer_id, query)
+        yield from _batch_columns(rows, batch_size, tuple(columns))
+
+    async def aiter_query_batches(self, customer_id: str, query: str, batch_size: int = DEFAULT_BATCH_SIZE,
+                                  columns: Iterable[str] = CAMPAIGN_COLUMNS, executor: Optional[Executor] = None) -> AsyncIterator[Dict[str, list]]:
+        """
+        Async variant of iter_query_batches.
+
+        The blocking gRPC stream is advanced in a worker thread (of `executor`,
+        or the loop's default one), one batch at a time, so the event loop is
+        never blocked while waiting for a page.
+        """
+        loop = asyncio.get_running_loop()
+        batches = self.iter_query_batches(customer_id, query, batch_size, columns)
+        done = object()
+        while True:
+            batch = await loop.run_in_executor(executor, next, batches, done)
+            if batch is done:
+                return
+            yield batch
+
+    def list_child_customers(self, manager_id: str, max_depth: int = 10) -> List[str]:
+        """
+        Walks the MCC hierarchy under `manager_id` and returns the IDs of all
+        non-manager (client) accounts.
+        """
+        if self.use_mock:
+            return [f"{manager_id[:-1]}{i}" for i in range(1, 4)]
+
+        try:
+            ga_service = self._get_service("GoogleAdsService")
+            query = CHILD_CUSTOMERS_QUERY.format(max_depth=max_depth)
+            response = ga_service.search(customer_id=manager_id, query=query)
+            return [str(row.customer_client.id) for row in response if not row.customer_client.manager]
+
+        except GoogleAdsException as ex:
+            logger.error(f"Google API Error: {ex.error.code().name}")
+            raise
+
+    def _stream_rows(self, customer_id: str, query: str) -> Iterator[Dict[str, Any]]:
+        # An error mid-stream is re-raised after the pages already yielded, so a
+        # truncated result never passes for a complete one
+        try:
+            ga_service = self._get_service("GoogleAdsService")
+            stream = ga_service.search_stream(customer_id=customer_id, query=query)
+            for response in stream:
+                for row in response.results:
+                    yield self._row_to_item(row)
+
+        except GoogleAdsException as ex:
+            logger.error(f"Google API Error: {ex.error.code().name}")
+            raise
+
+    @staticmethod
+    def _row_to_item(row) -> Dict[str, Any]:
+        item = {
+            "campaign_id": row.campaign.id,
+            "campaign_name": row.campaign.name,
+            "clicks": row.metrics.clicks,
+            "impressions": row.metrics.impressions,
+            "cost_micros": row.metrics.cost_micros,
+            "conversions": row.metrics.conversions,
+            "status": row.campaign.status.name
+        }
+        # Only present when the query selects segments.date
+        if row.segments.date:
+            item["date"] = row.segments.date
+        return item
+
+    def _mock_response(self, query: str = "", customer_id: str = ""):
+        """Mock data for testing (one row per campaign per day for date-segmented queries)"""
+        match = _DAILY_RANGE_RE.search(query) if _SELECTS_DATE_RE.search(query) else None
+        if self.synthetic is not None:
+            if match:
+                return self.synthetic.daily_rows(customer_id, date.fromisoformat(match.group(1)),
+                                                 date.fromisoformat(match.group(2)))
+            during = _DURING_DAYS_RE.search(query)
+            return self.synthetic.rows(customer_id, int(during.group(1)) if during else 30)
+
+        campaigns = self._mock_campaigns()
+        if not match:
+            return campaigns
+
+        day, end = date.fromisoformat(match.group(1)), date.fromisoformat(match.group(2))
+        rows = []
+        while day <= end:
+            rows.extend(row | {"date": day.isoformat()} for row in campaigns)
+            day += timedelta(days=1)
+        return rows
+
+    @staticmethod
+    def _mock_campaigns():
         return [
             {"campaign_id": "111", "campaign_name": "Campanha_Vendas_BlackFriday", "clicks": 150, "impressions": 5000, "cost_micros": 50000000, "conversions": 10, "status": "ENABLED"},
             {"campaign_id": "222", "campaign_name": "Campanha_Branding_Institucional", "clicks": 500, "impressions": 20000, "cost_micros": 120000000, "conversions": 2, "status": "ENABLED"},
             {"campaign_id": "333", "campaign_name": "Campanha_Teste_ProdutoX", "clicks": 20, "impressions": 800, "cost_micros": 8000000, "conversions": 0, "status": "PAUSED"},
         ]
+
+
+_SELECTS_DATE_RE = re.compile(r"SELECT\b(?:(?!\bFROM\b).)*\bsegments\.date\b", re.IGNORECASE | re.DOTALL)
+_DAILY_RANGE_RE = re.compile(r"segments\.date\s+BETWEEN\s+'([\d-]+)'\s+AND\s+'([\d-]+)'", re.IGNORECASE)
+_DURING_DAYS_RE = re.compile(r"DURING\s+LAST_(\d+)_DAYS", re.IGNORECASE)
+
+
+def _batch_columns(rows: Iterable[Dict[str, Any]], batch_size: int,
+                   columns: tuple = CAMPAIGN_COLUMNS) -> Iterator[Dict[str, list]]:
+    """Groups row dicts into column batches of at most `batch_size` rows."""
+    batch = {col: [] for col in columns}
+    size = 0
+    for row in rows:
+        for col in columns:
+            batch[col].append(row.get(col))
+        size += 1
+        if size == batch_size:
+            yield batch
+            batch = {col: [] for col in columns}
+            size = 0
+    if size:
+        yield batch
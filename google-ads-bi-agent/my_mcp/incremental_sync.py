@@ -0,0 +1,108 @@
+import logging
+from datetime import date, timedelta
+from typing import Dict, Any, List, Optional, Tuple
+
+import pandas as pd
+
+from my_mcp.campaign_store import CampaignStore, date_range
+from my_mcp.google_ads_client import (
+    GoogleAdsClientWrapper,
+    DAILY_CAMPAIGN_COLUMNS,
+    DAILY_CAMPAIGN_QUERY,
+    DEFAULT_BATCH_SIZE,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class IncrementalSync:
+    """
+    Day-partitioned incremental sync of campaign metrics into a CampaignStore.
+
+    Each run fetches only the days after the customer's high-water mark plus
+    the last `restatement_days` already-synced days (conversions are restated
+    by Google for a few days), so API calls scale with new days, not with the
+    report window. Today is never synced: its data is still incomplete.
+    """
+
+    def __init__(self, client: GoogleAdsClientWrapper, store: CampaignStore,
+                 restatement_days: int = 3, initial_days: int = 30, batch_size: int = DEFAULT_BATCH_SIZE):
+        if restatement_days < 0:
+            raise ValueError("restatement_days must be >= 0")
+        self.client = client
+        self.store = store
+        self.restatement_days = restatement_days
+        self.initial_days = initial_days
+        self.batch_size = batch_size
+
+    def plan(self, customer_id: str, window_days: Optional[int] = None, today: Optional[date] = None) -> List[Tuple[date, date]]:
+        """
+        Returns the (start, end) date ranges that must be fetched so the store
+        covers the last `window_days` closed days (default: initial_days).
+        """
+        today = today or date.today()
+        end = today - timedelta(days=1)
+        window_start = today - timedelta(days=window_days or self.initial_days)
+        high_water_mark = self.store.get_high_water_mark(customer_id)
+        stored_days = self.store.days(customer_id)
+
+        if high_water_mark is None or not stored_days:
+            return [(window_start, end)]
+
+        ranges = []
+        # Backfill if the requested window reaches further back than what is stored
+        if window_start < stored_days[0]:
+            ranges.append((window_start, stored_days[0] - timedelta(days=1)))
+
+        start = max(window_start, high_water_mark - timedelta(days=self.restatement_days - 1)) \
+            if self.restatement_days else high_water_mark + timedelta(days=1)
+        if start <= end:
+            ranges.append((start, end))
+        return ranges
+
+    def sync(self, customer_id: str, window_days: Optional[int] = None, today: Optional[date] = None) -> Dict[str, Any]:
+        """
+        Fetches the planned ranges, replaces their day partitions and advances the high-water mark.
+        API errors propagate; ranges fetched before the failing one are kept.
+        """
+        ranges = self.plan(customer_id, window_days, today)
+        summary = {"customer_id": customer_id, "ranges": [], "days_written": 0, "rows": 0, "api_calls": 0}
+
+        for start, end in ranges:
+            # The whole range is fetched before any partition is replaced: an API error
+            # (re-raised by the client, even mid-stream) leaves those days and the high-water
+            # mark untouched, so the next run fetches them again instead of keeping them as
+            # synced with zero spend
+            try:
+                rows = self._fetch_range(customer_id, start, end)
+            except Exception:
+                logger.error(f"Incremental sync for {customer_id} failed on {start}..{end}; days left unsynced.")
+                raise
+            summary["api_calls"] += 1
+            summary["rows"] += len(rows)
+            by_day = dict(tuple(rows.groupby("date"))) if not rows.empty else {}
+            for day in date_range(start, end):
+                day_rows = by_day.get(day.isoformat(), rows.iloc[0:0])
+                self.store.write_day(customer_id, day, day_rows.drop(columns="date"))
+                summary["days_written"] += 1
+            summary["ranges"].append((start.isoformat(), end.isoformat()))
+
+        if ranges:
+            high_water_mark = self.store.get_high_water_mark(customer_id)
+            last_day = max(end for _, end in ranges)
+            if high_water_mark is None or last_day > high_water_mark:
+                self.store.set_high_water_mark(customer_id, last_day)
+
+        logger.info(f"Incremental sync for {customer_id}: {summary['days_written']} days, {summary['rows']} rows, "
+                    f"{summary['api_calls']} API calls.")
+        return summary
+
+    def _fetch_range(self, customer_id: str, start: date, end: date) -> pd.DataFrame:
+        query = DAILY_CAMPAIGN_QUERY.format(start=start.isoformat(), end=end.isoformat())
+        frames = [
+            pd.DataFrame(batch)
+            for batch in self.client.iter_query_batches(customer_id, query, self.batch_size, DAILY_CAMPAIGN_COLUMNS)
+        ]
+        if not frames:
+            return pd.DataFrame(columns=list(DAILY_CAMPAIGN_COLUMNS))
+        return pd.concat(frames, ignore_index=True)
@@ -0,0 +1,126 @@
+import re
+import hashlib
+import logging
+from datetime import date, timedelta
+from typing import List, Dict, Any, Optional, Tuple
+
+from utils.sqlite_cache import SQLiteCache
+
+logger = logging.getLogger(__name__)
+
+_DURING_RE = re.compile(r"segments\.date\s+during\s+(\w+)", re.IGNORECASE)
+_BETWEEN_RE = re.compile(r"segments\.date\s+between\s+'([\d-]+)'\s+and\s+'([\d-]+)'", re.IGNORECASE)
+_EQUALS_RE = re.compile(r"segments\.date\s*=\s*'([\d-]+)'", re.IGNORECASE)
+_TOKEN_RE = re.compile(r"'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"|\S+")
+
+
+def normalize_gaql(query: str) -> str:
+    """
+    Canonical form of a GAQL query for cache keys: whitespace collapsed and
+    everything outside string literals lower-cased (GAQL keywords and field
+    names are case-insensitive, literals are not).
+    """
+    tokens = []
+    for token in _TOKEN_RE.findall(query):
+        tokens.append(token if token[0] in "'\"" else token.lower())
+    return " ".join(tokens)
+
+
+def resolve_date_range(literal: str, today: date) -> Tuple[date, date]:
+    """Resolves a GAQL relative date literal (LAST_30_DAYS, ...) to concrete (start, end) dates."""
+    literal = literal.upper()
+    if literal == "TODAY":
+        return today, today
+    if literal == "YESTERDAY":
+        day = today - timedelta(days=1)
+        return day, day
+    match = re.fullmatch(r"LAST_(\d+)_DAYS", literal)
+    if match:
+        return today - timedelta(days=int(match.group(1))), today - timedelta(days=1)
+    if literal == "THIS_MONTH":
+        return today.replace(day=1), today
+    if literal == "LAST_MONTH":
+        end = today.replace(day=1) - timedelta(days=1)
+        return end.replace(day=1), end
+    if literal == "THIS_WEEK_SUN_TODAY":
+        return today - timedelta(days=(today.weekday() + 1) % 7), today
+    if literal == "THIS_WEEK_MON_TODAY":
+        return today - timedelta(days=today.weekday()), today
+    if literal == "LAST_WEEK_SUN_SAT":
+        start = today - timedelta(days=(today.weekday() + 1) % 7 + 7)
+        return start, start + timedelta(days=6)
+    if literal == "LAST_WEEK_MON_SUN":
+        start = today - timedelta(days=today.weekday() + 7)
+        return start, start + timedelta(days=6)
+    if literal == "LAST_BUSINESS_WEEK":
+        start = today - timedelta(days=today.weekday() + 7)
+        return start, start + timedelta(days=4)
+    raise ValueError(f"Unsupported date range literal: {literal}")
+
+
+def date_segment(query: str, today: Optional[date] = None) -> Tuple[str, bool]:
+    """
+    Returns the concrete date segment of a query as "START:END" and whether
+    it is still open (includes today, so its data can still change).
+
+    Relative ranges are resolved against `today`, so "LAST_30_DAYS" run on
+    two different days maps to two different cache entries.
+    """
+    today = today or date.today()
+    try:
+        match = _DURING_RE.search(query)
+        if match:
+            start, end = resolve_date_range(match.group(1), today)
+        elif _BETWEEN_RE.search(query):
+            match = _BETWEEN_RE.search(query)
+            start, end = date.fromisoformat(match.group(1)), date.fromisoformat(match.group(2))
+        elif _EQUALS_RE.search(query):
+            start = end = date.fromisoformat(_EQUALS_RE.search(query).group(1))
+        else:
+            # No date filter: the result covers "all time", which includes today
+            return f"ALL_TIME@{today.isoformat()}", True
+    except ValueError:
+        return f"UNKNOWN@{today.isoformat()}", True
+    return f"{start.isoformat()}:{end.isoformat()}", end >= today
+
+
+class QueryCache(SQLiteCache):
+    """
+    Local SQLite cache of GAQL results keyed by (customer ID, normalized GAQL, date segment).
+
+    - Closed date segments (entirely before today) live for `closed_ttl` seconds;
+      segments that include today only for `open_ttl` seconds.
+    - Entries are evicted least-recently-used once the stored payloads exceed `max_bytes`.
+    - Storage, eviction and stats() come from utils.sqlite_cache.SQLiteCache.
+    """
+
+    def __init__(self, path: str = "cache/query_cache.sqlite", closed_ttl: float = 7 * 86400,
+                 open_ttl: float = 900, max_bytes: int = 256 * 1024 * 1024):
+        super().__init__(path, table="query_results", max_bytes=max_bytes)
+        self.closed_ttl = closed_ttl
+        self.open_ttl = open_ttl
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "QueryCache":
+        return cls(
+            path=config.get("path", "cache/query_cache.sqlite"),
+            closed_ttl=config.get("closed_ttl_seconds", 7 * 86400),
+            open_ttl=config.get("open_ttl_seconds", 900),
+            max_bytes=config.get("max_bytes", 256 * 1024 * 1024),
+        )
+
+    @staticmethod
+    def make_key(customer_id: str, query: str, today: Optional[date] = None) -> Tuple[str, str, bool]:
+        segment, is_open = date_segment(query, today)
+        raw = f"{customer_id}\x1f{normalize_gaql(query)}\x1f{segment}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest(), segment, is_open
+
+    def get(self, customer_id: str, query: str) -> Optional[List[Dict[str, Any]]]:
+        key, _, _ = self.make_key(customer_id, query)
+        return self._get(key)
+
+    def put(self, customer_id: str, query: str, rows: List[Dict[str, Any]]):
+        key, segment, is_open = self.make_key(customer_id, query)
+        ttl = self.open_ttl if is_open else self.closed_ttl
+        if not self._put(key, rows, ttl, label=f"{customer_id} {segment}"):
+            logger.warning(f"Query result for {customer_id} exceeds cache size, not cached.")
@@ -0,0 +1,218 @@
+import os
+import sqlite3
+import threading
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+import pyarrow as pa
+
+GRAINS = ("day", "week", "month")
+METRICS = ("clicks", "impressions", "cost_micros", "conversions")
+# campaign_id used for the customer-level cells
+CUSTOMER_LEVEL = ""
+
+
+def period_start(day: date, grain: str) -> date:
+    """First day of the day/week (Monday)/month cell that contains `day`."""
+    if grain == "day":
+        return day
+    if grain == "week":
+        return day - timedelta(days=day.weekday())
+    if grain == "month":
+        return day.replace(day=1)
+    raise ValueError(f"Unknown grain: {grain}")
+
+
+def decompose(start: date, end: date) -> List[Tuple[str, date]]:
+    """
+    Covers [start, end] with the fewest cells, greedily: whole months, then
+    whole weeks, then single days. A 90-day window takes ~10 cells instead of 90.
+    """
+    cells = []
+    day = start
+    while day <= end:
+        next_month = (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+        if day.day == 1 and next_month - timedelta(days=1) <= end:
+            cells.append(("month", day))
+            day = next_month
+        elif day.weekday() == 0 and day + timedelta(days=6) <= end:
+            cells.append(("week", day))
+            day += timedelta(days=7)
+        else:
+            cells.append(("day", day))
+            day += timedelta(days=1)
+    return cells
+
+
+class RollupIndex:
+    """
+    Pre-aggregated metric cells per customer and per campaign, at day, week
+    (Monday-based) and month grain, kept in SQLite next to the CampaignStore.
+
+    apply_day() replaces one day: the day cells are rewritten and the change
+    against the previous version of that day is added to its week and month
+    cells, so restated days stay consistent without rescanning anything.
+    window() answers an arbitrary date range by summing the few cells from
+    decompose(); series() returns one row per period.
+    """
+
+    def __init__(self, path: str = "data/warehouse/_rollups.sqlite"):
+        self.path = path
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        # WAL: the MCP server process can read while the sync process writes
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS rollups (
+                customer_id TEXT NOT NULL,
+                campaign_id TEXT NOT NULL,
+                grain TEXT NOT NULL,
+                period TEXT NOT NULL,
+                clicks INTEGER NOT NULL,
+                impressions INTEGER NOT NULL,
+                cost_micros INTEGER NOT NULL,
+                conversions REAL NOT NULL,
+                PRIMARY KEY (customer_id, grain, period, campaign_id)
+            ) WITHOUT ROWID
+        """)
+        # Window queries read a handful of periods (primary key order); series() walks one campaign
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_rollups_campaign ON rollups(customer_id, campaign_id, grain, period)")
+        self._conn.commit()
+
+    # --- Updates ---
+
+    def apply_day(self, customer_id: str, day: date, frame):
+        """Replaces the cells of (customer_id, day) with `frame` (DataFrame or Arrow table with campaign_id + metrics)."""
+        if isinstance(frame, (pa.Table, pa.RecordBatch)):
+            frame = frame.to_pandas()
+        new = {}
+        if len(frame):
+            grouped = frame.astype({"campaign_id": str}).groupby("campaign_id", sort=False)[list(METRICS)].sum()
+            new = {campaign_id: tuple(values) for campaign_id, values in zip(grouped.index, grouped.itertuples(index=False))}
+
+        with self._lock:
+            old = {
+                row[0]: tuple(row[1:])
+                for row in self._conn.execute(
+                    "SELECT campaign_id, clicks, impressions, cost_micros, conversions FROM rollups "
+                    "WHERE customer_id = ? AND grain = 'day' AND period = ? AND campaign_id != ?",
+                    (customer_id, day.isoformat(), CUSTOMER_LEVEL),
+                )
+            }
+            deltas = {}
+            for campaign_id in new.keys() | old.keys():
+                before, after = old.get(campaign_id, (0, 0, 0, 0.0)), new.get(campaign_id, (0, 0, 0, 0.0))
+                delta = tuple(a - b for a, b in zip(after, before))
+                if any(delta):
+                    deltas[campaign_id] = delta
+            total = tuple(sum(values) for values in zip(*deltas.values())) if deltas else None
+
+            self._conn.execute("DELETE FROM rollups WHERE customer_id = ? AND grain = 'day' AND period = ?",
+                               (customer_id, day.isoformat()))
+            day_rows = [(customer_id, campaign_id, "day", day.isoformat(), *_cell(values)) for campaign_id, values in new.items()]
+            if new:
+                day_rows.append((customer_id, CUSTOMER_LEVEL, "day", day.isoformat(),
+                                 *_cell(tuple(sum(values) for values in zip(*new.values())))))
+            self._conn.executemany("INSERT INTO rollups VALUES (?, ?, ?, ?, ?, ?, ?, ?)", day_rows)
+
+            if total is not None:
+                increments = [(customer_id, campaign_id, grain, period_start(day, grain).isoformat(), *_cell(delta))
+                              for grain in ("week", "month")
+                              for campaign_id, delta in [*deltas.items(), (CUSTOMER_LEVEL, total)]]
+                self._conn.executemany("""
+                    INSERT INTO rollups VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (customer_id, grain, period, campaign_id) DO UPDATE SET
+                        clicks = clicks + excluded.clicks,
+                        impressions = impressions + excluded.impressions,
+                        cost_micros = cost_micros + excluded.cost_micros,
+                        conversions = conversions + excluded.conversions
+                """, increments)
+            self._conn.commit()
+
+    def rebuild(self, store, customer_ids: Optional[List[str]] = None):
+        """Recomputes every cell from the store's partitions (e.g. for a warehouse written before the index existed)."""
+        customer_ids = customer_ids if customer_ids is not None else store.customers()
+        with self._lock:
+            for customer_id in customer_ids:
+                self._conn.execute("DELETE FROM rollups WHERE customer_id = ?", (customer_id,))
+            self._conn.commit()
+        for customer_id in customer_ids:
+            table = store.scan([customer_id], columns=["campaign_id", *METRICS])
+            frame = table.to_pandas()
+            for day, rows in frame.groupby("date", sort=True):
+                self.apply_day(customer_id, date.fromisoformat(day), rows)
+
+    # --- Queries ---
+
+    def window(self, customer_id: str, start: date, end: date, campaign_id: Optional[str] = None,
+               by_campaign: bool = False) -> Dict[str, Any]:
+        """
+        Totals over [start, end] for the customer (or one campaign). With
+        `by_campaign`, also one entry per campaign, highest spend first.
+        """
+        cells = decompose(start, end)
+        sums = ", ".join(f"COALESCE(SUM(r.{metric}), 0)" for metric in METRICS)
+        # Joining the cell list lets SQLite seek each cell by primary key instead of scanning the customer
+        join = (f"(VALUES {', '.join(['(?, ?)'] * len(cells))}) AS cells "
+                f"CROSS JOIN rollups r ON r.customer_id = ? AND r.grain = cells.column1 AND r.period = cells.column2")
+        params = [value for grain, cell_start in cells for value in (grain, cell_start.isoformat())] + [customer_id]
+
+        totals, campaigns = (0, 0, 0, 0.0), [] if by_campaign else None
+        with self._lock:
+            if cells:
+                totals = self._conn.execute(
+                    f"SELECT {sums} FROM {join} WHERE r.campaign_id = ?",
+                    [*params, campaign_id if campaign_id is not None else CUSTOMER_LEVEL],
+                ).fetchone()
+            if cells and by_campaign:
+                campaigns = self._conn.execute(
+                    f"SELECT r.campaign_id, {sums} FROM {join} WHERE r.campaign_id != ? "
+                    f"GROUP BY r.campaign_id ORDER BY SUM(r.cost_micros) DESC",
+                    [*params, CUSTOMER_LEVEL],
+                ).fetchall()
+
+        result = {"customer_id": customer_id, "start": start.isoformat(), "end": end.isoformat(),
+                  "cells": len(cells), **_metrics(totals)}
+        if campaign_id is not None:
+            result["campaign_id"] = campaign_id
+        if campaigns is not None:
+            result["campaigns"] = [{"campaign_id": row[0], **_metrics(row[1:])} for row in campaigns]
+        return result
+
+    def series(self, customer_id: str, grain: str, start: date, end: date,
+               campaign_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """One row per `grain` period overlapping [start, end]; edge periods are the whole cell."""
+        if grain not in GRAINS:
+            raise ValueError(f"Unknown grain: {grain}")
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT period, {', '.join(METRICS)} FROM rollups "
+                f"WHERE customer_id = ? AND campaign_id = ? AND grain = ? AND period BETWEEN ? AND ? ORDER BY period",
+                (customer_id, campaign_id if campaign_id is not None else CUSTOMER_LEVEL, grain,
+                 period_start(start, grain).isoformat(), end.isoformat()),
+            ).fetchall()
+        return [{"period": row[0], **_metrics(row[1:])} for row in rows]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def _cell(values) -> Tuple:
+    clicks, impressions, cost_micros, conversions = values
+    return int(clicks), int(impressions), int(cost_micros), float(conversions)
+
+
+def _metrics(values) -> Dict[str, Any]:
+    clicks, impressions, cost_micros, conversions = values
+    cost = cost_micros / 1_000_000
+    return {
+        "clicks": int(clicks),
+        "impressions": int(impressions),
+        "cost": round(cost, 2),
+        "conversions": round(conversions, 2),
+        "cpa": round(cost / conversions, 2) if conversions > 0 else 0.0,
+        "ctr_percent": round(clicks * 100 / impressions, 2) if impressions > 0 else 0.0,
+    }
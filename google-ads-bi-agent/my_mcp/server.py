@@ -1,13 +1,39 @@
 from mcp.server.fastmcp import FastMCP
+import os
+import re
+import json
+import base64
 import logging
+from datetime import date
+from typing import TYPE_CHECKING, List, Dict, Any, Optional
+
+from my_mcp.google_ads_client import GoogleAdsClientWrapper, CAMPAIGN_QUERY, CAMPAIGN_COLUMNS
+
+# pyarrow and the rollup index are imported by the tools that use them, so a
+# stdio server spawned per session answers the MCP handshake sooner
+if TYPE_CHECKING:
+    import pyarrow as pa
+    from my_mcp.rollup_index import RollupIndex
 
-# Config logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Initialize FastMCP Server
 mcp = FastMCP("GoogleAdsService")
 
+_rollups: Optional["RollupIndex"] = None
+
+def _get_client() -> GoogleAdsClientWrapper:
+    # Shared per process: channels, credentials and the query cache are reused across calls
+    return GoogleAdsClientWrapper.shared()
+
+def _get_rollups() -> "RollupIndex":
+    # Same file the CampaignStore maintains (WAREHOUSE_PATH/_rollups.sqlite), opened once per process
+    global _rollups
+    if _rollups is None:
+        from my_mcp.rollup_index import RollupIndex
+        _rollups = RollupIndex(os.path.join(os.getenv("WAREHOUSE_PATH", "data/warehouse"), "_rollups.sqlite"))
+    return _rollups
+
 @mcp.tool()
 def fetch_campaign_data(customer_id: str, date_range: str = "LAST_30_DAYS") -> str:
     """
@@ -15,18 +41,73 @@ def fetch_campaign_data(customer_id: str, date_range: str = "LAST_30_DAYS") -> s
     Returns a JSON string with the data.
     """
     logger.info(f"MCP Tool called: fetch_campaign_data for {customer_id}")
+    return json.dumps(_query_campaigns(customer_id, date_range))
+
+@mcp.tool()
+def fetch_campaign_data_batch(customer_ids: List[str], date_range: str = "LAST_30_DAYS") -> str:
+    """
+    Fetches campaign data for many customer IDs in one call.
+    Returns a JSON object mapping each customer ID to its list of rows.
+    """
+    logger.info(f"MCP Tool called: fetch_campaign_data_batch for {len(customer_ids)} customers")
+    return json.dumps({customer_id: _query_campaigns(customer_id, date_range) for customer_id in customer_ids})
+
+@mcp.tool()
+def fetch_campaign_data_arrow(customer_id: str, date_range: str = "LAST_30_DAYS") -> str:
+    """
+    Fetches campaign data for a given customer ID as a compact binary table.
+    Returns a base64-encoded Arrow IPC stream.
+    """
+    logger.info(f"MCP Tool called: fetch_campaign_data_arrow for {customer_id}")
+    import pyarrow as pa
+    sink = pa.BufferOutputStream()
+    table = fetch_campaign_table(customer_id, date_range)
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return base64.b64encode(sink.getvalue().to_pybytes()).decode("ascii")
+
+@mcp.tool()
+def query_rollups(customer_id: str, start: str, end: str, grain: Optional[str] = None,
+                  campaign_id: Optional[str] = None, by_campaign: bool = False) -> str:
+    """
+    Reads pre-aggregated metrics from the local warehouse (no Google Ads API call).
+    Dates are YYYY-MM-DD, inclusive. Without `grain`, returns the totals of the window
+    (optionally per campaign); with grain "day", "week" or "month", returns one row per period.
+    Returns a JSON string.
+    """
+    logger.info(f"MCP Tool called: query_rollups for {customer_id} ({start}..{end}, grain={grain})")
+    start_day, end_day = date.fromisoformat(start), date.fromisoformat(end)
+    rollups = _get_rollups()
+    if grain is not None:
+        return json.dumps(rollups.series(customer_id, grain, start_day, end_day, campaign_id))
+    return json.dumps(rollups.window(customer_id, start_day, end_day, campaign_id, by_campaign))
 
-    # Mock Response Logic (as per previous requirements)
-    # In a real implementation, this would use the google-ads library
-    mock_data = [
-        {"campaign_id": "111", "campaign_name": "Campanha_Vendas_BlackFriday", "clicks": 150, "impressions": 5000, "cost_micros": 50000000, "conversions": 10, "status": "ENABLED"},
-        {"campaign_id": "222", "campaign_name": "Campanha_Branding_Institucional", "clicks": 500, "impressions": 20000, "cost_micros": 120000000, "conversions": 2, "status": "ENABLED"},
-        {"campaign_id": "333", "campaign_name": "Campanha_Teste_ProdutoX", "clicks": 20, "impressions": 800, "cost_micros": 8000000, "conversions": 0, "status": "PAUSED"},
-    ]
+def fetch_campaign_table(customer_id: str, date_range: str = "LAST_30_DAYS") -> "pa.Table":
+    """In-process variant of fetch_campaign_data: returns an Arrow table, no JSON round trip."""
+    import pyarrow as pa
+    rows = _query_campaigns(customer_id, date_range)
+    if not rows:
+        return pa.table({col: pa.array([], pa.null()) for col in CAMPAIGN_COLUMNS})
+    return pa.Table.from_pylist(rows)
 
-    import json
-    return json.dumps(mock_data)
+def _query_campaigns(customer_id: str, date_range: str) -> List[Dict[str, Any]]:
+    if not re.fullmatch(r"[A-Z0-9_]+", date_range):
+        raise ValueError(f"Invalid date_range: {date_range}")
+    return _get_client().execute_query(customer_id, CAMPAIGN_QUERY.format(date_range=date_range))
 
 if __name__ == "__main__":
-    # If run directly, starts the MCP server over stdio
-    mcp.run()
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Google Ads MCP server")
+    parser.add_argument("--transport", choices=["stdio", "streamable-http"], default="stdio")
+    parser.add_argument("--host", default=mcp.settings.host)
+    parser.add_argument("--port", type=int, default=mcp.settings.port)
+    args = parser.parse_args()
+
+    from utils.structured_log import configure_logging
+    configure_logging()
+
+    # If run directly, starts the MCP server over stdio (default) or local HTTP
+    mcp.settings.host = args.host
+    mcp.settings.port = args.port
+    mcp.run(transport=args.transport)
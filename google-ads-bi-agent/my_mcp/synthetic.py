@@ -0,0 +1,119 @@
+import zlib
+from dataclasses import dataclass, fields
+from datetime import date, timedelta
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+
+from my_mcp.google_ads_client import CAMPAIGN_COLUMNS
+
+SEGMENT_NAMES = ("MOBILE", "DESKTOP", "TABLET", "CONNECTED_TV", "OTHER")
+
+
+@dataclass
+class SyntheticAccount:
+    """
+    Synthetic Google Ads account for the mock path (benchmarks, load tests).
+
+    Spend per campaign is log-normal (`spend_sigma` sets the skew: a few
+    campaigns take most of the budget), CPC and CTR vary per campaign, and
+    conversions are Poisson on clicks x CVR with a `zero_conversion_share`
+    of campaigns that never convert. Each campaign is split into `segments`
+    rows (device-like) with uneven shares. Output is deterministic for a
+    given (seed, customer_id), so runs are reproducible.
+    """
+
+    campaigns: int = 1000
+    segments: int = 1
+    seed: int = 42
+    daily_spend_median: float = 50.0
+    spend_sigma: float = 1.5
+    cpc_median: float = 1.2
+    ctr_mean: float = 0.04
+    cvr_mean: float = 0.03
+    zero_conversion_share: float = 0.3
+    paused_share: float = 0.1
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "SyntheticAccount":
+        known = {field.name for field in fields(cls)}
+        return cls(**{key: value for key, value in config.items() if key in known})
+
+    @property
+    def rows_per_day(self) -> int:
+        return self.campaigns * self.segments
+
+    def _rng(self, customer_id: str, salt: str = "") -> np.random.Generator:
+        return np.random.default_rng([self.seed, zlib.crc32(f"{customer_id}|{salt}".encode())])
+
+    def _profile(self, customer_id: str) -> Dict[str, np.ndarray]:
+        """Per-campaign traits, stable across days."""
+        rng = self._rng(customer_id)
+        n = self.campaigns
+        paused = rng.random(n) < self.paused_share
+        daily_spend = rng.lognormal(np.log(self.daily_spend_median), self.spend_sigma, n)
+        daily_spend[paused] *= 0.05  # paused mid-period: a little spend left
+        ctr_concentration = 200.0
+        cvr = rng.beta(2.0, 2.0 / self.cvr_mean - 2.0, n)
+        cvr[rng.random(n) < self.zero_conversion_share] = 0.0
+        return {
+            "ids": np.arange(1, n + 1) + (zlib.crc32(customer_id.encode()) % 1000) * 1_000_000,
+            "paused": paused,
+            "daily_spend": daily_spend,
+            "cpc": rng.lognormal(np.log(self.cpc_median), 0.5, n),
+            "ctr": rng.beta(ctr_concentration * self.ctr_mean, ctr_concentration * (1 - self.ctr_mean), n),
+            "cvr": cvr,
+            # Segment shares per campaign (Dirichlet: one device usually dominates)
+            "shares": rng.dirichlet(np.full(self.segments, 0.8), n) if self.segments > 1 else np.ones((n, 1)),
+        }
+
+    def columns(self, customer_id: str, days: int = 30, day: Optional[date] = None) -> Dict[str, np.ndarray]:
+        """
+        Column arrays (CAMPAIGN_COLUMNS) for `days` days of activity, one row per
+        campaign x segment. With `day`, the values are that day's (daily noise,
+        plus a `date` column).
+        """
+        profile = self._profile(customer_id)
+        rng = self._rng(customer_id, day.isoformat() if day else f"total:{days}")
+        n, s = self.campaigns, self.segments
+
+        noise = rng.lognormal(0.0, 0.25, (n, s)) if day else 1.0
+        spend = profile["daily_spend"][:, None] * profile["shares"] * days * noise
+        clicks = rng.poisson(spend / profile["cpc"][:, None])
+        impressions = np.maximum(clicks, rng.poisson(np.maximum(clicks, 1) / profile["ctr"][:, None]))
+        conversions = rng.poisson(clicks * profile["cvr"][:, None]).astype("float64")
+        cost_micros = (spend * 1_000_000).astype("int64")
+
+        names = np.char.add("Campanha_", np.char.zfill(np.arange(1, n + 1).astype(str), 5))
+        if s > 1:
+            labels = np.array([f" [{SEGMENT_NAMES[i % len(SEGMENT_NAMES)]}{'' if i < len(SEGMENT_NAMES) else i}]"
+                               for i in range(s)])
+            names = np.char.add(np.repeat(names, s), np.tile(labels, n))
+        result = {
+            "campaign_id": np.repeat(profile["ids"], s).astype(str),
+            "campaign_name": names.astype(object),
+            "clicks": clicks.ravel(),
+            "impressions": impressions.ravel(),
+            "cost_micros": cost_micros.ravel(),
+            "conversions": conversions.ravel(),
+            "status": np.repeat(np.where(profile["paused"], "PAUSED", "ENABLED"), s).astype(object),
+        }
+        if day is not None:
+            result["date"] = np.full(n * s, day.isoformat(), dtype=object)
+        return result
+
+    def rows(self, customer_id: str, days: int = 30) -> List[Dict[str, Any]]:
+        """Rows in the shape GoogleAdsClientWrapper returns (list of dicts) for a DURING query."""
+        return _to_rows(self.columns(customer_id, days), CAMPAIGN_COLUMNS)
+
+    def daily_rows(self, customer_id: str, start: date, end: date) -> Iterator[Dict[str, Any]]:
+        """One row per campaign x segment x day, for date-segmented queries."""
+        day = start
+        while day <= end:
+            yield from _to_rows(self.columns(customer_id, 1, day), CAMPAIGN_COLUMNS + ("date",))
+            day += timedelta(days=1)
+
+
+def _to_rows(columns: Dict[str, np.ndarray], names) -> List[Dict[str, Any]]:
+    values = [columns[name].tolist() for name in names]
+    return [dict(zip(names, row)) for row in zip(*values)]
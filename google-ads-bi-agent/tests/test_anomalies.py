@@ -0,0 +1,80 @@
+import unittest
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from agents.anomalies import detect_anomalies, find_anomalies, format_anomalies, findings_to_records
+
+AS_OF = date(2026, 3, 31)
+
+
+def daily_frame(campaigns: int = 50, days: int = 31, seed: int = 0):
+    """Séries estáveis (ruído pequeno) para `campaigns` campanhas; devolve as matrizes para alterar."""
+    rng = np.random.default_rng(seed)
+    cost = rng.normal(100, 5, (campaigns, days))
+    clicks = rng.normal(200, 10, (campaigns, days)).round()
+    impressions = rng.normal(5000, 100, (campaigns, days)).round()
+    conversions = rng.normal(10, 1, (campaigns, days)).round()
+    return cost, clicks, impressions, conversions
+
+
+def to_frame(cost, clicks, impressions, conversions):
+    campaigns, days = cost.shape
+    dates = [(AS_OF - timedelta(days=days - 1 - i)).isoformat() for i in range(days)]
+    ids = np.repeat([f"c{i}" for i in range(campaigns)], days)
+    return pd.DataFrame({
+        "campaign_id": ids, "campaign_name": np.char.add("Campanha ", ids), "date": np.tile(dates, campaigns),
+        "cost_micros": (cost * 1_000_000).ravel().astype("int64"), "clicks": clicks.ravel(),
+        "impressions": impressions.ravel(), "conversions": conversions.ravel(),
+    })
+
+
+class TestAnomalies(unittest.TestCase):
+    def test_flags_spike_ctr_collapse_and_conversion_drop(self):
+        cost, clicks, impressions, conversions = daily_frame()
+        cost[3, -1] = 400            # pico de gasto no último dia
+        clicks[7, -1] = 10           # CTR despenca (impressões normais)
+        conversions[11, -3:] = 0     # três dias sem conversões, gasto normal
+        findings = detect_anomalies(to_frame(cost, clicks, impressions, conversions), AS_OF)
+
+        flagged = {(row.campaign_id, row.signal) for row in findings.itertuples()}
+        self.assertEqual(flagged, {("c3", "spend_spike"), ("c7", "ctr_collapse"), ("c11", "conversion_drop")})
+        drop = findings[findings.signal == "conversion_drop"].iloc[0]
+        self.assertEqual((drop.start, drop.end, drop.value), ("2026-03-29", "2026-03-31", 0.0))
+        # Ordenados por severidade
+        self.assertTrue((findings.zscore.abs().diff().dropna() <= 0).all())
+
+    def test_flat_baseline_new_campaigns_and_paused_spend(self):
+        cost, clicks, impressions, conversions = daily_frame(campaigns=3)
+        cost[0] = 50.0                   # travada no orçamento diário...
+        cost[0, -1] = 120.0              # ...até estourar no último dia
+        impressions[1, :-5] = 0          # campanha nova: histórico curto, não é avaliada
+        cost[1, -1], clicks[1, -1] = 500, 0
+        cost[2, -3:], conversions[2, -3:] = 0, 0  # pausada: sem gasto, sem conversões, sem achado
+        findings = detect_anomalies(to_frame(cost, clicks, impressions, conversions), AS_OF)
+
+        self.assertEqual(findings_to_records(findings)[0]["campaign_id"], "c0")
+        self.assertEqual(list(findings.signal), ["spend_spike"])
+
+    def test_find_anomalies_and_prompt_text(self):
+        class Store:
+            def scan(self, customer_ids, start, end, columns):
+                frame = to_frame(*daily_frame(campaigns=5))
+                return pa.Table.from_pandas(frame[(frame.date >= start.isoformat()) & (frame.date <= end.isoformat())])
+
+        self.assertEqual(format_anomalies(find_anomalies(Store(), "1", as_of=AS_OF)), "Nenhuma anomalia nas séries diárias locais.")
+        self.assertIsNone(find_anomalies(Store(), "1", as_of=AS_OF + timedelta(days=90)))
+        self.assertEqual(format_anomalies(None), "Sem séries diárias locais para esta conta.")
+
+        cost, clicks, impressions, conversions = daily_frame()
+        cost[:, -1] *= 5  # todas as campanhas: o texto é limitado
+        text = format_anomalies(detect_anomalies(to_frame(cost, clicks, impressions, conversions), AS_OF), limit=3)
+        self.assertEqual(len(text.splitlines()), 4)
+        self.assertIn("pico de gasto em 2026-03-31", text)
+        self.assertTrue(text.endswith("e mais 47 achados"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,168 @@
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+from agents.batch_runner import BatchCheckpoint, BatchRunner, ReportWriter, frame_fingerprint
+
+
+def account_frame(customer_id: str, cost: int = 100) -> pd.DataFrame:
+    return pd.DataFrame({
+        "id": [f"{customer_id}1", f"{customer_id}2"], "name": ["A", "B"], "status": ["ENABLED"] * 2,
+        "clicks": [10, 20], "impressions": [100, 200], "cost": [cost, 50], "conversions": [1.0, 0.0],
+    })
+
+
+class FakeAdsAgent:
+    def __init__(self, frames, broken=()):
+        self.frames = frames
+        self.broken = set(broken)
+        self.calls = []
+
+    async def extract(self, customer_id, date_range="LAST_30_DAYS", incremental=False, window_days=30):
+        self.calls.append(customer_id)
+        if customer_id in self.broken:
+            raise RuntimeError("API indisponível")
+        return self.frames[customer_id]
+
+
+class FakeBIAgent:
+    prompt_fingerprint = "prompt-v1"
+    model_name = "stub"
+
+    def __init__(self):
+        self.analyzed = []
+        self.history = None
+        self.strategy = {"summary": "ok"}
+
+    async def load_context(self, customer_id):
+        return {"as_of": "2024-03-14", "history": self.history, "anomalies": None}
+
+    async def generate_performance_report(self, payload, context=None):
+        self.analyzed.append(payload.meta["customer_id"])
+        frame = payload.frame
+        return {"period_stats": {"total_spend": float(frame["cost"].sum()), "total_conversions": 1, "global_cpa": 100.0},
+                "strategy": self.strategy, "anomalies": []}
+
+
+class TestBatchRunner(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.output = os.path.join(self.tmp.name, "reports")
+        self.checkpoint = BatchCheckpoint(os.path.join(self.tmp.name, "state.sqlite"))
+        self.frames = {cid: account_frame(cid) for cid in ("111", "222", "333")}
+
+    def tearDown(self):
+        self.checkpoint.close()
+        self.tmp.cleanup()
+
+    def run_batch(self, ads, bi, run_id, **kwargs):
+        runner = BatchRunner(ads, bi, self.checkpoint, output_dir=self.output, run_id=run_id,
+                             max_retries=0, **kwargs)
+        return asyncio.run(runner.run(["111", "222", "333"]))
+
+    def read_lines(self, run_id):
+        with open(os.path.join(self.output, run_id, "reports.jsonl")) as file:
+            return [json.loads(line) for line in file]
+
+    def test_failed_customers_are_retried_on_resume(self):
+        bi = FakeBIAgent()
+        summary = self.run_batch(FakeAdsAgent(self.frames, broken={"222"}), bi, "night-1")
+        self.assertEqual((summary["done"], summary["failed"]), (2, 1))
+        self.assertEqual(summary["failed_customers"], ["222"])
+        self.assertEqual([line["customer_id"] for line in self.read_lines("night-1")], ["111", "333"])
+
+        # Retomada do mesmo run: só a conta que falhou é extraída e analisada de novo
+        ads = FakeAdsAgent(self.frames)
+        summary = self.run_batch(ads, bi, "night-1")
+        self.assertEqual(ads.calls, ["222"])
+        self.assertEqual((summary["skipped_completed"], summary["done"], summary["failed"]), (2, 1, 0))
+        lines = self.read_lines("night-1")
+        self.assertEqual(sorted(line["customer_id"] for line in lines), ["111", "222", "333"])
+        self.assertEqual(lines[-1]["report"]["period_stats"]["total_spend"], 150.0)
+
+    def test_unchanged_inputs_skip_analysis(self):
+        bi = FakeBIAgent()
+        self.run_batch(FakeAdsAgent(self.frames), bi, "night-1")
+        self.assertEqual(len(bi.analyzed), 3)
+
+        # Noite seguinte: só a conta 333 mudou (linhas em outra ordem não contam como mudança)
+        frames = dict(self.frames, **{"111": self.frames["111"].iloc[::-1], "333": account_frame("333", cost=999)})
+        bi.analyzed.clear()
+        summary = self.run_batch(FakeAdsAgent(frames), bi, "night-2")
+        self.assertEqual(bi.analyzed, ["333"])
+        self.assertEqual((summary["done"], summary["unchanged"]), (1, 2))
+        unchanged = {line["customer_id"]: line for line in self.read_lines("night-2") if line["status"] == "unchanged"}
+        self.assertEqual(unchanged["111"]["report_run"], "night-1")
+
+        # Prompt novo invalida o fingerprint; --force também
+        bi.analyzed.clear()
+        bi.prompt_fingerprint = "prompt-v2"
+        self.run_batch(FakeAdsAgent(frames), bi, "night-3")
+        self.assertEqual(len(bi.analyzed), 3)
+        bi.analyzed.clear()
+        self.run_batch(FakeAdsAgent(frames), bi, "night-4", force=True)
+        self.assertEqual(len(bi.analyzed), 3)
+
+    def test_store_context_is_part_of_the_fingerprint(self):
+        bi = FakeBIAgent()
+        self.run_batch(FakeAdsAgent(self.frames), bi, "night-1")
+        # Mesma extração, mas o histórico local mudou (novo dia sincronizado): analisa de novo
+        bi.analyzed.clear()
+        bi.history = {"as_of": "2024-03-14", "wow": {"change_pct": {"cost": 12.5}}}
+        self.run_batch(FakeAdsAgent(self.frames), bi, "night-2")
+        self.assertEqual(len(bi.analyzed), 3)
+
+    def test_llm_failures_and_degraded_reports(self):
+        bi = FakeBIAgent()
+        bi.strategy = {"error": "Falha na geração de insights: 429"}
+        summary = self.run_batch(FakeAdsAgent(self.frames), bi, "night-1")
+        self.assertEqual((summary["done"], summary["failed"]), (0, 3))
+
+        # Sem chave: relatório só com os números, gravado sem fingerprint...
+        bi.strategy = {"warning": "IA não configurada (Sem Chave). Retornando placeholder."}
+        summary = self.run_batch(FakeAdsAgent(self.frames), bi, "night-2")
+        self.assertEqual(summary["done"], 3)
+        self.assertIsNone(self.read_lines("night-2")[0]["fingerprint"])
+        # ...então a noite seguinte, com o LLM de volta, analisa de novo em vez de "unchanged"
+        bi.strategy, bi.analyzed = {"summary": "ok"}, []
+        summary = self.run_batch(FakeAdsAgent(self.frames), bi, "night-3")
+        self.assertEqual((summary["done"], summary["unchanged"], len(bi.analyzed)), (3, 0, 3))
+
+    def test_accounts_without_rows_are_empty_not_failed(self):
+        bi = FakeBIAgent()
+        frames = dict(self.frames, **{"222": account_frame("222").iloc[0:0]})
+        summary = self.run_batch(FakeAdsAgent(frames), bi, "night-1")
+        self.assertEqual((summary["done"], summary["empty"], summary["failed"]), (2, 1, 0))
+        self.assertNotIn("222", bi.analyzed)
+        self.assertEqual({line["customer_id"]: line["status"] for line in self.read_lines("night-1")}["222"], "empty")
+        # Concluída: a retomada não extrai de novo
+        ads = FakeAdsAgent(frames)
+        self.run_batch(ads, bi, "night-1")
+        self.assertEqual(ads.calls, [])
+
+    def test_writer_repairs_torn_line_and_compacts_to_parquet(self):
+        self.run_batch(FakeAdsAgent(self.frames), FakeBIAgent(), "night-1")
+        path = os.path.join(self.output, "night-1", "reports.jsonl")
+        with open(path, "a") as file:
+            file.write('{"run_id": "night-1", "customer_id": "44')  # queda no meio da escrita
+
+        writer = ReportWriter(self.output, "night-1")
+        table = pq.read_table(writer.to_parquet()).to_pandas()
+        writer.close()
+        self.assertEqual(sorted(table["customer_id"]), ["111", "222", "333"])
+        self.assertEqual(table["total_spend"].tolist(), [150.0] * 3)
+        self.assertEqual(json.loads(table["report"][0])["strategy"]["summary"], "ok")
+
+    def test_fingerprint_ignores_row_and_column_order(self):
+        frame = self.frames["111"]
+        self.assertEqual(frame_fingerprint(frame, "p"), frame_fingerprint(frame.iloc[::-1][frame.columns[::-1]], "p"))
+        self.assertNotEqual(frame_fingerprint(frame, "p"), frame_fingerprint(frame, "q"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,17 +1,18 @@
+import asyncio
+import tempfile
 import unittest
 from agents.bi_analytics_agent import BIAnalyticsAgent
 import pandas as pd
-from unittest.mock import MagicMock, patch
+from unittest.mock import MagicMock, AsyncMock, patch
+from utils.llm_cache import LLMCache
+from a2a.payloads import ColumnarPayload
 
 class TestBIAnalyticsAgent(unittest.TestCase):
     def setUp(self):
-        # Mocking OpenAI to avoid API calls during initialization if any, 
-        # though user code initializes in __init__. 
-        # We need to patch ChatOpenAI before creating the agent instance if we want to test without a key or to mock it.
-        with patch('agents.bi_analytics_agent.ChatOpenAI') as MockChat:
-            with patch('os.getenv', return_value="fake-key"):
-                self.agent = BIAnalyticsAgent()
-                self.agent.llm = MagicMock() # Mock LLM interactions
+        # O cliente Gemini só é criado na primeira análise; com self.llm já definido, nunca é
+        with patch('os.getenv', return_value="fake-key"):
+            self.agent = BIAnalyticsAgent(MagicMock())
+            self.agent.llm = MagicMock() # Mock LLM interactions
 
     def test_calculate_hard_metrics(self):
         # Sample raw data mirroring the output of GoogleAdsAgent
@@ -36,5 +37,239 @@ class TestBIAnalyticsAgent(unittest.TestCase):
         self.assertEqual(len(stats['wasteful_spend']), 1) # Campaign B has 0 conversions and cost > 0
         self.assertEqual(stats['wasteful_spend'][0]['name'], "Campaign B")
 
+    def test_calculate_hard_metrics_safe_division(self):
+        # Formato plano publicado pelo GoogleAdsAgent
+        df = pd.DataFrame({
+            "name": ["A", "B", "C"],
+            "clicks": [10, 5, 0],
+            "impressions": [100, 0, 0],
+            "cost": [20.0, 10.0, 0.0],
+            "conversions": [4.0, 0.0, 0.0],
+        })
+        stats = self.agent._calculate_hard_metrics(df)
+
+        self.assertEqual(df['cpa'].tolist(), [5.0, 0.0, 0.0])
+        self.assertEqual(df['ctr_percent'].tolist(), [10.0, 0.0, 0.0])
+        self.assertEqual(stats['global_cpa'], 7.5)
+
+    def test_identical_reports_hit_llm_cache(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            self.agent.llm_cache = LLMCache(f"{tmp}/llm.sqlite")
+            chain = MagicMock()
+            chain.ainvoke = AsyncMock(return_value={"summary": "ok"})
+            self.agent.llm_executor = chain
+
+            def frame(cost_b):
+                return pd.DataFrame({
+                    "name": ["A", "B"], "clicks": [10, 5], "impressions": [100, 50],
+                    "cost": [20.0, cost_b], "conversions": [4.0, 0.0],
+                })
+
+            first = asyncio.run(self.agent.generate_performance_report(frame(10.0)))
+            second = asyncio.run(self.agent.generate_performance_report(frame(10.0)))
+            asyncio.run(self.agent.generate_performance_report(frame(11.0)))
+            stats = self.agent.llm_cache.stats()
+            self.agent.llm_cache.close()
+
+        self.assertEqual(first["strategy"], second["strategy"])
+        self.assertEqual(chain.ainvoke.await_count, 2)  # 1ª e 3ª chamadas; a 2ª veio do cache
+        self.assertEqual((stats["hits"], stats["entries"]), (1, 2))
+
+    def test_llm_cache_opt_in_under_data_dir(self):
+        from my_mcp.campaign_store import CampaignStore
+
+        with patch.dict("os.environ", {}, clear=True):
+            self.assertIsNone(self.agent._get_llm_cache())
+        with tempfile.TemporaryDirectory() as tmp:
+            self.agent.store = CampaignStore(root=tmp)
+            with patch.dict("os.environ", {"LLM_CACHE_ENABLED": "true"}, clear=True):
+                cache = self.agent._get_llm_cache()
+            self.assertEqual(cache.path, f"{tmp}/_llm_cache.sqlite")
+            cache.close()
+            self.agent.store.close()
+
+    def test_streaming_publishes_stats_then_partial_strategy(self):
+        from langchain_core.messages import AIMessageChunk
+        from agents.llm_executor import LLMExecutor
+
+        pieces = ['```json\n{"summary": "Escalar', ' A", "key_insights": ["CPA', ' baixo"], "recommended_actions": []}\n```']
+        runnable = MagicMock()
+
+        async def astream(inputs):
+            for piece in pieces:
+                yield AIMessageChunk(content=piece)
+        runnable.astream = astream
+
+        published = []
+
+        async def publish(topic, data):
+            published.append((topic, data))
+
+        self.agent.bus.publish = publish
+        self.agent.stream_reports = True
+        self.agent.llm_executor = LLMExecutor(runnable)
+        df = pd.DataFrame({"name": ["A", "B"], "clicks": [10, 5], "impressions": [100, 50],
+                           "cost": [20.0, 10.0], "conversions": [4.0, 0.0]})
+        with patch.dict("os.environ", {"LLM_CACHE_ENABLED": "false"}):
+            asyncio.run(self.agent.handle_data(ColumnarPayload(df, customer_id="1", correlation_id="c1")))
+
+        topics = [topic for topic, _ in published]
+        self.assertEqual(topics[0], "REPORT_PARTIAL")
+        self.assertEqual(topics[-1], "REPORT_READY")
+        partials = [data for topic, data in published if topic == "REPORT_PARTIAL"]
+        self.assertEqual(partials[0]["stage"], "stats")
+        self.assertEqual(partials[0]["period_stats"]["total_spend"], 30.0)
+        self.assertEqual([p["sequence"] for p in partials], list(range(len(partials))))
+        self.assertEqual(partials[1]["strategy"], {"summary": "Escalar"})
+        self.assertTrue(all(p["correlation_id"] == "c1" for p in partials))
+        self.assertEqual(published[-1][1]["strategy"]["key_insights"], ["CPA baixo"])
+
+    def test_stream_pages_deduplicated_and_checked_at_end(self):
+        published = []
+
+        async def publish(topic, data):
+            published.append((topic, data))
+
+        self.agent.bus.publish = publish
+        self.agent.llm, self.agent.api_key = None, None  # sem LLM: relatório só com os números
+        self.agent.stream_end_timeout = 0.2
+
+        def page(index, cost, correlation_id="s1"):
+            df = pd.DataFrame({"name": [f"C{index}"], "clicks": [10], "impressions": [100],
+                               "cost": [cost], "conversions": [1.0]})
+            return ColumnarPayload(df, customer_id="1", correlation_id=correlation_id, batch_index=index)
+
+        async def run():
+            # Página 0 reentregue (at-least-once) e página 1 chegando depois do DATA_STREAM_END
+            await self.agent.handle_batch(page(0, 10.0))
+            await self.agent.handle_batch(page(0, 10.0))
+            end = asyncio.create_task(self.agent.handle_stream_end(
+                {"customer_id": "1", "correlation_id": "s1", "batches": 2, "rows": 2}))
+            await asyncio.sleep(0.01)
+            await self.agent.handle_batch(page(1, 5.0))
+            await end
+            # Página 1 nunca chega: erro em vez de relatório parcial
+            await self.agent.handle_batch(page(0, 10.0, "s2"))
+            await self.agent.handle_stream_end({"customer_id": "1", "correlation_id": "s2", "batches": 2, "rows": 2})
+
+        asyncio.run(run())
+        (topic, report), (error_topic, error) = published
+        self.assertEqual((topic, report["correlation_id"]), ("REPORT_READY", "s1"))
+        self.assertEqual(report["period_stats"]["total_spend"], 15.0)
+        self.assertEqual((error_topic, error["correlation_id"]), ("ERROR", "s2"))
+        self.assertIn("1 de 2", error["message"])
+        self.assertEqual(self.agent._pending_stats, {})
+
+    def test_history_from_local_store(self):
+        from datetime import date, timedelta
+        from my_mcp.campaign_store import CampaignStore
+
+        chain = MagicMock()
+        chain.ainvoke = AsyncMock(return_value={"summary": "ok"})
+        self.agent.llm_executor = chain
+        with tempfile.TemporaryDirectory() as tmp:
+            self.agent.store = CampaignStore(root=tmp)
+            yesterday = date.today() - timedelta(days=1)
+            for offset in range(14):
+                self.agent.store.write_day("1", yesterday - timedelta(days=offset), pd.DataFrame({
+                    "campaign_id": [1], "campaign_name": ["A"], "status": ["ENABLED"], "clicks": [10],
+                    "impressions": [100], "cost_micros": [10_000_000], "conversions": [1.0],
+                }))
+            df = pd.DataFrame({"name": ["A"], "clicks": [10], "impressions": [100], "cost": [20.0], "conversions": [4.0]})
+            with patch.dict("os.environ", {"LLM_CACHE_ENABLED": "false"}):
+                report = asyncio.run(self.agent.generate_performance_report(ColumnarPayload(df, customer_id="1")))
+            self.agent.store.close()
+
+        self.assertEqual(report["history"]["wow"]["change_pct"]["cost"], 0.0)
+        prompt_inputs = chain.ainvoke.await_args.args[0]
+        self.assertIn("Semana vs semana anterior: cost 70.0 (+0.0%)", prompt_inputs["history"])
+
+    def test_anomalies_feed_prompt_and_report(self):
+        from datetime import date, timedelta
+        from my_mcp.campaign_store import CampaignStore
+
+        chain = MagicMock()
+        chain.ainvoke = AsyncMock(return_value={"summary": "ok"})
+        self.agent.llm_executor = chain
+        with tempfile.TemporaryDirectory() as tmp:
+            self.agent.store = CampaignStore(root=tmp)
+            yesterday = date.today() - timedelta(days=1)
+            for offset in range(31):
+                spike = offset == 0
+                self.agent.store.write_day("1", yesterday - timedelta(days=offset), pd.DataFrame({
+                    "campaign_id": ["1", "2"], "campaign_name": ["A", "B"], "status": ["ENABLED"] * 2,
+                    "clicks": [10, 10], "impressions": [100, 100],
+                    "cost_micros": [10_000_000, 90_000_000 if spike else 10_000_000], "conversions": [1.0, 1.0],
+                }))
+            df = pd.DataFrame({"id": ["1", "2"], "name": ["A", "B"], "clicks": [10, 10], "impressions": [100, 100],
+                               "cost": [300.0, 380.0], "conversions": [30.0, 30.0]})
+            with patch.dict("os.environ", {"LLM_CACHE_ENABLED": "false"}):
+                report = asyncio.run(self.agent.generate_performance_report(ColumnarPayload(df, customer_id="1")))
+            self.agent.store.close()
+
+        self.assertEqual([(a["campaign_id"], a["signal"]) for a in report["anomalies"]], [("2", "spend_spike")])
+        prompt_inputs = chain.ainvoke.await_args.args[0]
+        self.assertIn("- B: pico de gasto em", prompt_inputs["anomalies"])
+        # A campanha com anomalia abre a tabela
+        self.assertTrue(prompt_inputs["df_view"].splitlines()[1].startswith("anomalia,B,"))
+
+    def test_gemini_client_built_on_first_analysis(self):
+        with patch('os.getenv', return_value="fake-key"):
+            agent = BIAnalyticsAgent(MagicMock())
+        self.assertIsNone(agent.llm)
+        self.assertTrue(agent.llm_enabled)
+        with patch('langchain_google_genai.ChatGoogleGenerativeAI') as MockChat:
+            llm = agent._ensure_llm()
+            self.assertIs(agent._ensure_llm(), llm)
+        MockChat.assert_called_once()
+        # Os retries ficam só no LLMExecutor
+        self.assertEqual(MockChat.call_args.kwargs["max_retries"], 0)
+        self.assertIs(llm, MockChat.return_value)
+        self.assertIsNotNone(agent.format_instructions)
+
+    def test_background_warm_up_logs_failures_and_is_cancelled_on_close(self):
+        with patch('os.getenv', return_value="fake-key"):
+            agent = BIAnalyticsAgent(MagicMock())
+
+        def broken_import():
+            raise ImportError("langchain quebrado")
+        agent._build_llm = broken_import
+
+        async def run():
+            agent.start_warm_up()
+            task = agent._warm_up_task
+            await asyncio.wait([task])
+            return task
+
+        with self.assertLogs("agents.bi_analytics_agent", level="WARNING") as logs:
+            asyncio.run(run())
+        self.assertIn("langchain quebrado", logs.output[0])
+
+        # Um warm_up ainda pendente é cancelado no close()
+        async def pending():
+            agent._llm_ready, agent._warm_up_task = False, None
+            agent._build_llm = lambda: __import__("time").sleep(0.2)
+            agent.start_warm_up()
+            agent.close()
+            await asyncio.sleep(0)
+            return agent._warm_up_task
+
+        self.assertTrue(asyncio.run(pending()).cancelled())
+
+    def test_llm_built_off_the_event_loop(self):
+        import threading
+        with patch('os.getenv', return_value="fake-key"):
+            agent = BIAnalyticsAgent(MagicMock())
+        threads = []
+        agent._build_llm = lambda: threads.append(threading.current_thread())
+
+        async def run():
+            await asyncio.gather(agent.warm_up(), agent.warm_up(), agent.warm_up())
+
+        asyncio.run(run())
+        # Import do LangChain em uma thread, e uma vez só mesmo com análises concorrentes
+        self.assertEqual(len(threads), 1)
+        self.assertIsNot(threads[0], threading.main_thread())
+
 if __name__ == '__main__':
     unittest.main()
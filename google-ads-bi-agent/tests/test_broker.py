@@ -0,0 +1,172 @@
+import asyncio
+import unittest
+import pandas as pd
+from unittest.mock import patch
+from a2a.broker import LocalBroker
+from a2a.payloads import ColumnarPayload
+from a2a.transports import SocketTransport
+
+class TestLocalBroker(unittest.TestCase):
+    def run_with_broker(self, scenario):
+        async def run():
+            broker = LocalBroker(port=0)
+            await broker.start()
+            try:
+                return await scenario(broker, f"127.0.0.1:{broker.port}")
+            finally:
+                await broker.stop()
+        return asyncio.run(run())
+
+    def test_group_load_balances_and_groups_fan_out(self):
+        async def scenario(broker, address):
+            received = {"a": [], "b": [], "audit": []}
+            done = asyncio.Event()
+
+            def collector(name):
+                async def handler(topic, group, data):
+                    received[name].append(data["n"])
+                    if len(received["a"]) + len(received["b"]) == 10 and len(received["audit"]) == 10:
+                        done.set()
+                return handler
+
+            transports = []
+            for name, group in (("a", "workers"), ("b", "workers"), ("audit", "audit")):
+                transport = SocketTransport(address)
+                await transport.connect(collector(name))
+                await transport.subscribe("T", group)
+                transports.append(transport)
+            await asyncio.sleep(0.05)
+
+            publisher = SocketTransport(address)
+            await publisher.connect(None)
+            for i in range(10):
+                await publisher.publish("T", {"n": i})
+            await asyncio.wait_for(done.wait(), 5)
+            for transport in transports + [publisher]:
+                await transport.close()
+            return received
+
+        received = self.run_with_broker(scenario)
+        self.assertEqual(sorted(received["a"] + received["b"]), list(range(10)))
+        self.assertTrue(received["a"] and received["b"])
+        self.assertEqual(sorted(received["audit"]), list(range(10)))
+
+    def test_failed_handler_gets_redelivery(self):
+        async def scenario(broker, address):
+            attempts = []
+            done = asyncio.Event()
+
+            async def flaky(topic, group, data):
+                attempts.append(len(data))
+                if len(attempts) < 3:
+                    raise RuntimeError("boom")
+                done.set()
+
+            consumer = SocketTransport(address)
+            await consumer.connect(flaky)
+            await consumer.subscribe("T", "g")
+            await asyncio.sleep(0.05)
+            publisher = SocketTransport(address)
+            await publisher.connect(None)
+            await publisher.publish("T", ColumnarPayload(pd.DataFrame({"x": [1, 2]}), customer_id="1"))
+            await asyncio.wait_for(done.wait(), 5)
+            await consumer.close()
+            await publisher.close()
+            return attempts
+
+        self.assertEqual(self.run_with_broker(scenario), [2, 2, 2])
+
+    def test_keyed_events_stick_to_one_consumer_across_groups(self):
+        async def scenario(broker, address):
+            received = {"a": [], "b": []}
+            done = asyncio.Event()
+
+            def collector(name):
+                async def handler(topic, group, data):
+                    received[name].append((topic, data["stream"]))
+                    if len(received["a"]) + len(received["b"]) == 40:
+                        done.set()
+                return handler
+
+            transports = []
+            for name in ("a", "b"):
+                transport = SocketTransport(address)
+                await transport.connect(collector(name))
+                await transport.subscribe("PAGE", "pages")
+                await transport.subscribe("END", "ends")
+                transports.append(transport)
+            await asyncio.sleep(0.05)
+
+            publisher = SocketTransport(address)
+            await publisher.connect(None)
+            for stream in range(10):
+                for _ in range(3):
+                    await publisher.publish("PAGE", {"stream": stream}, key=f"s{stream}")
+                await publisher.publish("END", {"stream": stream}, key=f"s{stream}")
+            await asyncio.wait_for(done.wait(), 5)
+            for transport in transports + [publisher]:
+                await transport.close()
+            return received
+
+        received = self.run_with_broker(scenario)
+        streams = {name: {stream for _, stream in events} for name, events in received.items()}
+        self.assertFalse(streams["a"] & streams["b"])  # páginas e fim de cada stream no mesmo consumidor
+        self.assertEqual(streams["a"] | streams["b"], set(range(10)))
+        self.assertTrue(streams["a"] and streams["b"])
+
+    def test_two_bi_workers_report_on_whole_streams(self):
+        from a2a.event_bus import EventBus
+        from agents.bi_analytics_agent import BIAnalyticsAgent
+
+        async def scenario(broker, address):
+            workers = []
+            for _ in range(2):
+                EventBus._instance = None  # um bus por "processo" worker
+                bus = EventBus()
+                bus.use_transport(SocketTransport(address))
+                agent = BIAnalyticsAgent(bus)
+                agent.llm = None
+                await bus.connect()
+                workers.append((bus, agent))
+            EventBus._instance = None
+
+            reports = {}
+            done = asyncio.Event()
+
+            async def collect(topic, group, data):
+                reports[data["correlation_id"]] = (topic, data)
+                if len(reports) == 6:
+                    done.set()
+
+            sink = SocketTransport(address)
+            await sink.connect(collect)
+            await sink.subscribe("REPORT_READY", "sink")
+            await sink.subscribe("ERROR", "sink")
+            await asyncio.sleep(0.05)
+
+            publisher = SocketTransport(address)
+            await publisher.connect(None)
+            for stream in range(6):
+                correlation_id = f"s{stream}"
+                for index in range(4):
+                    df = pd.DataFrame({"name": [f"C{index}"], "clicks": [10], "impressions": [100],
+                                       "cost": [10.0], "conversions": [1.0]})
+                    await publisher.publish("DATA_BATCH", ColumnarPayload(
+                        df, customer_id="1", correlation_id=correlation_id, batch_index=index), key=correlation_id)
+                await publisher.publish("DATA_STREAM_END", {"customer_id": "1", "correlation_id": correlation_id,
+                                                            "batches": 4, "rows": 4}, key=correlation_id)
+            await asyncio.wait_for(done.wait(), 10)
+            for bus, agent in workers:
+                await bus.close()
+                agent.close()
+            await sink.close()
+            await publisher.close()
+            return reports
+
+        with patch.dict("os.environ", {"GOOGLE_API_KEY": "", "LLM_CACHE_ENABLED": "false"}):
+            reports = self.run_with_broker(scenario)
+        self.assertEqual({topic for topic, _ in reports.values()}, {"REPORT_READY"})
+        self.assertTrue(all(data["period_stats"]["total_spend"] == 40.0 for _, data in reports.values()))
+
+if __name__ == '__main__':
+    unittest.main()
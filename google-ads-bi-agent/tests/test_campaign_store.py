@@ -0,0 +1,66 @@
+import os
+import tempfile
+import unittest
+from datetime import date, timedelta
+
+import pandas as pd
+import pyarrow.dataset as ds
+
+from my_mcp.campaign_store import CampaignStore
+
+
+def day_frame(cost_micros, conversions=1.0):
+    return pd.DataFrame({
+        "campaign_id": [1, 2], "campaign_name": ["A", "B"], "status": ["ENABLED", "PAUSED"],
+        "clicks": [10, 5], "impressions": [100, 50],
+        "cost_micros": [cost_micros, 1_000_000], "conversions": [conversions, 0.0],
+    })
+
+
+class TestCampaignStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = CampaignStore(root=self.tmp.name)
+        self.start = date(2024, 1, 1)
+        for offset in range(10):
+            day = self.start + timedelta(days=offset)
+            self.store.write_day("1", day, day_frame((offset + 1) * 1_000_000))
+            self.store.write_day("2", day, day_frame(0, conversions=0.0))
+
+    def tearDown(self):
+        self.store.close()
+        self.tmp.cleanup()
+
+    def test_read_prunes_by_date(self):
+        df = self.store.read("1", date(2024, 1, 3), date(2024, 1, 4))
+
+        self.assertEqual(sorted(df["date"].unique()), ["2024-01-03", "2024-01-04"])
+        self.assertEqual(list(df.columns)[-1], "date")
+        self.assertEqual(df["cost_micros"].max(), 4_000_000)
+
+    def test_scan_pushes_down_filter_and_columns(self):
+        table = self.store.scan(customer_ids=["1", "2"], start=date(2024, 1, 9), columns=["campaign_id", "cost_micros"],
+                                filter=ds.field("cost_micros") > 1_000_000)
+
+        self.assertEqual(table.column_names, ["campaign_id", "cost_micros", "date", "customer_id"])
+        self.assertEqual(sorted(table.column("date").to_pylist()), ["2024-01-09", "2024-01-10"])
+        self.assertEqual(set(table.column("customer_id").to_pylist()), {"1"})
+
+    def test_daily_totals(self):
+        totals = self.store.daily_totals("1", date(2024, 1, 1), date(2024, 1, 2))
+
+        self.assertEqual(list(totals["date"]), ["2024-01-01", "2024-01-02"])
+        self.assertEqual(list(totals["cost_micros"]), [2_000_000, 3_000_000])
+        self.assertEqual(list(totals["clicks"]), [15, 15])
+
+    def test_unknown_customer_and_leftover_tmp_file(self):
+        # Um .tmp de uma escrita interrompida não pode aparecer nas leituras
+        partition = os.path.join(self.tmp.name, "customer_id=1", "date=2024-01-01")
+        with open(os.path.join(partition, ".part-0.parquet.tmp"), "wb") as f:
+            f.write(b"partial")
+
+        self.assertEqual(len(self.store.read("1", date(2024, 1, 1), date(2024, 1, 1))), 2)
+        self.assertTrue(self.store.read("9", date(2024, 1, 1), date(2024, 1, 10)).empty)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+import asyncio
+import threading
+import unittest
+from a2a.event_bus import EventBus, BackpressureError, RequestFailed
+
+class TestEventBus(unittest.TestCase):
+    def setUp(self):
+        EventBus._instance = None  # singleton limpo por teste
+        self.bus = EventBus()
+
+    def test_direct_delivery_offloads_sync_handlers(self):
+        threads = []
+        self.bus.subscribe("T", lambda data: threads.append(threading.current_thread().name))
+        asyncio.run(self.bus.publish("T", {}))
+        self.assertTrue(threads[0].startswith("bus-handler"))
+
+    def test_queued_topic_bounds_workers_and_drains(self):
+        running, peak, handled = 0, 0, []
+
+        async def handler(data):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.005)
+            running -= 1
+            handled.append(data)
+
+        self.bus.subscribe("T", handler)
+        self.bus.configure_topic("T", maxsize=2, workers=3, policy="block")
+
+        async def run():
+            for i in range(20):
+                await self.bus.publish("T", i)
+            await self.bus.join("T")
+            metrics = self.bus.metrics()["T"]
+            await self.bus.close()
+            return metrics
+
+        metrics = asyncio.run(run())
+        self.assertEqual(sorted(handled), list(range(20)))
+        self.assertEqual(peak, 3)
+        self.assertLessEqual(metrics["max_depth"], 2)
+        self.assertEqual(metrics["handler_latency"]["count"], 20)
+
+    def test_reject_and_drop_oldest_policies(self):
+        handled = []
+
+        async def run(policy):
+            release = asyncio.Event()
+
+            async def handler(data):
+                await release.wait()
+                handled.append(data)
+
+            EventBus._instance = None
+            bus = EventBus()
+            bus.subscribe("T", handler)
+            bus.configure_topic("T", maxsize=1, workers=1, policy=policy)
+            await bus.publish("T", "a")
+            await asyncio.sleep(0)  # worker pega "a" e fica bloqueado
+            await bus.publish("T", "b")
+            try:
+                await bus.publish("T", "c")
+            finally:
+                release.set()
+                await bus.join("T")
+                metrics = bus.metrics()["T"]
+                await bus.close()
+            return metrics
+
+        with self.assertRaises(BackpressureError):
+            asyncio.run(run("reject"))
+        self.assertEqual(handled, ["a", "b"])
+
+        handled.clear()
+        metrics = asyncio.run(run("drop_oldest"))
+        self.assertEqual(handled, ["a", "c"])
+        self.assertEqual(metrics["dropped"], 1)
+
+    def test_concurrent_requests_get_their_own_replies(self):
+        async def worker(data):
+            # Responde fora de ordem: o primeiro pedido demora mais
+            await asyncio.sleep(0.05 if data["n"] == 0 else 0.0)
+            if data["n"] == 2:
+                await self.bus.publish("ERROR", {"message": "boom", "correlation_id": data["correlation_id"]})
+            else:
+                await self.bus.publish("REPORT_READY", {"n": data["n"], "correlation_id": data["correlation_id"]})
+
+        self.bus.subscribe("CMD", worker)
+        self.bus.configure_topic("CMD", maxsize=10, workers=3)
+
+        async def run():
+            results = await asyncio.gather(
+                *(self.bus.request("CMD", {"n": n}, timeout=1.0) for n in range(3)), return_exceptions=True
+            )
+            with self.assertRaises(asyncio.TimeoutError):
+                await self.bus.request("NOBODY_LISTENS", {}, timeout=0.05)
+            pending = dict(self.bus._pending_requests)
+            await self.bus.close()
+            return results, pending
+
+        results, pending = asyncio.run(run())
+        self.assertEqual([results[0]["n"], results[1]["n"]], [0, 1])
+        self.assertIsInstance(results[2], RequestFailed)
+        self.assertEqual(pending, {})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+import asyncio
+import unittest
+from agents.extraction_scheduler import ExtractionScheduler
+
+class TestExtractionScheduler(unittest.TestCase):
+    def test_retries_and_summary(self):
+        attempts = {}
+
+        async def fetch(customer_id):
+            attempts[customer_id] = attempts.get(customer_id, 0) + 1
+            if customer_id == "flaky" and attempts[customer_id] == 1:
+                raise RuntimeError("transient")
+            if customer_id == "broken":
+                raise RuntimeError("permanent")
+            return [{"id": customer_id}]
+
+        scheduler = ExtractionScheduler(fetch, concurrency=2, max_retries=1, backoff_base=0.001)
+        summary = asyncio.run(scheduler.run(["a", "flaky", "broken", "b"]))
+
+        self.assertEqual(summary["total_customers"], 4)
+        self.assertEqual(summary["succeeded"], 3)
+        self.assertEqual(summary["rows"], 3)
+        self.assertEqual(summary["retries"], 2)  # flaky 1x + broken 1x
+        self.assertEqual([f["customer_id"] for f in summary["failed"]], ["broken"])
+        self.assertEqual(attempts["broken"], 2)
+
+    def test_failing_callback_fails_only_that_customer(self):
+        async def fetch(customer_id):
+            return [{"id": customer_id}]
+
+        delivered = []
+
+        async def on_result(customer_id, rows):
+            if customer_id == "b":
+                raise RuntimeError("queue full")
+            delivered.append(customer_id)
+
+        scheduler = ExtractionScheduler(fetch, concurrency=1)
+        summary = asyncio.run(scheduler.run(["a", "b", "c"], on_result=on_result))
+
+        self.assertEqual(delivered, ["a", "c"])
+        self.assertEqual((summary["succeeded"], summary["rows"]), (2, 2))
+        self.assertEqual(summary["failed"], [{"customer_id": "b", "error": "on_result: queue full"}])
+
+    def test_concurrency_limit(self):
+        running = 0
+        peak = 0
+
+        async def fetch(customer_id):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            return []
+
+        scheduler = ExtractionScheduler(fetch, concurrency=3)
+        asyncio.run(scheduler.run([str(i) for i in range(20)]))
+        self.assertEqual(peak, 3)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,30 +1,146 @@
+import time
+import asyncio
 import unittest
+from unittest.mock import MagicMock, AsyncMock, patch
 from agents.google_ads_agent import GoogleAdsAgent
-import os
+from my_mcp.google_ads_client import GoogleAdsClientWrapper
+from utils.loop_monitor import LoopLagMonitor
 
 class TestGoogleAdsAgent(unittest.TestCase):
     def setUp(self):
-        # Ensure we point to the correct config file based on execution context
-        # Assuming execution from /home/kid/Documents/mydataagent
-        config_path = "google-ads-bi-agent/config/settings.yaml"
-        self.agent = GoogleAdsAgent(config_path=config_path)
-        self.customer_id = "1234567890"
+        self.agent = GoogleAdsAgent(MagicMock())
+        self.raw_data = GoogleAdsClientWrapper(config_path="config/missing.yaml")._mock_response()
 
     def test_fetch_structure(self):
-        """Tests if the return structure has necessary keys for BI"""
-        data = self.agent.fetch_campaign_data(self.customer_id)
-        
-        self.assertIsInstance(data, list)
+        """Tests if the return structure has necessary columns for BI"""
+        data = self.agent._process_data(self.raw_data)
+
         self.assertTrue(len(data) > 0, "Mock should return data")
-        
-        first_item = data[0]
-        self.assertIn("id", first_item)
-        self.assertIn("metrics", first_item)
-        self.assertIn("cost", first_item["metrics"])
-        
+        for column in ("id", "name", "status", "clicks", "impressions", "cost", "conversions", "cpa"):
+            self.assertIn(column, data.columns)
+
         # Verify micro conversion (Mock returns 50000000 -> 50.0)
+        first_item = data.iloc[0]
         if first_item["id"] == "111":
-            self.assertEqual(first_item["metrics"]["cost"], 50.0)
+            self.assertEqual(first_item["cost"], 50.0)
+            self.assertEqual(first_item["cpa"], 5.0)
+
+    def test_process_data_zero_conversions(self):
+        data = self.agent._process_data([
+            {"campaign_id": 1, "campaign_name": "X", "clicks": 1, "impressions": 10, "cost_micros": 1_234_567, "conversions": 0, "status": "ENABLED"}
+        ])
+        self.assertEqual(data.loc[0, "cost"], 1.23)
+        self.assertEqual(data.loc[0, "cpa"], 0.0)
+        self.assertEqual(data.loc[0, "id"], "1")
+
+    def test_process_data_accepts_column_batches(self):
+        client = GoogleAdsClientWrapper(config_path="config/missing.yaml")
+        batch = next(client.iter_query_batches("1234567890", "SELECT campaign.id FROM campaign"))
+        self.assertEqual(len(self.agent._process_data(batch)), len(self.raw_data))
+
+    def test_blocking_fetch_does_not_stall_event_loop(self):
+        calls = []
+
+        def slow_fetch(customer_id, date_range):
+            calls.append(customer_id)
+            time.sleep(0.2)  # simula gRPC síncrono lento
+            return []
+
+        async def run():
+            bus = MagicMock()
+            bus.publish = AsyncMock()
+            agent = GoogleAdsAgent(bus, io_workers=4)
+            monitor = LoopLagMonitor(interval=0.01)
+            monitor.start()
+            # Transporte inprocess: o agente chama fetch_campaign_table (tabela Arrow)
+            with patch("my_mcp.server.fetch_campaign_table", slow_fetch):
+                await agent.handle_batch_command({"customer_ids": ["1", "2", "3", "4"], "concurrency": 4})
+            return await monitor.stop()
+
+        lag = asyncio.run(run())
+        # Sem isto o teste passaria em silêncio se o agente deixasse de chamar o fake
+        self.assertEqual(sorted(calls), ["1", "2", "3", "4"])
+        self.assertLess(lag["max_ms"], 100)
+
+    def test_concurrent_pipelines_on_one_bus(self):
+        from a2a.event_bus import EventBus
+        from agents.bi_analytics_agent import BIAnalyticsAgent
+
+        async def run():
+            EventBus._instance = None
+            bus = EventBus()
+            agent = GoogleAdsAgent(bus)
+            BIAnalyticsAgent(bus).llm = None
+            bus.configure_topic("CMD_START_EXTRACT", maxsize=10, workers=3)
+            reports = await asyncio.gather(
+                *(bus.request("CMD_START_EXTRACT", {"customer_id": cid}, timeout=10) for cid in ("1", "2", "3"))
+            )
+            await bus.close()
+            await agent.close()
+            EventBus._instance = None
+            return reports
+
+        reports = asyncio.run(run())
+        self.assertEqual([r["customer_id"] for r in reports], ["1", "2", "3"])
+        self.assertTrue(all("period_stats" in r for r in reports))
+
+    def test_default_extraction_fills_local_history(self):
+        import tempfile
+        from datetime import date, timedelta
+        from my_mcp.campaign_store import CampaignStore
+
+        with tempfile.TemporaryDirectory() as tmp:
+            store = CampaignStore(root=tmp)
+            agent = GoogleAdsAgent(MagicMock(), ads_client=GoogleAdsClientWrapper(config_path="config/missing.yaml"),
+                                   store=store, history_days=14)
+
+            df = asyncio.run(agent.extract("1234567890", "LAST_30_DAYS"))
+            yesterday = date.today() - timedelta(days=1)
+            totals = store.daily_totals("1234567890", yesterday - timedelta(days=13), yesterday)
+            high_water_mark = store.get_high_water_mark("1234567890")
+            store.close()
+
+        self.assertEqual(len(df), len(self.raw_data))  # o relatório continua vindo da consulta do período
+        self.assertEqual(len(totals), 14)
+        self.assertEqual(high_water_mark, yesterday)
+
+    def test_batch_command_failure_answers_with_error(self):
+        from a2a.event_bus import EventBus, RequestFailed
+
+        async def run():
+            EventBus._instance = None
+            bus = EventBus()
+            client = MagicMock()
+            client.list_child_customers.side_effect = RuntimeError("PERMISSION_DENIED")
+            agent = GoogleAdsAgent(bus, ads_client=client)
+            try:
+                # Sem o ERROR, o pedido esperaria BATCH_EXTRACT_DONE até o timeout
+                with self.assertRaises(RequestFailed) as failure:
+                    await bus.request("CMD_START_BATCH_EXTRACT", {"manager_id": "999"},
+                                      reply_topic="BATCH_EXTRACT_DONE", timeout=5)
+                return failure.exception.payload
+            finally:
+                await bus.close()
+                await agent.close()
+                EventBus._instance = None
+
+        error = asyncio.run(run())
+        self.assertEqual(error["source"], "ADS_AGENT")
+        self.assertIn("PERMISSION_DENIED", error["message"])
+
+    def test_stream_error_publishes_error_not_stream_end(self):
+        from tests.test_google_ads_client import failing_stream, real_mode_client
+
+        service = MagicMock()
+        service.search_stream.side_effect = lambda **kwargs: failing_stream(pages=2)
+        bus = MagicMock()
+        bus.publish = AsyncMock()
+        agent = GoogleAdsAgent(bus, ads_client=real_mode_client(service), batch_size=1)
+
+        asyncio.run(agent.handle_command({"customer_id": "1", "stream": True, "correlation_id": "c1"}))
+        topics = [call.args[0] for call in bus.publish.await_args_list]
+        self.assertEqual(topics, ["DATA_BATCH", "DATA_BATCH", "ERROR"])
+        self.assertEqual(bus.publish.await_args_list[-1].args[1]["correlation_id"], "c1")
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,85 @@
+import asyncio
+import unittest
+from unittest.mock import MagicMock
+from my_mcp import google_ads_client
+from my_mcp.google_ads_client import GoogleAdsClientWrapper, CAMPAIGN_COLUMNS, CAMPAIGN_QUERY
+
+
+def api_error(code: str = "RESOURCE_EXHAUSTED") -> Exception:
+    error = google_ads_client.GoogleAdsException(code)
+    error.error = MagicMock()
+    error.error.code.return_value.name = code
+    return error
+
+
+def failing_stream(pages: int = 1):
+    """search_stream que entrega `pages` páginas de uma linha e então falha (quota, auth...)."""
+    row = MagicMock()
+    row.campaign.id, row.campaign.name, row.campaign.status.name = 1, "A", "ENABLED"
+    row.metrics.clicks, row.metrics.impressions, row.metrics.cost_micros, row.metrics.conversions = 1, 10, 1_000_000, 0
+    row.segments.date = ""
+    for _ in range(pages):
+        yield MagicMock(results=[row])
+    raise api_error()
+
+
+def real_mode_client(service) -> GoogleAdsClientWrapper:
+    client = GoogleAdsClientWrapper(config_path="config/missing.yaml")
+    client.use_mock = False
+    client.cache = None
+    client.client = MagicMock()
+    client.client.get_service.return_value = service
+    return client
+
+
+class TestGoogleAdsClientWrapper(unittest.TestCase):
+    def setUp(self):
+        # Config inexistente -> modo mock
+        self.client = GoogleAdsClientWrapper(config_path="config/missing.yaml")
+        self.query = CAMPAIGN_QUERY.format(date_range="LAST_30_DAYS")
+
+    def test_iter_query_batches_respects_batch_size(self):
+        batches = list(self.client.iter_query_batches("1234567890", self.query, batch_size=2))
+
+        self.assertEqual([len(b["campaign_id"]) for b in batches], [2, 1])
+        self.assertEqual(set(batches[0].keys()), set(CAMPAIGN_COLUMNS))
+        rows = self.client.execute_query("1234567890", self.query)
+        self.assertEqual(batches[0]["campaign_name"][0], rows[0]["campaign_name"])
+
+    def test_aiter_query_batches(self):
+        async def collect():
+            return [b async for b in self.client.aiter_query_batches("1234567890", self.query, batch_size=10)]
+
+        batches = asyncio.run(collect())
+        self.assertEqual(len(batches), 1)
+        self.assertEqual(len(batches[0]["cost_micros"]), 3)
+
+    def test_shared_registry_reuses_wrapper_and_services(self):
+        GoogleAdsClientWrapper.reset_shared()
+        shared = GoogleAdsClientWrapper.shared("config/missing.yaml")
+        self.assertIs(shared, GoogleAdsClientWrapper.shared("config/missing.yaml"))
+        GoogleAdsClientWrapper.reset_shared()
+
+        self.client.client = MagicMock()
+        first = self.client._get_service("GoogleAdsService")
+        self.assertIs(first, self.client._get_service("GoogleAdsService"))
+        self.client.client.get_service.assert_called_once_with("GoogleAdsService")
+
+    def test_api_errors_propagate(self):
+        service = MagicMock()
+        service.search_stream.side_effect = lambda **kwargs: failing_stream(pages=2)
+        service.search.side_effect = api_error("AUTHENTICATION_ERROR")
+        client = real_mode_client(service)
+
+        # Páginas já entregues saem; o erro no meio do stream sobe em vez de encerrar em silêncio
+        batches = client.iter_query_batches("1234567890", self.query, batch_size=1)
+        self.assertEqual(len(next(batches)["campaign_id"]), 1)
+        with self.assertRaises(google_ads_client.GoogleAdsException):
+            list(batches)
+        with self.assertRaises(google_ads_client.GoogleAdsException):
+            client.execute_query("1234567890", self.query)
+        with self.assertRaises(google_ads_client.GoogleAdsException):
+            client.list_child_customers("1234567890")
+
+if __name__ == '__main__':
+    unittest.main()
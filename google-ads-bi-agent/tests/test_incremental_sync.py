@@ -0,0 +1,74 @@
+import tempfile
+import unittest
+from datetime import date
+from unittest.mock import MagicMock
+from my_mcp.campaign_store import CampaignStore
+from my_mcp.google_ads_client import GoogleAdsClientWrapper
+from my_mcp.incremental_sync import IncrementalSync
+
+class TestIncrementalSync(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = CampaignStore(root=self.tmp.name)
+        client = GoogleAdsClientWrapper(config_path="config/missing.yaml")
+        self.sync = IncrementalSync(client, self.store, restatement_days=3, initial_days=30)
+        self.today = date(2024, 3, 15)
+
+    def tearDown(self):
+        self.store.close()
+        self.tmp.cleanup()
+
+    def test_first_run_fetches_window(self):
+        summary = self.sync.sync("1", today=self.today)
+
+        self.assertEqual(summary["ranges"], [("2024-02-14", "2024-03-14")])
+        self.assertEqual(summary["days_written"], 30)
+        self.assertEqual(self.store.get_high_water_mark("1"), date(2024, 3, 14))
+
+    def test_next_day_fetches_only_new_days_plus_restatement(self):
+        self.sync.sync("1", today=self.today)
+        summary = self.sync.sync("1", today=date(2024, 3, 16))
+
+        # 3 dias de restatement (12..14) + 1 dia novo (15)
+        self.assertEqual(summary["ranges"], [("2024-03-12", "2024-03-15")])
+        self.assertEqual(summary["api_calls"], 1)
+        self.assertEqual(self.store.get_high_water_mark("1"), date(2024, 3, 15))
+
+    def test_larger_window_backfills_older_days(self):
+        self.sync.sync("1", today=self.today)
+        summary = self.sync.sync("1", window_days=90, today=self.today)
+
+        self.assertEqual(summary["ranges"][0], ("2023-12-16", "2024-02-13"))
+        self.assertEqual(len(self.store.days("1")), 90)
+
+    def test_campaign_totals_merge_days(self):
+        self.sync.sync("1", today=self.today)
+        totals = self.store.campaign_totals("1", date(2024, 3, 13), date(2024, 3, 14))
+
+        self.assertEqual(len(totals), 3)
+        row = totals[totals["campaign_id"] == "111"].iloc[0]
+        self.assertEqual(row["cost_micros"], 2 * 50_000_000)
+        self.assertEqual(row["conversions"], 20)
+
+    def test_api_error_mid_range_keeps_days_unsynced(self):
+        self.sync.sync("1", today=self.today)
+        before = self.store.campaign_totals("1", date(2024, 3, 12), date(2024, 3, 14))
+
+        def failing_batches(customer_id, query, batch_size, columns):
+            yield from self.sync.client.iter_query_batches(customer_id, query, 1, columns)  # só a 1ª página
+            raise RuntimeError("RESOURCE_EXHAUSTED")
+
+        broken = IncrementalSync(MagicMock(iter_query_batches=lambda *args: failing_batches(*args)),
+                                 self.store, restatement_days=3)
+        with self.assertRaises(RuntimeError):
+            broken.sync("1", today=date(2024, 3, 16))
+
+        # Nem dias vazios, nem marca d'água adiantada: o próximo run busca 12..15 de novo
+        self.assertEqual(self.store.get_high_water_mark("1"), date(2024, 3, 14))
+        self.assertNotIn(date(2024, 3, 15), self.store.days("1"))
+        after = self.store.campaign_totals("1", date(2024, 3, 12), date(2024, 3, 14))
+        self.assertEqual(after["cost_micros"].sum(), before["cost_micros"].sum())
+        self.assertEqual(self.sync.plan("1", today=date(2024, 3, 16)), [(date(2024, 3, 12), date(2024, 3, 15))])
+
+if __name__ == '__main__':
+    unittest.main()
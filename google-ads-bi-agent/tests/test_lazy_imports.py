@@ -0,0 +1,34 @@
+import os
+import subprocess
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def loaded_after(code: str, modules) -> list:
+    """Roda `code` num interpretador novo e devolve quais de `modules` foram importados."""
+    probe = f"import sys\n{code}\nprint(','.join(m for m in {tuple(modules)!r} if m in sys.modules))"
+    env = {**os.environ, "GOOGLE_API_KEY": "test-key", "LOG_LEVEL": "CRITICAL"}
+    result = subprocess.run([sys.executable, "-c", probe], cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    return [name for name in result.stdout.splitlines()[-1].split(",") if name]
+
+
+class TestLazyImports(unittest.TestCase):
+    def test_bi_agent_defers_langchain_until_first_analysis(self):
+        code = ("from unittest.mock import MagicMock\n"
+                "from agents.bi_analytics_agent import BIAnalyticsAgent\n"
+                "agent = BIAnalyticsAgent(MagicMock())\n"
+                "assert agent.llm is None and agent.llm_enabled")
+        self.assertEqual(loaded_after(code, ["langchain_google_genai", "google.ads.googleads.client"]), [])
+
+    def test_entry_points_skip_data_stack(self):
+        self.assertEqual(loaded_after("import a2a.broker, a2a.event_bus, main, worker",
+                                      ["pandas", "pyarrow", "langchain_google_genai", "mcp"]), [])
+
+    def test_mcp_server_defers_pyarrow_and_google_ads(self):
+        self.assertEqual(loaded_after("import my_mcp.server", ["pyarrow", "google.ads.googleads.client"]), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
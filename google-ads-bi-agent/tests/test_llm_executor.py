@@ -0,0 +1,75 @@
+import asyncio
+import unittest
+from types import SimpleNamespace
+from unittest.mock import MagicMock, AsyncMock
+from agents.llm_executor import LLMExecutor
+
+def message(text):
+    return SimpleNamespace(content=text, usage_metadata={"input_tokens": 100, "output_tokens": 20, "total_tokens": 120})
+
+class TestLLMExecutor(unittest.TestCase):
+    def test_retries_with_backoff_and_reports_usage(self):
+        runnable = MagicMock()
+        runnable.ainvoke = AsyncMock(side_effect=[RuntimeError("429"), message("a"), message("b")])
+        executor = LLMExecutor(runnable, parse=lambda m: m.content, max_retries=2, backoff_base=0.001)
+
+        async def run():
+            return [await executor.ainvoke({"x": 1}), await executor.ainvoke({"x": 2})]
+
+        self.assertEqual(asyncio.run(run()), ["a", "b"])
+        metrics = executor.metrics()
+        self.assertEqual((metrics["calls"], metrics["retries"], metrics["failures"]), (3, 1, 0))
+        self.assertEqual(metrics["total_tokens"], 240)
+        self.assertEqual(metrics["latency"]["count"], 3)
+
+    def test_concurrency_limit_and_batching(self):
+        running, peak = 0, 0
+
+        async def ainvoke(inputs):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            return message(inputs["n"])
+
+        failed_once = set()
+
+        async def abatch(batch, return_exceptions=False):
+            results = []
+            for inputs in batch:
+                if inputs["n"] == 3 and 3 not in failed_once:
+                    failed_once.add(3)
+                    results.append(RuntimeError("flaky"))
+                else:
+                    results.append(message(inputs["n"]))
+            return results
+
+        runnable = MagicMock()
+        runnable.ainvoke = ainvoke
+        runnable.abatch = AsyncMock(side_effect=abatch)
+
+        single = LLMExecutor(runnable, concurrency=2, requests_per_minute=6000)
+        batched = LLMExecutor(runnable, batch_size=4, batch_delay=0.01, backoff_base=0.001)
+
+        async def run(executor):
+            return await asyncio.gather(*(executor.ainvoke({"n": n}) for n in range(8)))
+
+        asyncio.run(run(single))
+        self.assertEqual(peak, 2)
+
+        results = asyncio.run(run(batched))
+        self.assertEqual([r.content for r in results], list(range(8)))
+        self.assertEqual(batched.metrics()["rounds"], 3)  # 2 rodadas de 4 + retry da entrada que falhou
+        self.assertEqual(batched.metrics()["retries"], 1)
+
+    def test_gives_up_after_max_retries(self):
+        runnable = MagicMock()
+        runnable.ainvoke = AsyncMock(side_effect=RuntimeError("down"))
+        executor = LLMExecutor(runnable, max_retries=1, backoff_base=0.001)
+        with self.assertRaises(RuntimeError):
+            asyncio.run(executor.ainvoke({}))
+        self.assertEqual(executor.metrics()["failures"], 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,29 @@
+import json
+import asyncio
+import unittest
+from my_mcp.client import CampaignDataBatcher
+
+class FakeToolClient:
+    def __init__(self):
+        self.calls = []
+
+    async def call_tool(self, name, arguments):
+        self.calls.append((name, arguments))
+        return json.dumps({cid: [{"campaign_id": cid}] for cid in arguments["customer_ids"]})
+
+class TestCampaignDataBatcher(unittest.TestCase):
+    def test_concurrent_fetches_share_one_call(self):
+        client = FakeToolClient()
+        batcher = CampaignDataBatcher(client, max_batch=10, max_delay=0.01)
+
+        async def run():
+            return await asyncio.gather(*(batcher.fetch(str(i)) for i in range(25)))
+
+        results = asyncio.run(run())
+
+        self.assertEqual(results[7], [{"campaign_id": "7"}])
+        self.assertEqual([len(args["customer_ids"]) for _, args in client.calls], [10, 10, 5])
+        self.assertTrue(all(name == "fetch_campaign_data_batch" for name, _ in client.calls))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+import asyncio
+import unittest
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from agents.metrics_pool import MetricsPool, _aggregate_shared, _inefficient_shared, _write_shared
+from agents.streaming_aggregator import StreamingAggregator
+
+def make_frame(n, seed):
+    rng = np.random.default_rng(seed)
+    conversions = rng.poisson(1, n).astype(float)
+    conversions[rng.random(n) < 0.4] = 0
+    cost = rng.integers(0, 50, n).astype(float)
+    return pd.DataFrame({
+        "name": [f"C{seed}_{i}" for i in range(n)],
+        "cost": cost,
+        "conversions": conversions,
+        "cpa": np.divide(cost, conversions, out=np.zeros(n), where=conversions > 0),
+    })
+
+class TestMetricsPool(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.pool = MetricsPool(workers=2, min_rows_per_task=1000)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.pool.close()
+
+    def test_split_account_matches_single_pass(self):
+        df = make_frame(5000, 1)  # 5000 linhas / 1000 por tarefa -> 2 trechos (limitado a 2 workers)
+        stats = asyncio.run(self.pool.compute(df))
+        self.assertEqual(stats, StreamingAggregator().update(df).result())
+
+    def test_many_customers_in_parallel(self):
+        frames = {str(seed): make_frame(300, seed) for seed in range(4)}
+        frames["empty"] = make_frame(0, 9)
+
+        async def run():
+            return await asyncio.gather(*(self.pool.compute(df) for df in frames.values()))
+
+        for df, stats in zip(frames.values(), asyncio.run(run())):
+            self.assertEqual(stats, StreamingAggregator().update(df).result())
+
+    def test_first_phase_returns_no_per_row_state(self):
+        df = make_frame(2000, 3)
+        shm, size = _write_shared(pa.Table.from_pandas(df, preserve_index=False))
+        try:
+            partial = _aggregate_shared(shm.name, size)
+            threshold = partial.inefficiency_threshold()
+            inefficient = _inefficient_shared(shm.name, size, threshold)
+        finally:
+            shm.close()
+            shm.unlink()
+        # Só somas e heaps voltam na 1ª fase; as ineficientes vêm filtradas na 2ª
+        self.assertEqual((partial._converting, partial._inefficient_heap), ([], []))
+        self.assertEqual(inefficient, StreamingAggregator().update(df).result()["inefficient_campaigns"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,23 @@
+import unittest
+import pandas as pd
+from a2a.payloads import ColumnarPayload, payload_size
+
+class TestColumnarPayload(unittest.TestCase):
+    def setUp(self):
+        self.df = pd.DataFrame({"id": ["1", "2"], "cost": [10.5, 0.0], "clicks": [3, 0]})
+
+    def test_in_process_handoff_keeps_frame(self):
+        payload = ColumnarPayload(self.df, customer_id="123")
+        self.assertIs(payload.frame, self.df)
+        self.assertEqual(len(payload), 2)
+        self.assertEqual(payload_size(payload), payload.nbytes)
+
+    def test_ipc_round_trip(self):
+        payload = ColumnarPayload(self.df, customer_id="123", batch_index=0)
+        restored = ColumnarPayload.from_ipc(payload.to_ipc())
+
+        pd.testing.assert_frame_equal(restored.frame, self.df)
+        self.assertEqual(restored.meta, {"customer_id": "123", "batch_index": "0"})
+
+if __name__ == '__main__':
+    unittest.main()
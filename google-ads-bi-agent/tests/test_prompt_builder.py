@@ -0,0 +1,47 @@
+import unittest
+import numpy as np
+import pandas as pd
+from agents.prompt_builder import build_table_view, estimate_tokens
+
+def make_frame(n):
+    rng = np.random.default_rng(7)
+    cost = rng.uniform(0, 500, n).round(2)
+    conversions = rng.poisson(2, n).astype(float)
+    conversions[:n // 3] = 0
+    return pd.DataFrame({
+        "name": [f"Campanha_{i}" for i in range(n)],
+        "cost": cost,
+        "conversions": conversions,
+        "cpa": np.divide(cost, conversions, out=np.zeros(n), where=conversions > 0),
+        "ctr_percent": rng.uniform(0, 10, n),
+    })
+
+class TestPromptBuilder(unittest.TestCase):
+    def test_small_account_is_rendered_whole(self):
+        text, info = build_table_view(make_frame(5))
+        self.assertEqual(info["rows_shown"], 5)
+        self.assertEqual(info["rows_aggregated"], 0)
+        self.assertEqual(len(text.splitlines()), 6)  # cabeçalho + 5 linhas
+
+    def test_large_account_stays_within_budget_and_keeps_totals(self):
+        df = make_frame(50_000)
+        text, info = build_table_view(df, token_budget=1000)
+        lines = text.splitlines()
+
+        self.assertLessEqual(estimate_tokens(text), 1000)
+        self.assertEqual(info["rows_shown"] + info["rows_aggregated"], 50_000)
+        # Maior conversão e maior gasto sem conversão sempre entram
+        self.assertIn(df.loc[df["conversions"].idxmax(), "name"], text)
+        waste = df[df["conversions"] == 0]
+        self.assertIn(waste.loc[waste["cost"].idxmax(), "name"], text)
+        # Linhas exibidas + agregado = gasto total
+        shown = pd.read_csv(pd.io.common.StringIO("\n".join(lines)))
+        self.assertAlmostEqual(shown["custo"].sum(), df["cost"].sum(), delta=0.01 * len(shown))
+
+    def test_priority_groups_come_first(self):
+        df = make_frame(1000)
+        text, _ = build_table_view(df, token_budget=500, priority=[("anomalia", [999])])
+        self.assertTrue(text.splitlines()[1].startswith("anomalia,Campanha_999,"))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import os
+import tempfile
+import unittest
+from datetime import date
+from my_mcp.query_cache import QueryCache, date_segment, normalize_gaql
+from my_mcp.google_ads_client import GoogleAdsClientWrapper
+
+class TestQueryCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = QueryCache(path=os.path.join(self.tmp.name, "cache.sqlite"))
+
+    def tearDown(self):
+        self.cache.close()
+        self.tmp.cleanup()
+
+    def test_normalize_gaql_keeps_literals(self):
+        a = normalize_gaql("SELECT campaign.id\n  FROM campaign WHERE campaign.name = 'Black Friday'")
+        b = normalize_gaql("select campaign.id from campaign   where campaign.name = 'Black Friday'")
+        self.assertEqual(a, b)
+        self.assertIn("'Black Friday'", a)
+
+    def test_date_segment(self):
+        today = date(2024, 3, 15)
+        self.assertEqual(date_segment("... WHERE segments.date DURING LAST_30_DAYS", today), ("2024-02-14:2024-03-14", False))
+        self.assertEqual(date_segment("... WHERE segments.date DURING TODAY", today), ("2024-03-15:2024-03-15", True))
+        self.assertEqual(
+            date_segment("... WHERE segments.date BETWEEN '2024-01-01' AND '2024-01-31'", today),
+            ("2024-01-01:2024-01-31", False),
+        )
+
+    def test_hit_miss_and_ttl(self):
+        query = "SELECT campaign.id FROM campaign WHERE segments.date DURING LAST_7_DAYS"
+        self.assertIsNone(self.cache.get("1", query))
+        self.cache.put("1", query, [{"campaign_id": 1}])
+        self.assertEqual(self.cache.get("1", query), [{"campaign_id": 1}])
+        self.assertIsNone(self.cache.get("2", query))
+        self.assertEqual((self.cache.stats()["hits"], self.cache.stats()["misses"]), (1, 2))
+
+        self.cache.closed_ttl = -1
+        self.cache.put("1", query, [{"campaign_id": 1}])
+        self.assertIsNone(self.cache.get("1", query))
+
+    def test_size_eviction_is_lru(self):
+        self.cache.max_bytes = 150
+        rows = [{"campaign_name": "x" * 40, "n": i} for i in range(3)]
+        self.cache.put("a", "SELECT 1", rows)
+        self.cache.put("b", "SELECT 1", rows)
+        self.cache.get("a", "SELECT 1")  # 'a' passa a ser o mais recente
+        self.cache.put("c", "SELECT 1", rows)
+
+        self.assertIsNotNone(self.cache.get("a", "SELECT 1"))
+        self.assertIsNone(self.cache.get("b", "SELECT 1"))
+        self.assertLessEqual(self.cache.stats()["bytes"], 150)
+
+    def test_wrapper_serves_from_cache(self):
+        client = GoogleAdsClientWrapper(config_path="config/missing.yaml", cache=self.cache)
+        first = client.execute_query("1", "SELECT campaign.id FROM campaign")
+        second = client.execute_query("1", "SELECT campaign.id FROM campaign")
+        self.assertEqual(first, second)
+        self.assertEqual(self.cache.stats()["hits"], 1)
+
+if __name__ == '__main__':
+    unittest.main()
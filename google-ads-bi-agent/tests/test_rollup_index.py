@@ -0,0 +1,93 @@
+import json
+import tempfile
+import unittest
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+from my_mcp import server
+from my_mcp.campaign_store import CampaignStore
+from my_mcp.rollup_index import RollupIndex, decompose
+
+
+def day_frame(rng, campaigns=5):
+    return pd.DataFrame({
+        "campaign_id": [str(i) for i in range(campaigns)], "campaign_name": "X", "status": "ENABLED",
+        "clicks": rng.integers(0, 100, campaigns), "impressions": rng.integers(100, 1000, campaigns),
+        "cost_micros": rng.integers(0, 10_000_000, campaigns), "conversions": rng.integers(0, 5, campaigns).astype(float),
+    })
+
+
+class TestRollupIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = CampaignStore(root=self.tmp.name)
+        self.rng = np.random.default_rng(7)
+        self.start, self.end = date(2024, 1, 1), date(2024, 3, 31)
+        day = self.start
+        while day <= self.end:
+            self.store.write_day("1", day, day_frame(self.rng))
+            day += timedelta(days=1)
+
+    def tearDown(self):
+        self.store.close()
+        self.tmp.cleanup()
+
+    def assertMatchesRaw(self, start, end, campaign_id=None):
+        raw = self.store.read("1", start, end)
+        if campaign_id is not None:
+            raw = raw[raw["campaign_id"] == campaign_id]
+        window = self.store.rollups.window("1", start, end, campaign_id)
+        self.assertEqual(window["clicks"], raw["clicks"].sum())
+        self.assertEqual(window["cost"], round(raw["cost_micros"].sum() / 1_000_000, 2))
+        self.assertEqual(window["conversions"], raw["conversions"].sum())
+        return window
+
+    def test_decompose_uses_largest_cells(self):
+        cells = decompose(date(2024, 1, 30), date(2024, 3, 12))
+
+        self.assertEqual(cells[:3], [("day", date(2024, 1, 30)), ("day", date(2024, 1, 31)), ("month", date(2024, 2, 1))])
+        self.assertEqual(cells[3:], [("day", date(2024, 3, 1)), ("day", date(2024, 3, 2)), ("day", date(2024, 3, 3)),
+                                     ("week", date(2024, 3, 4)), ("day", date(2024, 3, 11)), ("day", date(2024, 3, 12))])
+
+    def test_window_matches_raw_rows(self):
+        window = self.assertMatchesRaw(date(2024, 1, 10), date(2024, 3, 20))
+        self.assertLess(window["cells"], 20)
+        self.assertMatchesRaw(date(2024, 2, 5), date(2024, 2, 18), campaign_id="3")
+
+    def test_restated_day_updates_week_and_month(self):
+        restated = day_frame(self.rng, campaigns=3)  # campanhas 3 e 4 somem no dia reprocessado
+        self.store.write_day("1", date(2024, 2, 14), restated)
+
+        self.assertMatchesRaw(date(2024, 2, 1), date(2024, 2, 29))
+        self.assertMatchesRaw(date(2024, 2, 12), date(2024, 2, 18), campaign_id="4")
+        weeks = self.store.rollups.series("1", "week", date(2024, 2, 12), date(2024, 2, 18))
+        raw = self.store.read("1", date(2024, 2, 12), date(2024, 2, 18))
+        self.assertEqual([row["clicks"] for row in weeks], [raw["clicks"].sum()])
+
+    def test_rebuild_and_by_campaign(self):
+        rebuilt = RollupIndex(f"{self.tmp.name}/rebuilt.sqlite")
+        rebuilt.rebuild(self.store)
+        window = rebuilt.window("1", self.start, self.end, by_campaign=True)
+        rebuilt.close()
+
+        self.assertEqual(window, self.store.rollups.window("1", self.start, self.end, by_campaign=True))
+        self.assertEqual(len(window["campaigns"]), 5)
+        costs = [entry["cost"] for entry in window["campaigns"]]
+        self.assertEqual(costs, sorted(costs, reverse=True))
+
+    def test_mcp_tool(self):
+        server._rollups = self.store.rollups
+        try:
+            window = json.loads(server.query_rollups("1", "2024-01-01", "2024-01-31"))
+            months = json.loads(server.query_rollups("1", "2024-01-01", "2024-03-31", grain="month"))
+        finally:
+            server._rollups = None
+
+        self.assertEqual(window["cells"], 1)
+        self.assertEqual([row["period"] for row in months], ["2024-01-01", "2024-02-01", "2024-03-01"])
+        self.assertEqual(months[0]["clicks"], window["clicks"])
+
+if __name__ == '__main__':
+    unittest.main()
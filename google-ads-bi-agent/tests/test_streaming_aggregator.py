@@ -0,0 +1,53 @@
+import unittest
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from agents.streaming_aggregator import StreamingAggregator, aggregate_batches
+
+def legacy_hard_metrics(df):
+    """Implementação anterior de _calculate_hard_metrics (várias passadas sobre o DataFrame)."""
+    df = df.copy()
+    df['cpa'] = np.divide(df['cost'].to_numpy(), df['conversions'].to_numpy(dtype='float64'),
+                          out=np.zeros(len(df)), where=df['conversions'].to_numpy() > 0)
+    high_cpa_threshold = df['cpa'].mean() * 1.5
+    return {
+        "total_spend": round(df['cost'].sum(), 2),
+        "total_conversions": int(df['conversions'].sum()),
+        "global_cpa": round(df['cost'].sum() / df['conversions'].sum(), 2) if df['conversions'].sum() > 0 else 0,
+        "top_campaigns": df.nlargest(3, 'conversions')[['name', 'conversions', 'cpa']].to_dict('records'),
+        "inefficient_campaigns": df[(df['cpa'] > high_cpa_threshold) & (df['conversions'] > 0)][['name', 'cpa']].to_dict('records'),
+        "wasteful_spend": df[(df['conversions'] == 0) & (df['cost'] > 0)].nlargest(3, 'cost')[['name', 'cost']].to_dict('records'),
+    }
+
+def make_frame(n, seed):
+    rng = np.random.default_rng(seed)
+    conversions = rng.poisson(1, n)  # muitos empates
+    conversions[rng.random(n) < 0.4] = 0
+    return pd.DataFrame({
+        "name": [f"C{i}" for i in range(n)],
+        "cost": rng.integers(0, 50, n).astype(float),  # empates de custo também
+        "conversions": conversions,
+    })
+
+class TestStreamingAggregator(unittest.TestCase):
+    def test_matches_legacy_in_one_or_many_batches(self):
+        for seed, n, batch_size in ((1, 10, 3), (2, 1000, 1000), (3, 5000, 137), (4, 1, 1)):
+            df = make_frame(n, seed)
+            expected = legacy_hard_metrics(df)
+            batches = (df.iloc[i:i + batch_size] for i in range(0, n, batch_size))
+            self.assertEqual(aggregate_batches(batches), expected, f"seed={seed}")
+
+    def test_arrow_batches_and_empty_input(self):
+        df = make_frame(300, 5)
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        self.assertEqual(aggregate_batches(table.to_batches(max_chunksize=64)), legacy_hard_metrics(df))
+        self.assertEqual(StreamingAggregator().result()["total_spend"], 0.0)
+
+    def test_bounded_inefficient_keeps_highest_cpa(self):
+        df = make_frame(2000, 6)
+        exact = aggregate_batches([df])["inefficient_campaigns"]
+        bounded = aggregate_batches([df.iloc[:700], df.iloc[700:]], max_inefficient=5)["inefficient_campaigns"]
+        self.assertEqual(bounded, sorted(exact, key=lambda r: r["cpa"], reverse=True)[:5])
+
+if __name__ == '__main__':
+    unittest.main()
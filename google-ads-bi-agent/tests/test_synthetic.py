@@ -0,0 +1,57 @@
+import unittest
+from datetime import date
+
+import pandas as pd
+
+from my_mcp.google_ads_client import GoogleAdsClientWrapper, CAMPAIGN_COLUMNS, CAMPAIGN_QUERY, DAILY_CAMPAIGN_QUERY
+from my_mcp.synthetic import SyntheticAccount
+
+
+class TestSyntheticAccount(unittest.TestCase):
+    def setUp(self):
+        self.account = SyntheticAccount(campaigns=2000, segments=3, seed=7)
+
+    def test_deterministic_per_seed_and_customer(self):
+        first = self.account.rows("111", days=30)
+        self.assertEqual(first, SyntheticAccount(campaigns=2000, segments=3, seed=7).rows("111", days=30))
+        self.assertNotEqual(first, self.account.rows("222", days=30))
+        self.assertNotEqual(first, SyntheticAccount(campaigns=2000, segments=3, seed=8).rows("111", days=30))
+
+    def test_skewed_spend_and_zero_conversion_tail(self):
+        df = pd.DataFrame(self.account.rows("111", days=30))
+        self.assertEqual(len(df), 6000)
+        self.assertEqual(tuple(df.columns), CAMPAIGN_COLUMNS)
+
+        by_campaign = df.groupby("campaign_id")[["cost_micros", "conversions"]].sum()
+        spend = by_campaign["cost_micros"].sort_values(ascending=False)
+        # 10% das campanhas concentram a maior parte do gasto
+        self.assertGreater(spend.head(len(spend) // 10).sum() / spend.sum(), 0.4)
+        zero_share = (by_campaign["conversions"] == 0).mean()
+        self.assertGreater(zero_share, 0.25)
+        self.assertLess(zero_share, 0.5)
+        self.assertTrue((df["impressions"] >= df["clicks"]).all())
+        self.assertEqual(set(df["status"]), {"ENABLED", "PAUSED"})
+
+    def test_wrapper_mock_path_uses_synthetic_account(self):
+        client = GoogleAdsClientWrapper(config_path="config/missing.yaml", synthetic=SyntheticAccount(campaigns=50))
+        rows = client.execute_query("111", CAMPAIGN_QUERY.format(date_range="LAST_7_DAYS"))
+        self.assertEqual(rows, SyntheticAccount(campaigns=50).rows("111", days=7))
+
+        daily = client.execute_query("111", DAILY_CAMPAIGN_QUERY.format(start="2026-01-01", end="2026-01-03"))
+        self.assertEqual(len(daily), 150)
+        self.assertEqual({row["date"] for row in daily}, {"2026-01-01", "2026-01-02", "2026-01-03"})
+        batches = list(client.iter_query_batches("111", CAMPAIGN_QUERY.format(date_range="LAST_7_DAYS"), batch_size=20))
+        self.assertEqual([len(batch["campaign_id"]) for batch in batches], [20, 20, 10])
+
+        # Sem conta sintética, o mock continua com as três campanhas fixas
+        classic = GoogleAdsClientWrapper(config_path="config/missing.yaml")
+        self.assertEqual(len(classic.execute_query("111", CAMPAIGN_QUERY.format(date_range="LAST_7_DAYS"))), 3)
+
+    def test_from_config_ignores_unknown_keys(self):
+        account = SyntheticAccount.from_config({"campaigns": 10, "segments": 2, "unknown": 1})
+        self.assertEqual(account.rows_per_day, 20)
+        self.assertEqual(len(list(account.daily_rows("1", date(2026, 1, 1), date(2026, 1, 2)))), 40)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+import asyncio
+import io
+import json
+import logging
+import unittest
+
+from a2a.event_bus import EventBus
+from utils.structured_log import JsonFormatter
+from utils.telemetry import NOOP_SPAN, Telemetry, telemetry, trace
+
+class TestTelemetry(unittest.TestCase):
+    def setUp(self):
+        self.telemetry = Telemetry()
+
+    def test_span_records_latency_rows_and_errors(self):
+        with self.telemetry.span("normalize") as span:
+            span.record(rows=1000, bytes=4096)
+        with self.assertRaises(KeyError):
+            with self.telemetry.span("normalize"):
+                raise KeyError("x")
+
+        summary = self.telemetry.stage_summary()["normalize"]
+        self.assertEqual((summary["count"], summary["rows"]), (2, 1000))
+        counters = {c["name"]: c["value"] for c in self.telemetry.snapshot()["counters"]}
+        self.assertEqual(counters["pipeline_stage_errors_total"], 1)
+        self.assertEqual(counters["pipeline_stage_bytes_total"], 4096)
+
+    def test_nested_spans_share_trace(self):
+        with trace("c1"):
+            with self.telemetry.span("outer") as outer:
+                with self.telemetry.span("inner") as inner:
+                    pass
+
+        spans = self.telemetry.recent_spans("c1")
+        self.assertEqual([s["name"] for s in spans], ["inner", "outer"])
+        self.assertEqual(inner.parent_id, outer.span_id)
+
+    def test_prometheus_text(self):
+        with self.telemetry.span("fetch", transport="inprocess"):
+            pass
+        text = self.telemetry.to_prometheus()
+
+        self.assertIn("# TYPE pipeline_stage_seconds histogram", text)
+        self.assertIn('pipeline_stage_seconds_bucket{stage="fetch",transport="inprocess",le="+Inf"} 1', text)
+        self.assertIn('pipeline_stage_seconds_count{stage="fetch",transport="inprocess"} 1', text)
+
+    def test_disabled_is_noop(self):
+        disabled = Telemetry(enabled=False)
+        self.assertIs(disabled.span("fetch"), NOOP_SPAN)
+        disabled.count("x")
+        self.assertEqual(disabled.snapshot(), {"histograms": [], "counters": []})
+
+    def test_http_endpoint(self):
+        async def run():
+            server = await self.telemetry.start_http_server(port=0)
+            port = server.sockets[0].getsockname()[1]
+            with self.telemetry.span("llm"):
+                pass
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(b"GET /metrics.json HTTP/1.1\r\nHost: x\r\n\r\n")
+            response = await reader.read()
+            writer.close()
+            server.close()
+            await server.wait_closed()
+            return response
+
+        head, body = asyncio.run(run()).split(b"\r\n\r\n", 1)
+        self.assertTrue(head.startswith(b"HTTP/1.1 200"))
+        self.assertEqual(json.loads(body)["spans"][0]["name"], "llm")
+
+    def test_bus_dispatch_traced_by_correlation_id(self):
+        EventBus._instance = None
+        bus = EventBus()
+        telemetry.reset()
+
+        async def handler(data):
+            with telemetry.span("work"):
+                pass
+
+        bus.subscribe("T", handler)
+        asyncio.run(bus.publish("T", {"correlation_id": "abc"}))
+        spans = telemetry.recent_spans("abc")
+
+        self.assertEqual([s["name"] for s in spans], ["work", "bus.dispatch"])
+        self.assertEqual(spans[1]["topic"], "T")
+
+    def test_json_log_lines(self):
+        stream = io.StringIO()
+        handler = logging.StreamHandler(stream)
+        handler.setFormatter(JsonFormatter())
+        log = logging.getLogger("test.structured")
+        log.addHandler(handler)
+        log.propagate = False
+        with trace("c9"):
+            log.warning("slow fetch", extra={"customer_id": "1", "rows": 5})
+        log.removeHandler(handler)
+
+        entry = json.loads(stream.getvalue())
+        self.assertEqual((entry["level"], entry["msg"], entry["trace_id"]), ("WARNING", "slow fetch", "c9"))
+        self.assertEqual((entry["customer_id"], entry["rows"]), ("1", 5))
+
+if __name__ == '__main__':
+    unittest.main()
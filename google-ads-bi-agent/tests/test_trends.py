@@ -0,0 +1,54 @@
+import tempfile
+import unittest
+from datetime import date, timedelta
+
+import pandas as pd
+
+from agents.trends import build_history, format_history
+from my_mcp.campaign_store import CampaignStore
+
+
+class TestTrends(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = CampaignStore(root=self.tmp.name)
+        self.as_of = date(2024, 3, 31)
+        # 60 dias: R$ 10/dia nos primeiros 53, R$ 20/dia na última semana; 1 conversão/dia
+        for offset in range(60):
+            day = self.as_of - timedelta(days=offset)
+            self.store.write_day("1", day, pd.DataFrame({
+                "campaign_id": [1], "campaign_name": ["A"], "status": ["ENABLED"],
+                "clicks": [10], "impressions": [100],
+                "cost_micros": [20_000_000 if offset < 7 else 10_000_000], "conversions": [1.0],
+            }))
+
+    def tearDown(self):
+        self.store.close()
+        self.tmp.cleanup()
+
+    def test_week_over_week(self):
+        history = build_history(self.store, "1", as_of=self.as_of)
+        wow = history["wow"]
+
+        self.assertEqual((wow["current"]["start"], wow["current"]["end"]), ("2024-03-25", "2024-03-31"))
+        self.assertEqual((wow["current"]["cost"], wow["previous"]["cost"]), (140.0, 70.0))
+        self.assertEqual(wow["change_pct"]["cost"], 100.0)
+        self.assertEqual(wow["change_pct"]["cpa"], 100.0)
+        self.assertEqual(wow["change_pct"]["ctr_percent"], 0.0)
+
+    def test_month_over_month_and_baseline(self):
+        history = build_history(self.store, "1", as_of=self.as_of)
+
+        self.assertEqual(history["mom"]["current"]["days"], 30)
+        self.assertEqual(history["mom"]["current"]["cost"], 7 * 20 + 23 * 10)
+        self.assertEqual(history["mom"]["previous"]["cost"], 300.0)
+        self.assertEqual(history["baseline"]["days"], 28)
+        self.assertEqual(history["baseline"]["cost"]["last"], 20.0)
+        self.assertGreater(history["baseline"]["cost"]["zscore"], 1)
+
+    def test_no_local_data(self):
+        self.assertIsNone(build_history(self.store, "9", as_of=self.as_of))
+        self.assertEqual(format_history(None), "Sem histórico local para esta conta.")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import json
+import hashlib
+from typing import Any, Dict, Optional
+
+from utils.sqlite_cache import SQLiteCache
+
+
+def normalize_inputs(value: Any) -> Any:
+    """
+    Canonical form of prompt inputs for cache keys: whitespace inside strings
+    collapsed, floats rounded to 6 places, numpy scalars unwrapped, dict keys
+    sorted by json.dumps. Equal reports give equal keys, even if the markdown
+    table was padded differently.
+    """
+    if isinstance(value, dict):
+        return {str(k): normalize_inputs(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [normalize_inputs(v) for v in value]
+    if hasattr(value, "item") and not isinstance(value, (str, bytes)):
+        value = value.item()
+    if isinstance(value, str):
+        return " ".join(value.split())
+    if isinstance(value, float):
+        return round(value, 6)
+    return value
+
+
+class LLMCache(SQLiteCache):
+    """
+    Local SQLite cache of LLM responses, content-addressed by (model, prompt, normalized inputs).
+
+    Entries live `ttl` seconds and are evicted least-recently-used once the
+    stored responses exceed `max_bytes` (storage and eviction: SQLiteCache).
+    Only JSON-serializable responses are stored (the parsed StrategicReport dict).
+    """
+
+    def __init__(self, path: str, ttl: float = 7 * 86400, max_bytes: int = 64 * 1024 * 1024):
+        super().__init__(path, table="llm_responses", max_bytes=max_bytes)
+        self.ttl = ttl
+
+    @staticmethod
+    def make_key(model: str, prompt: str, inputs: Dict[str, Any]) -> str:
+        raw = json.dumps({"model": model, "prompt": prompt, "inputs": normalize_inputs(inputs)},
+                         sort_keys=True, default=str)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Any]:
+        return self._get(key)
+
+    def put(self, key: str, model: str, response: Any):
+        self._put(key, response, self.ttl, label=model)
@@ -0,0 +1,53 @@
+import asyncio
+import time
+from collections import deque
+from typing import Deque, Dict, Optional
+
+
+class LoopLagMonitor:
+    """
+    Measures event loop responsiveness.
+
+    A background task sleeps for `interval` seconds and records how late it
+    wakes up. A blocking call anywhere on the loop shows up directly as lag.
+    """
+
+    def __init__(self, interval: float = 0.05, max_samples: int = 10_000):
+        self.interval = interval
+        self.max_samples = max_samples
+        # Bounded window: the oldest sample is dropped in O(1) on every tick
+        self.samples: Deque[float] = deque(maxlen=max_samples)
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> Dict[str, float]:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        return self.stats()
+
+    async def _run(self):
+        while True:
+            expected = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.perf_counter() - expected)
+            self.samples.append(lag)
+
+    def stats(self) -> Dict[str, float]:
+        if not self.samples:
+            return {"samples": 0, "mean_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+        ordered = sorted(self.samples)
+        p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+        return {
+            "samples": len(ordered),
+            "mean_ms": round(sum(ordered) / len(ordered) * 1000, 3),
+            "p99_ms": round(p99 * 1000, 3),
+            "max_ms": round(ordered[-1] * 1000, 3),
+        }
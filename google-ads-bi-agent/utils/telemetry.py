@@ -0,0 +1,376 @@
+import asyncio
+import contextvars
+import itertools
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Bucket upper bounds (Prometheus style: cumulative, plus an implicit +Inf)
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+RATE_BUCKETS = (1e2, 1e3, 1e4, 1e5, 1e6, 1e7, 1e8)
+BYTES_BUCKETS = tuple(float(1024 * 4 ** i) for i in range(11))  # 1 KiB .. 1 GiB
+
+_current_trace: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("trace_id", default=None)
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("span", default=None)
+# Span ids only need to be unique within the process (spans never leave it)
+_span_ids = itertools.count(1)
+
+
+def current_trace_id() -> Optional[str]:
+    return _current_trace.get()
+
+
+@contextmanager
+def trace(trace_id: Optional[str]) -> Iterator[Optional[str]]:
+    """Tags every span (and log record) opened inside the block with `trace_id`, e.g. a correlation id."""
+    token = _current_trace.set(trace_id)
+    try:
+        yield trace_id
+    finally:
+        _current_trace.reset(token)
+
+
+class Histogram:
+    """Fixed-bucket histogram: O(log buckets) per observation, constant memory."""
+
+    __slots__ = ("buckets", "counts", "count", "sum", "max")
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-quantile (the max for the +Inf bucket)."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                return min(self.buckets[i], self.max) if i < len(self.buckets) else self.max
+        return self.max
+
+    def snapshot(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "mean": round(self.sum / self.count, 6) if self.count else 0.0,
+            "p50": self.quantile(0.50),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+            "max": round(self.max, 6),
+        }
+
+
+class LatencyStats:
+    """Handler latency over the last `window` calls."""
+
+    def __init__(self, window: int = 1024):
+        self.count = 0
+        self.samples = deque(maxlen=window)
+
+    def record(self, seconds: float):
+        self.count += 1
+        self.samples.append(seconds)
+
+    def snapshot(self) -> dict:
+        if not self.samples:
+            return {"count": self.count, "mean_ms": 0.0, "p50_ms": 0.0, "p95_ms": 0.0, "max_ms": 0.0}
+        ordered = sorted(self.samples)
+        pick = lambda q: ordered[min(len(ordered) - 1, int(len(ordered) * q))] * 1000
+        return {
+            "count": self.count,
+            "mean_ms": round(sum(ordered) / len(ordered) * 1000, 3),
+            "p50_ms": round(pick(0.50), 3),
+            "p95_ms": round(pick(0.95), 3),
+            "max_ms": round(ordered[-1] * 1000, 3),
+        }
+
+
+class Span:
+    """
+    One timed pipeline stage. Use as a context manager; call record() to attach
+    the rows/bytes it processed (they feed the throughput histograms).
+    """
+
+    __slots__ = ("telemetry", "name", "labels", "key", "trace_id", "span_id", "parent_id",
+                 "started_at", "duration", "rows", "bytes", "error", "_started", "_token")
+
+    def __init__(self, telemetry: "Telemetry", name: str, labels: Dict[str, str], trace_id: Optional[str]):
+        self.telemetry = telemetry
+        self.name = name
+        self.labels = labels
+        # Metric label set: the stage first, then the span's own labels
+        self.key = (("stage", name), *sorted(labels.items())) if labels else (("stage", name),)
+        self.trace_id = trace_id
+        self.span_id = next(_span_ids)
+        parent = _current_span.get()
+        self.parent_id = parent.span_id if parent is not None else None
+        self.rows: Optional[int] = None
+        self.bytes: Optional[int] = None
+        self.error: Optional[str] = None
+        self.duration = 0.0
+
+    def record(self, rows: Optional[int] = None, bytes: Optional[int] = None) -> "Span":
+        if rows is not None:
+            self.rows = (self.rows or 0) + int(rows)
+        if bytes is not None:
+            self.bytes = (self.bytes or 0) + int(bytes)
+        return self
+
+    def __enter__(self) -> "Span":
+        self.started_at = time.time()
+        self._started = time.perf_counter()
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.duration = time.perf_counter() - self._started
+        try:
+            _current_span.reset(self._token)
+        except ValueError:
+            # Async generator closed from another context (e.g. aclose() at GC): nothing to restore
+            pass
+        if exc_type is not None and not issubclass(exc_type, asyncio.CancelledError):
+            self.error = exc_type.__name__
+        self.telemetry._finish(self)
+        return False
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name, "trace_id": self.trace_id, "span_id": self.span_id, "parent_id": self.parent_id,
+            "start": round(self.started_at, 6), "duration_ms": round(self.duration * 1000, 3),
+            "rows": self.rows, "bytes": self.bytes, "error": self.error, **self.labels,
+        }
+
+
+class _NoopSpan:
+    """Returned by span() when telemetry is disabled: no clock reads, no allocation per call."""
+
+    __slots__ = ()
+
+    def record(self, rows=None, bytes=None):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Telemetry:
+    """
+    In-process metrics and tracing for the pipeline.
+
+    - span(stage) times a stage into `pipeline_stage_seconds{stage=...}`; rows/bytes
+      recorded on the span also feed `pipeline_stage_rows_total`,
+      `pipeline_stage_bytes_total`, `pipeline_stage_rows_per_second` and
+      `pipeline_stage_bytes`. Failed spans count in `pipeline_stage_errors_total`.
+    - Finished spans (with trace/parent ids) are kept in a bounded ring for
+      inspection: recent_spans(trace_id) reconstructs one request end to end.
+    - Output: snapshot()/to_json()/dump_json(path) and to_prometheus()
+      (text exposition format), optionally served by start_http_server().
+    """
+
+    def __init__(self, enabled: bool = True, max_spans: int = 2048):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._histograms: Dict[Tuple[str, Tuple], Histogram] = {}
+        self._counters: Dict[Tuple[str, Tuple], float] = {}
+        self._spans: deque = deque(maxlen=max_spans)
+        # Per label set: [seconds, rows/s, bytes] histograms, resolved once instead of per span
+        self._stages: Dict[Tuple, List[Optional[Histogram]]] = {}
+
+    def span(self, name: str, trace_id: Optional[str] = None, **labels: Any):
+        if not self.enabled:
+            return NOOP_SPAN
+        return Span(self, name, {key: str(value) for key, value in labels.items()}, trace_id or _current_trace.get())
+
+    def observe(self, metric: str, value: float, buckets: Sequence[float] = LATENCY_BUCKETS, **labels: Any):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._observe((metric, _label_key(labels)), value, buckets)
+
+    def count(self, metric: str, value: float = 1, **labels: Any):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._add((metric, _label_key(labels)), value)
+
+    def _finish(self, span: Span):
+        labels = span.key
+        with self._lock:
+            stage = self._stages.get(labels)
+            if stage is None:
+                stage = self._stages[labels] = [self._histogram(("pipeline_stage_seconds", labels), LATENCY_BUCKETS), None, None]
+            stage[0].observe(span.duration)
+            if span.rows is not None:
+                self._add(("pipeline_stage_rows_total", labels), span.rows)
+                if span.duration > 0:
+                    if stage[1] is None:
+                        stage[1] = self._histogram(("pipeline_stage_rows_per_second", labels), RATE_BUCKETS)
+                    stage[1].observe(span.rows / span.duration)
+            if span.bytes is not None:
+                self._add(("pipeline_stage_bytes_total", labels), span.bytes)
+                if stage[2] is None:
+                    stage[2] = self._histogram(("pipeline_stage_bytes", labels), BYTES_BUCKETS)
+                stage[2].observe(span.bytes)
+            if span.error is not None:
+                self._add(("pipeline_stage_errors_total", labels), 1)
+            self._spans.append(span)
+
+    def _histogram(self, key, buckets: Sequence[float]) -> Histogram:
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            histogram = self._histograms[key] = Histogram(buckets)
+        return histogram
+
+    def _observe(self, key, value: float, buckets: Sequence[float]):
+        self._histogram(key, buckets).observe(value)
+
+    def _add(self, key, value: float):
+        self._counters[key] = self._counters.get(key, 0) + value
+
+    # --- Output ---
+
+    def recent_spans(self, trace_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        with self._lock:
+            spans = list(self._spans)
+        return [span.to_dict() for span in spans if trace_id is None or span.trace_id == trace_id]
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            histograms = [(name, labels, histogram.snapshot()) for (name, labels), histogram in self._histograms.items()]
+            counters = list(self._counters.items())
+        return {
+            "histograms": [{"name": name, "labels": dict(labels), **values} for name, labels, values in sorted(histograms)],
+            "counters": [{"name": name, "labels": dict(labels), "value": value} for (name, labels), value in sorted(counters)],
+        }
+
+    def stage_summary(self) -> Dict[str, Dict[str, Any]]:
+        """Latency (ms) and rows per stage, keyed like `fetch` or `bus.dispatch[topic=DATA_FETCHED]`."""
+        with self._lock:
+            stages = [(labels, histogram.snapshot()) for (name, labels), histogram in self._histograms.items()
+                      if name == "pipeline_stage_seconds"]
+            rows = {labels: value for (name, labels), value in self._counters.items() if name == "pipeline_stage_rows_total"}
+        summary = {}
+        for labels, values in sorted(stages):
+            stage, extra = labels[0][1], ",".join(f"{key}={value}" for key, value in labels[1:])
+            entry = {"count": values["count"], "mean_ms": round(values["mean"] * 1000, 3),
+                     "p95_ms": round(values["p95"] * 1000, 3), "max_ms": round(values["max"] * 1000, 3)}
+            if labels in rows:
+                entry["rows"] = int(rows[labels])
+                entry["rows_per_s"] = round(rows[labels] / values["sum"], 1) if values["sum"] else 0.0
+            summary[f"{stage}[{extra}]" if extra else stage] = entry
+        return summary
+
+    def to_json(self, include_spans: bool = False) -> str:
+        data = self.snapshot()
+        if include_spans:
+            data["spans"] = self.recent_spans()
+        return json.dumps(data, indent=2)
+
+    def dump_json(self, path: str, include_spans: bool = True):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self.to_json(include_spans))
+
+    def to_prometheus(self) -> str:
+        with self._lock:
+            histograms = sorted((key, histogram.buckets, list(histogram.counts), histogram.count, histogram.sum)
+                                for key, histogram in self._histograms.items())
+            counters = sorted(self._counters.items())
+
+        lines = []
+        declared = set()
+        for (name, labels), value in counters:
+            if name not in declared:
+                declared.add(name)
+                lines.append(f"# TYPE {name} counter")
+            lines.append(f"{name}{_format_labels(labels)} {value:g}")
+        for (name, labels), buckets, counts, count, total in histograms:
+            if name not in declared:
+                declared.add(name)
+                lines.append(f"# TYPE {name} histogram")
+            cumulative = 0
+            for bound, bucket_count in zip((*buckets, "+Inf"), counts):
+                cumulative += bucket_count
+                le = bound if isinstance(bound, str) else f"{bound:g}"
+                lines.append(f"{name}_bucket{_format_labels((*labels, ('le', le)))} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {total:g}")
+            lines.append(f"{name}_count{_format_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+    async def start_http_server(self, host: str = "127.0.0.1", port: int = 9464) -> asyncio.AbstractServer:
+        """
+        Minimal HTTP endpoint on the running loop: GET /metrics (Prometheus text)
+        and GET /metrics.json (snapshot + recent spans). Close the returned server to stop.
+        """
+        async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+            try:
+                request_line = (await reader.readline()).decode("latin-1").split()
+                while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    pass
+                path = request_line[1] if len(request_line) > 1 else "/"
+                if path.startswith("/metrics.json"):
+                    status, content_type, body = "200 OK", "application/json", self.to_json(include_spans=True)
+                elif path.startswith("/metrics"):
+                    status, content_type, body = "200 OK", "text/plain; version=0.0.4", self.to_prometheus()
+                else:
+                    status, content_type, body = "404 Not Found", "text/plain", "not found\n"
+                payload = body.encode("utf-8")
+                writer.write(f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\n"
+                             f"Content-Length: {len(payload)}\r\nConnection: close\r\n\r\n".encode("latin-1") + payload)
+                await writer.drain()
+            finally:
+                writer.close()
+
+        return await asyncio.start_server(handle, host, port)
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+            self._stages.clear()
+            self._spans.clear()
+
+
+def _label_key(labels: Dict[str, Any]) -> Tuple:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _format_labels(labels: Sequence[Tuple[str, str]]) -> str:
+    if not labels:
+        return ""
+    escaped = (f'{key}="{_escape(value)}"' for key, value in labels)
+    return "{" + ",".join(escaped) + "}"
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+# Process-wide instance used by the agents and the EventBus; TELEMETRY_ENABLED=false turns spans into no-ops
+telemetry = Telemetry(enabled=os.getenv("TELEMETRY_ENABLED", "true").lower() not in ("0", "false", "no"))
@@ -0,0 +1,57 @@
+import asyncio
+import argparse
+import os
+from dotenv import load_dotenv
+
+# Carrega variáveis de ambiente
+load_dotenv()
+
+from a2a.event_bus import EventBus
+from a2a.transports import SocketTransport
+from my_mcp.google_ads_client import GoogleAdsClientWrapper
+from utils.structured_log import configure_logging
+from utils.telemetry import telemetry
+
+async def run_worker(roles, broker: str):
+    """
+    Processo worker do modo multi-processo: conecta ao broker e hospeda os agentes pedidos.
+    Vários workers com o mesmo papel dividem os eventos (consumer group por handler).
+    """
+    configure_logging()
+    bus = EventBus()
+    bus.use_transport(SocketTransport(broker))
+    # TELEMETRY_PORT: /metrics deste worker (cada processo tem seus próprios histogramas)
+    telemetry_server = None
+    if os.getenv("TELEMETRY_PORT"):
+        telemetry_server = await telemetry.start_http_server(port=int(os.getenv("TELEMETRY_PORT")))
+
+    agents = []
+    bi_agent = None
+    if "ads" in roles:
+        from agents.google_ads_agent import GoogleAdsAgent
+        GoogleAdsClientWrapper.shared().warm_up()
+        agents.append(GoogleAdsAgent(bus, transport=os.getenv("MCP_TRANSPORT", "inprocess")))
+    if "bi" in roles:
+        from agents.bi_analytics_agent import BIAnalyticsAgent
+        bi_agent = BIAnalyticsAgent(bus)
+        agents.append(bi_agent)
+        # Import do LangChain (~2-3s) em uma thread, antes da primeira análise
+        bi_agent.start_warm_up()
+
+    await bus.connect()
+    print(f"👷 Worker ready ({', '.join(roles)}) on broker {broker}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await bus.close()
+        if bi_agent is not None:
+            bi_agent.close()
+        if telemetry_server is not None:
+            telemetry_server.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="EventBus worker (multi-process mode)")
+    parser.add_argument("roles", nargs="+", choices=["ads", "bi"])
+    parser.add_argument("--broker", default=os.getenv("EVENT_BUS_BROKER", "127.0.0.1:7800"))
+    args = parser.parse_args()
+    asyncio.run(run_worker(args.roles, args.broker))